@@ -0,0 +1,342 @@
+#!/usr/bin/env python
+"""
+Benchmark of the redirect middleware lookups at scale.
+
+Redirects (exact, subpath and catchall) are generated across several sites in a temporary SQLite database,
+growing up to each of the requested sizes, and ``do_redirect`` is timed on four kinds of traffic of the
+first site: paths with a redirect (``hit``), plausible paths without one (``miss``), random 404 noise
+(``noise``) and static files, admin and health check requests (``static``). Each traffic is run on an empty
+cache (``cold``) and again on the populated one (``warm``)::
+
+    python benchmarks/bench_middleware.py --rows 1000 100000 1000000 --output results.json
+    python benchmarks/bench_middleware.py --cache locmem redis --redis-url redis://127.0.0.1:6379/0
+    python benchmarks/bench_middleware.py --baseline results.json
+
+Results are saved as JSON to be compared across changes with ``--baseline``.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import django  # noqa: E402
+from django.conf import settings  # noqa: E402
+
+CACHES = {
+    # large enough not to cull the cached redirects during a run
+    "locmem": lambda options: {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "OPTIONS": {"MAX_ENTRIES": 10**7},
+    },
+    "redis": lambda options: {"BACKEND": "django.core.cache.backends.redis.RedisCache", "LOCATION": options.redis_url},
+    "memcached": lambda options: {
+        "BACKEND": "django.core.cache.backends.memcached.PyMemcacheCache",
+        "LOCATION": options.memcached_location,
+    },
+}
+
+#: middleware settings of each benchmarked configuration
+MODES = {
+    "default": {},
+    "local-cache": {"DJANGOCMS_REDIRECT_LOCAL_CACHE_SIZE": 10000},
+    "bloom": {"DJANGOCMS_REDIRECT_BLOOM_FILTER": True},
+    "table": {"DJANGOCMS_REDIRECT_IN_MEMORY_TABLE": True},
+    # directory set once the data directory is created
+    "snapshot": {"DJANGOCMS_REDIRECT_SNAPSHOT_DIR": None},
+    "database-prefix": {"DJANGOCMS_REDIRECT_PREFIX_LOOKUP": "database"},
+    "path-filter": {
+        "DJANGOCMS_REDIRECT_EXCLUDED_PREFIXES": ("/static/", "/media/", "/admin/", "/healthz"),
+        "DJANGOCMS_REDIRECT_EXCLUDED_SUFFIXES": (".css", ".js", ".png", ".ico"),
+    },
+}
+
+NOISE = (
+    "/wp-login.php",
+    "/wp-admin/setup-config.php",
+    "/.env",
+    "/xmlrpc.php",
+    "/favicon.ico",
+    "/phpmyadmin/index.php",
+    "/.git/config",
+    "/static/js/app.{}.js",
+    "/{}",
+    "/en/{}/{}.html",
+)
+
+STATIC = (
+    "/static/css/site.{}.css",
+    "/static/js/app.{}.js",
+    "/media/uploads/{}/{}.jpg",
+    "/admin/cms/page/{1}/change/",
+    "/admin/jsi18n/",
+    "/healthz",
+    "/favicon.ico",
+)
+
+INSERT_BATCH_SIZE = 10000
+
+
+def get_kind(index):
+    """Return the kind of the generated redirect of the given index: 1 catchall and 3 subpath every 20."""
+    remainder = index % 20
+    if remainder == 0:
+        return "catchall"
+    if remainder <= 3:
+        return "subpath"
+    return "exact"
+
+
+def make_redirect(index, site_ids):
+    from djangocms_redirect.models import Redirect
+
+    kind = get_kind(index)
+    site_id = site_ids[index % len(site_ids)]
+    if kind == "catchall":
+        return Redirect(
+            site_id=site_id, old_path="/en/archive-{}/".format(index), new_path="/en/archive/", catchall_redirect=True
+        )
+    if kind == "subpath":
+        return Redirect(
+            site_id=site_id,
+            old_path="/en/legacy-{}/".format(index),
+            new_path="/en/new-{}/".format(index),
+            subpath_match=True,
+        )
+    return Redirect(
+        site_id=site_id,
+        old_path="/en/section-{}/page-{}/".format(index % 100, index),
+        new_path="/en/page-{}/".format(index),
+        response_code="302" if index % 7 == 0 else "301",
+    )
+
+
+def populate(start, stop, site_ids):
+    """Insert the redirects with index in ``[start, stop)``."""
+    from djangocms_redirect.models import Redirect
+
+    for batch_start in range(start, stop, INSERT_BATCH_SIZE):
+        batch_stop = min(batch_start + INSERT_BATCH_SIZE, stop)
+        Redirect.objects.bulk_create(make_redirect(index, site_ids) for index in range(batch_start, batch_stop))
+
+
+def make_traffic(rows, site_ids, count, rng):
+    """Return the ``hit``, ``miss``, ``noise`` and ``static`` paths of the first site."""
+    first_site_rows = range(0, rows, len(site_ids))
+    hits = []
+    for index in rng.sample(first_site_rows, min(count, len(first_site_rows))):
+        kind = get_kind(index)
+        if kind == "catchall":
+            hits.append("/en/archive-{}/old/".format(index))
+        elif kind == "subpath":
+            hits.append("/en/legacy-{}/sub/page/".format(index))
+        else:
+            # half of the requests without the trailing slash
+            path = "/en/section-{}/page-{}/".format(index % 100, index)
+            hits.append(path[:-1] if index % 2 else path)
+    misses = ["/en/section-{}/missing-{}/".format(rng.randrange(100), rng.randrange(10**9)) for _ in range(count)]
+    noise = []
+    for _ in range(count):
+        noise.append(rng.choice(NOISE).format("%08x" % rng.randrange(16**8), rng.randrange(1000)))
+    static = []
+    for _ in range(count):
+        static.append(rng.choice(STATIC).format("%08x" % rng.randrange(16**8), rng.randrange(1000)))
+    return {"hit": hits, "miss": misses, "noise": noise, "static": static}
+
+
+def reset_state():
+    from django.core.cache import cache
+
+    from djangocms_redirect.bloom import clear_redirect_filters
+    from djangocms_redirect.patterns import clear_regex_matchers
+    from djangocms_redirect.snapshot import clear_redirect_snapshots, write_snapshot
+    from djangocms_redirect.table import clear_redirect_tables
+    from djangocms_redirect.utils import bump_site_generation
+
+    cache.clear()
+    # store a new generation at once, instead of when the in-process one is checked again
+    bump_site_generation(settings.SITE_ID)
+    clear_redirect_tables()
+    clear_redirect_filters()
+    clear_regex_matchers()
+    clear_redirect_snapshots()
+    if getattr(settings, "DJANGOCMS_REDIRECT_SNAPSHOT_DIR", None):
+        write_snapshot(settings.SITE_ID)
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def run_traffic(middleware, paths):
+    """Time ``do_redirect`` on each path and return the statistics of the run."""
+    from django.db import connection
+    from django.test import RequestFactory
+
+    factory = RequestFactory()
+    requests = [factory.get(path) for path in paths]
+    counter = QueryCounter()
+    timings = []
+    redirects = 0
+    with connection.execute_wrapper(counter):
+        for request in requests:
+            start = time.perf_counter()
+            response = middleware.do_redirect(request)
+            timings.append(time.perf_counter() - start)
+            redirects += response is not None
+    timings.sort()
+    return {
+        "requests": len(timings),
+        "redirects": redirects,
+        "queries_per_request": counter.count / len(timings),
+        "mean_us": statistics.fmean(timings) * 1e6,
+        "p50_us": timings[len(timings) // 2] * 1e6,
+        "p95_us": timings[int(len(timings) * 0.95)] * 1e6,
+        "p99_us": timings[int(len(timings) * 0.99)] * 1e6,
+    }
+
+
+def check_cache():
+    from django.core.cache import cache
+
+    try:
+        cache.set("CMSREDIRECT:BENCHMARK", 1)
+        return cache.get("CMSREDIRECT:BENCHMARK") == 1
+    except Exception as e:
+        print("  cache unavailable: {}".format(e), file=sys.stderr)
+        return False
+
+
+def run_size(rows, traffic, options):
+    from django.test.utils import override_settings
+
+    from djangocms_redirect.middleware import RedirectMiddleware
+
+    results = []
+    for cache_name in options.cache:
+        with override_settings(CACHES={"default": CACHES[cache_name](options)}):
+            if not check_cache():
+                print("Skipping {} cache".format(cache_name), file=sys.stderr)
+                continue
+            for mode in options.mode:
+                with override_settings(**MODES[mode]):
+                    for traffic_name, paths in traffic.items():
+                        reset_state()
+                        middleware = RedirectMiddleware(lambda request: None)
+                        for phase in ("cold", "warm"):
+                            result = {"rows": rows, "cache": cache_name, "mode": mode}
+                            result.update({"traffic": traffic_name, "phase": phase})
+                            result.update(run_traffic(middleware, paths))
+                            results.append(result)
+                            print(format_result(result))
+    return results
+
+
+def get_key(result):
+    return (result["rows"], result["cache"], result["mode"], result["traffic"], result["phase"])
+
+
+def format_result(result, baseline=None):
+    line = "{rows:>8} {cache:<9} {mode:<15} {traffic:<6} {phase:<4} {mean_us:9.1f} us {p99_us:9.1f} us p99 {q:5.2f} q"
+    line = line.format(q=result["queries_per_request"], **result)
+    if baseline is not None:
+        line += "  ({:+.0%} mean)".format(result["mean_us"] / baseline["mean_us"] - 1)
+    return line
+
+
+def get_revision():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL,
+            text=True,
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 100000], help="Redirects count of each run")
+    parser.add_argument("--sites", type=int, default=4, help="Sites the redirects are spread across")
+    parser.add_argument("--requests", type=int, default=1000, help="Requests of each traffic kind")
+    parser.add_argument("--cache", nargs="+", choices=CACHES, default=["locmem"])
+    parser.add_argument("--mode", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--redis-url", default="redis://127.0.0.1:6379/0")
+    parser.add_argument("--memcached-location", default="127.0.0.1:11211")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="JSON file the results are written to")
+    parser.add_argument("--baseline", help="JSON file of a previous run to compare the results with")
+    options = parser.parse_args()
+
+    data_dir = tempfile.mkdtemp(prefix="djangocms_redirect_bench")
+    MODES["snapshot"]["DJANGOCMS_REDIRECT_SNAPSHOT_DIR"] = data_dir
+    settings.configure(
+        DATABASES={"default": {"ENGINE": "django.db.backends.sqlite3", "NAME": os.path.join(data_dir, "db.sqlite3")}},
+        INSTALLED_APPS=["django.contrib.contenttypes", "django.contrib.sites", "djangocms_redirect"],
+        CACHES={"default": CACHES["locmem"](options)},
+        SITE_ID=1,
+        USE_TZ=True,
+        DEFAULT_AUTO_FIELD="django.db.models.AutoField",
+    )
+    django.setup()
+
+    from django.contrib.sites.models import Site
+    from django.core.management import call_command
+
+    try:
+        # the initial migration of the app does not declare its dependency on sites
+        call_command("migrate", "sites", verbosity=0)
+        call_command("migrate", verbosity=0)
+        site_ids = [
+            Site.objects.get_or_create(pk=pk, defaults={"domain": "site{}.example.com".format(pk)})[0].pk
+            for pk in range(1, options.sites + 1)
+        ]
+        rng = random.Random(options.seed)
+        results = []
+        inserted = 0
+        for rows in sorted(options.rows):
+            start = time.perf_counter()
+            populate(inserted, rows, site_ids)
+            inserted = rows
+            print("{} redirects inserted in {:.1f} s".format(rows, time.perf_counter() - start), file=sys.stderr)
+            results.extend(run_size(rows, make_traffic(rows, site_ids, options.requests, rng), options))
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+    report = {
+        "revision": get_revision(),
+        "python": platform.python_version(),
+        "django": django.get_version(),
+        "timestamp": time.time(),
+        "options": {"sites": options.sites, "requests": options.requests, "seed": options.seed},
+        "results": results,
+    }
+    if options.output:
+        with open(options.output, "w", encoding="utf-8") as stream:
+            json.dump(report, stream, indent=2)
+    if options.baseline:
+        with open(options.baseline, encoding="utf-8") as stream:
+            baseline = {get_key(result): result for result in json.load(stream)["results"]}
+        print("\nCompared with {}:".format(options.baseline))
+        for result in results:
+            if get_key(result) in baseline:
+                print(format_result(result, baseline[get_key(result)]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+"""
+Benchmark of the regular expression redirects matcher.
+
+Compares the combined matcher of :py:mod:`djangocms_redirect.patterns` with trying each pattern in turn, on
+matching and not matching paths::
+
+    python benchmarks/bench_patterns.py --patterns 10000
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import django  # noqa: E402
+from django.conf import settings  # noqa: E402
+
+# no time cap, to measure full lookups
+settings.configure(DJANGOCMS_REDIRECT_REGEX_TIMEOUT=0)
+django.setup()
+
+from djangocms_redirect.patterns import RegexMatcher  # noqa: E402
+
+
+def make_rules(count, sections):
+    """Return ``count`` patterns spread across ``sections`` path segments, some without a literal segment."""
+    rules = []
+    for index in range(count):
+        if index % 20 == 0:
+            rules.append((r"^/(?:en|de)/legacy-{}/(.*)$".format(index), r"/new/{}/\1".format(index)))
+        else:
+            rules.append(
+                (r"^/section-{}/{}/(\d{{4}})/(.*)$".format(index % sections, index), r"/news/{}/\2".format(index))
+            )
+    return rules
+
+
+def timed(function, paths, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for path in paths:
+            function(path)
+    return (time.perf_counter() - start) / (repeat * len(paths))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--patterns", type=int, default=10000)
+    parser.add_argument("--sections", type=int, default=50)
+    parser.add_argument("--paths", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=3)
+    options = parser.parse_args()
+
+    rules = make_rules(options.patterns, options.sections)
+    start = time.perf_counter()
+    matcher = RegexMatcher()
+    for priority, (pattern, new_path) in enumerate(rules):
+        matcher.add(priority, pattern, new_path, "301")
+    matcher.compile()
+    compile_time = time.perf_counter() - start
+    compiled = [(re.compile(pattern), new_path) for pattern, new_path in rules]
+
+    def naive(path):
+        for regex, new_path in compiled:
+            match = regex.match(path)
+            if match:
+                return match.expand(new_path)
+
+    random.seed(0)
+    hits = []
+    for _ in range(options.paths):
+        index = random.randrange(options.patterns)
+        if index % 20 == 0:
+            hits.append("/en/legacy-{}/page/".format(index))
+        else:
+            hits.append("/section-{}/{}/2020/page/".format(index % options.sections, index))
+    misses = ["/section-{}/missing/{}/".format(index % options.sections, index) for index in range(options.paths)]
+    assert all(matcher.match(path) for path in hits)
+    assert not any(matcher.match(path) for path in misses)
+
+    results = {
+        "combined hit": timed(matcher.match, hits, options.repeat),
+        "combined miss": timed(matcher.match, misses, options.repeat),
+        "naive hit": timed(naive, hits, 1),
+        "naive miss": timed(naive, misses, 1),
+    }
+    print("{} patterns in {} buckets, compiled in {:.2f} s".format(len(matcher), len(matcher.buckets), compile_time))
+    for name, seconds in results.items():
+        print("{:<15} {:10.1f} us/lookup".format(name, seconds * 1e6))
+
+
+if __name__ == "__main__":
+    main()
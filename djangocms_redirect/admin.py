@@ -1,8 +1,14 @@
+import re
+
 from cms.forms.widgets import PageSmartLinkWidget
 from django.contrib import admin
+from django.core.exceptions import ValidationError
 from django.forms import ModelForm
-from django.utils.translation import get_language
+from django.http import StreamingHttpResponse
+from django.utils.translation import get_language, gettext_lazy as _
 
+from .chains import RedirectGraph
+from .export import CONTENT_TYPES, iter_lines
 from .models import Redirect
 from .utils import normalize_url
 
@@ -10,7 +16,7 @@ from .utils import normalize_url
 class RedirectForm(ModelForm):
     class Meta:
         model = Redirect
-        fields = ["site", "old_path", "new_path", "response_code", "subpath_match", "catchall_redirect"]
+        fields = ["site", "old_path", "new_path", "response_code", "subpath_match", "catchall_redirect", "regex_match"]
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -20,13 +26,78 @@ class RedirectForm(ModelForm):
         self.fields["new_path"].widget = widget
 
     def clean_old_path(self):
-        return normalize_url(self.cleaned_data.get("old_path"))
+        old_path = self.cleaned_data.get("old_path")
+        if self["regex_match"].value():
+            try:
+                re.compile(old_path)
+            except re.error as e:
+                raise ValidationError(
+                    _("Invalid regular expression: %(error)s"), code="invalid_regex", params={"error": e}
+                )
+            return old_path
+        return normalize_url(old_path)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        site = cleaned_data.get("site")
+        old_path = cleaned_data.get("old_path")
+        new_path = cleaned_data.get("new_path")
+        prefix = cleaned_data.get("subpath_match") or cleaned_data.get("catchall_redirect")
+        regex = cleaned_data.get("regex_match")
+        if regex and prefix:
+            self.add_error(
+                "regex_match",
+                ValidationError(
+                    _("Regular expression redirects can't be subpath or catchall redirects."), code="regex_subpath"
+                ),
+            )
+        exact = not (prefix or regex)
+        if site and old_path and new_path and exact:
+            # only the chain starting from new_path is fetched, hop by hop
+            graph = RedirectGraph(site.pk, lazy=True)
+            if self.instance.pk and self.instance.lookup_path:
+                graph.remove(self.instance.lookup_path)
+            graph.add(old_path, new_path, cleaned_data.get("response_code"))
+            # reused to flatten the chain on save
+            self.instance._redirect_graph = graph
+            loop = graph.find_loop(old_path, new_path)
+            if loop:
+                self.add_error(
+                    "new_path",
+                    ValidationError(
+                        _("This redirect creates a loop: %(loop)s"), code="loop", params={"loop": " -> ".join(loop)}
+                    ),
+                )
+        return cleaned_data
 
 
 @admin.register(Redirect)
 class RedirectAdmin(admin.ModelAdmin):
-    list_display = ("old_path", "new_path", "response_code", "subpath_match", "catchall_redirect")
-    list_filter = ("site",)
+    list_display = (
+        "old_path",
+        "new_path",
+        "response_code",
+        "subpath_match",
+        "catchall_redirect",
+        "regex_match",
+        "hit_count",
+        "last_hit",
+    )
+    list_filter = ("site", "regex_match")
     search_fields = ("old_path", "new_path")
     radio_fields = {"site": admin.VERTICAL}
     form = RedirectForm
+    actions = ("export_csv", "export_jsonl")
+
+    def _export(self, queryset, file_format):
+        response = StreamingHttpResponse(iter_lines(queryset, file_format), content_type=CONTENT_TYPES[file_format])
+        response["Content-Disposition"] = 'attachment; filename="redirects.{}"'.format(file_format)
+        return response
+
+    @admin.action(description=_("Export selected redirects as CSV"))
+    def export_csv(self, request, queryset):
+        return self._export(queryset, "csv")
+
+    @admin.action(description=_("Export selected redirects as JSON Lines"))
+    def export_jsonl(self, request, queryset):
+        return self._export(queryset, "jsonl")
@@ -0,0 +1,154 @@
+import hashlib
+import math
+import threading
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from .utils import aget_site_generation, get_site_generation
+
+_filters = {}
+_filters_lock = threading.Lock()
+
+
+class BloomFilter:
+    """
+    Compact probabilistic set of strings.
+
+    Membership tests never return false negatives, and return false positives with a probability close to
+    ``error_rate`` as long as no more than ``capacity`` items are added. If ``max_bytes`` is set, the filter
+    is capped to this size, at the cost of an higher false positive rate.
+    """
+
+    def __init__(self, capacity, error_rate=0.01, max_bytes=None):
+        capacity = max(capacity, 1)
+        num_bits = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        if max_bytes:
+            num_bits = min(num_bits, max_bytes * 8)
+        self.num_bits = max(num_bits, 8)
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return ((first + index * second) % self.num_bits for index in range(self.num_hashes))
+
+    def add(self, item):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+    @property
+    def size_bytes(self):
+        return len(self.bits)
+
+    @property
+    def false_positive_rate(self):
+        """Expected false positive rate given the number of added items."""
+        return (1 - math.exp(-self.num_hashes * self.count / self.num_bits)) ** self.num_hashes
+
+
+class RedirectFilter:
+    """
+    Bloom filter of the paths which may have a redirect in a site.
+
+    It contains the lookup path of the exact redirects, and the path up to the last slash of the subpath and
+    catchall redirects (which is a slash terminated prefix of any path they match). Regular expression redirects
+    can match any path, thus if the site has any the filter contains the empty string, which matches all paths.
+    """
+
+    def __init__(self, site_id, generation, bloom):
+        self.site_id = site_id
+        self.generation = generation
+        self.bloom = bloom
+
+    @classmethod
+    def build(cls, site_id, generation):
+        from .models import Redirect
+
+        rows = Redirect.objects.filter(site_id=site_id).values_list(
+            "lookup_path", "subpath_match", "catchall_redirect", "regex_match"
+        )
+        bloom = BloomFilter(
+            rows.count(),
+            getattr(settings, "DJANGOCMS_REDIRECT_BLOOM_ERROR_RATE", 0.01),
+            getattr(settings, "DJANGOCMS_REDIRECT_BLOOM_MAX_BYTES", None),
+        )
+        for lookup_path, subpath_match, catchall_redirect, regex_match in rows.iterator():
+            if regex_match:
+                bloom.add("")
+            elif subpath_match or catchall_redirect:
+                bloom.add(lookup_path[: lookup_path.rfind("/") + 1])
+            else:
+                bloom.add(lookup_path)
+        return cls(site_id, generation, bloom)
+
+    def may_match(self, paths):
+        """Return ``False`` if no redirect of the site can match the given paths."""
+        bloom = self.bloom
+        if "" in bloom:
+            return True
+        for path in paths:
+            if path in bloom:
+                return True
+            start = path.find("/")
+            while start != -1:
+                if path[: start + 1] in bloom:
+                    return True
+                start = path.find("/", start + 1)
+        return False
+
+
+def _get_fresh_filter(site_id, generation):
+    redirect_filter = _filters.get(site_id)
+    if redirect_filter is not None and redirect_filter.generation == generation:
+        return redirect_filter
+
+
+def _build_filter(site_id, generation):
+    with _filters_lock:
+        redirect_filter = _get_fresh_filter(site_id, generation)
+        if redirect_filter is None:
+            redirect_filter = RedirectFilter.build(site_id, generation)
+            _filters[site_id] = redirect_filter
+    return redirect_filter
+
+
+def get_redirect_filter(site_id):
+    """Return the bloom filter of the given site, building it if missing or stale."""
+    generation = get_site_generation(site_id)
+    return _get_fresh_filter(site_id, generation) or _build_filter(site_id, generation)
+
+
+async def aget_redirect_filter(site_id):
+    """Async version of :py:func:`get_redirect_filter`: the filter is built in a thread, if needed."""
+    generation = await aget_site_generation(site_id)
+    redirect_filter = _get_fresh_filter(site_id, generation)
+    if redirect_filter is None:
+        redirect_filter = await sync_to_async(_build_filter)(site_id, generation)
+    return redirect_filter
+
+
+def get_redirect_filters_info():
+    """Return the memory footprint and expected false positive rate of the filters loaded in the current process."""
+    return {
+        site_id: {
+            "items": redirect_filter.bloom.count,
+            "size_bytes": redirect_filter.bloom.size_bytes,
+            "num_hashes": redirect_filter.bloom.num_hashes,
+            "false_positive_rate": redirect_filter.bloom.false_positive_rate,
+        }
+        for site_id, redirect_filter in _filters.items()
+    }
+
+
+def clear_redirect_filters():
+    """Drop all the bloom filters loaded in the current process."""
+    with _filters_lock:
+        _filters.clear()
@@ -0,0 +1,184 @@
+from django.conf import settings
+
+from .utils import get_lookup_path, get_lookup_paths
+
+#: only permanent redirects are flattened, temporary ones may change later
+PERMANENT_CODES = ("301",)
+
+
+def is_enabled():
+    """Return whether redirect chains are flattened when redirects are saved or imported."""
+    return getattr(settings, "DJANGOCMS_REDIRECT_FLATTEN_CHAINS", False)
+
+
+class RedirectGraph:
+    """
+    Exact redirects of a site, as ``lookup_path -> (new_path, response_code)`` edges, to follow redirect chains.
+
+    The graph is either loaded in full with a single query, to follow many chains in memory, or ``lazy``: the
+    edges are then fetched on demand, with one indexed query per hop of the followed chains, and the paths
+    without redirect are remembered as ``None`` edges.
+    """
+
+    def __init__(self, site_id, edges=None, lazy=False):
+        self.site_id = site_id
+        self.edges = edges if edges is not None else {}
+        self.lazy = lazy
+
+    @classmethod
+    def _get_queryset(cls, site_id):
+        from .models import Redirect
+
+        return (
+            Redirect.objects.filter(site_id=site_id, subpath_match=False, catchall_redirect=False, regex_match=False)
+            .exclude(new_path="")
+            .order_by()
+            .values_list("lookup_path", "old_path", "new_path", "response_code")
+        )
+
+    @staticmethod
+    def _add_rows(edges, rows):
+        """Add the edges of the given rows, the first ``old_path`` winning as in the middleware lookups."""
+        old_paths = {}
+        for lookup_path, old_path, new_path, response_code in rows:
+            if lookup_path not in old_paths or old_path < old_paths[lookup_path]:
+                old_paths[lookup_path] = old_path
+                edges[lookup_path] = (new_path, response_code)
+
+    @classmethod
+    def load(cls, site_id):
+        edges = {}
+        cls._add_rows(edges, cls._get_queryset(site_id).iterator())
+        return cls(site_id, edges)
+
+    def _fetch(self, lookup_paths):
+        """Fetch the edges of the given paths not known yet, if the graph is lazy."""
+        missing = [lookup_path for lookup_path in lookup_paths if lookup_path not in self.edges]
+        if self.lazy and missing:
+            self.edges.update(dict.fromkeys(missing))
+            self._add_rows(self.edges, self._get_queryset(self.site_id).filter(lookup_path__in=missing))
+
+    def add(self, old_path, new_path, response_code, exact=True):
+        """Add or replace the edge of a redirect, removing it if the redirect does not lead to another path."""
+        lookup_path = get_lookup_path(old_path)
+        if exact and new_path:
+            self.edges[lookup_path] = (new_path, response_code)
+        else:
+            self.remove(lookup_path)
+
+    def remove(self, lookup_path):
+        """Remove the edge of the given path, also preventing a lazy graph from fetching it."""
+        if self.lazy:
+            self.edges[lookup_path] = None
+        else:
+            self.edges.pop(lookup_path, None)
+
+    def next_hop(self, path, codes=None):
+        """
+        Return the ``lookup_path`` of the exact redirect a request for ``path`` hits, if any.
+
+        Only redirects with one of the given response codes are followed, if ``codes`` is set. Absolute URLs
+        and paths with a querystring or a fragment are never followed.
+        """
+        if not path.startswith("/") or path.startswith("//") or "?" in path or "#" in path:
+            return None
+        # the path as requested by the client, once unquoted by the server
+        variants = get_lookup_paths(get_lookup_path(path))
+        self._fetch(variants)
+        for variant in variants:
+            edge = self.edges.get(variant)
+            if edge:
+                if codes is None or edge[1] in codes:
+                    return variant
+                return None
+
+    def resolve(self, new_path):
+        """
+        Return the final destination of a redirect to ``new_path``, following permanent redirects.
+
+        ``new_path`` is returned unchanged if the chain contains a loop.
+        """
+        path = new_path
+        seen = set()
+        while True:
+            hop = self.next_hop(path, PERMANENT_CODES)
+            if hop is None:
+                return path
+            if hop in seen:
+                return new_path
+            seen.add(hop)
+            path = self.edges[hop][0]
+
+    def find_loop(self, old_path, new_path):
+        """
+        Return the list of paths of the loop created by a redirect from ``old_path`` to ``new_path``.
+
+        The redirect must be already added to the graph. Redirects with any response code are followed.
+        Returns ``None`` if there's no loop.
+        """
+        start = get_lookup_path(old_path)
+        chain = [old_path, new_path]
+        seen = set()
+        path = new_path
+        while True:
+            hop = self.next_hop(path)
+            if hop is None or hop in seen:
+                return None
+            if hop == start:
+                return chain
+            seen.add(hop)
+            path = self.edges[hop][0]
+            chain.append(path)
+
+
+def flatten_redirects(redirects, graph):
+    """
+    Point the given (unsaved) redirects directly to the final destination of their chain.
+
+    The redirects are added to ``graph`` before resolving them, so that chains among the given redirects are
+    flattened regardless of their order. The target of subpath and regular expression redirects depends on the
+    request path, thus it's left unchanged.
+    """
+    for redirect in redirects:
+        graph.add(
+            redirect.old_path,
+            redirect.new_path,
+            redirect.response_code,
+            not (redirect.subpath_match or redirect.catchall_redirect or redirect.regex_match),
+        )
+    for redirect in redirects:
+        if not (redirect.subpath_match or redirect.regex_match):
+            redirect.new_path = graph.resolve(redirect.new_path)
+    return redirects
+
+
+def update_upstream(redirects, graph):
+    """
+    Point the stored redirects which lead to one of the given redirects directly to the final destination.
+
+    Stored redirects are matched on the ``new_path`` with a single query, and updated with a single query.
+    """
+    from .models import Redirect
+
+    targets = set()
+    for redirect in redirects:
+        if (
+            redirect.response_code in PERMANENT_CODES
+            and redirect.new_path
+            and not (redirect.subpath_match or redirect.catchall_redirect or redirect.regex_match)
+        ):
+            targets.update((redirect.old_path, get_lookup_path(redirect.old_path)))
+    if not targets:
+        return 0
+    upstream = []
+    for pk, old_path, new_path in (
+        Redirect.objects.filter(site_id=graph.site_id, new_path__in=targets, subpath_match=False, regex_match=False)
+        .order_by()
+        .values_list("pk", "old_path", "new_path")
+    ):
+        final_path = graph.resolve(new_path)
+        if final_path != new_path and get_lookup_path(final_path) != get_lookup_path(old_path):
+            upstream.append(Redirect(pk=pk, site_id=graph.site_id, new_path=final_path))
+    if upstream:
+        Redirect.objects.bulk_update(upstream, ["new_path"])
+    return len(upstream)
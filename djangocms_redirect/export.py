@@ -0,0 +1,38 @@
+import csv
+import json
+
+#: columns of the exported files, in the format read by the ``import_redirects`` command
+FIELDS = ("site", "old_path", "new_path", "response_code", "subpath_match", "catchall_redirect", "regex_match")
+FORMATS = ("csv", "jsonl")
+CONTENT_TYPES = {"csv": "text/csv", "jsonl": "application/jsonl"}
+
+
+class _Echo:
+    """File-like object returning the written value, to get the lines produced by ``csv.writer``."""
+
+    def write(self, value):
+        return value
+
+
+def iter_redirect_rows(queryset, chunk_size=2000):
+    """
+    Yield the exported values of the redirects in the given queryset.
+
+    Rows are fetched as tuples in chunks of ``chunk_size`` without caching the results, so that the memory
+    used does not depend on the number of redirects.
+    """
+    columns = ["site_id", *FIELDS[1:]]
+    return queryset.order_by("site_id", "old_path").values_list(*columns).iterator(chunk_size=chunk_size)
+
+
+def iter_lines(queryset, file_format="csv", chunk_size=2000):
+    """Yield the lines of the export of the given queryset in the given format."""
+    rows = iter_redirect_rows(queryset, chunk_size)
+    if file_format == "csv":
+        writer = csv.writer(_Echo())
+        yield writer.writerow(FIELDS)
+        for row in rows:
+            yield writer.writerow(row)
+    else:
+        for row in rows:
+            yield json.dumps(dict(zip(FIELDS, row))) + "\n"
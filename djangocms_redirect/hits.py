@@ -0,0 +1,132 @@
+import atexit
+import datetime
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Case, DateTimeField, F, PositiveIntegerField, Value, When
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+#: number of redirects updated by each query
+FLUSH_BATCH_SIZE = 500
+
+_hits = {}
+_hits_lock = threading.Lock()
+_last_flush = time.monotonic()
+
+
+def is_enabled():
+    """Return whether redirect hits are tracked."""
+    return getattr(settings, "DJANGOCMS_REDIRECT_HIT_COUNT", False)
+
+
+def record_hit(redirect_id):
+    """Count a hit of the given redirect in the process buffer, without any database or cache access."""
+    now = time.time()
+    with _hits_lock:
+        entry = _hits.get(redirect_id)
+        if entry is None:
+            _hits[redirect_id] = [1, now]
+        else:
+            entry[0] += 1
+            entry[1] = now
+
+
+def get_pending_hits():
+    """Return a copy of the hits not yet written to the database, as ``{redirect id: (count, timestamp)}``."""
+    with _hits_lock:
+        return {redirect_id: tuple(entry) for redirect_id, entry in _hits.items()}
+
+
+def clear_hits():
+    """Drop the hits not yet written to the database."""
+    _take_hits()
+
+
+def _take_hits():
+    global _hits
+    with _hits_lock:
+        hits, _hits = _hits, {}
+    return hits
+
+
+def _restore_hits(hits):
+    with _hits_lock:
+        for redirect_id, (count, timestamp) in hits.items():
+            entry = _hits.setdefault(redirect_id, [0, timestamp])
+            entry[0] += count
+            entry[1] = max(entry[1], timestamp)
+
+
+def _to_datetime(timestamp):
+    value = datetime.datetime.fromtimestamp(timestamp, tz=datetime.timezone.utc)
+    return value if settings.USE_TZ else timezone.make_naive(value)
+
+
+def flush_hits():
+    """
+    Add the buffered hits to ``hit_count`` and update ``last_hit`` of the hit redirects.
+
+    Redirects are updated in batches of :py:data:`FLUSH_BATCH_SIZE` with a single ``UPDATE`` query each, which
+    does not invalidate the redirects cache. If writing fails the hits are kept in the buffer for the next flush.
+    Return the number of updated redirects.
+    """
+    from .models import Redirect
+
+    hits = _take_hits()
+    redirect_ids = sorted(hits)
+    try:
+        for start in range(0, len(redirect_ids), FLUSH_BATCH_SIZE):
+            batch = redirect_ids[start : start + FLUSH_BATCH_SIZE]
+            counts = [When(pk=redirect_id, then=Value(hits[redirect_id][0])) for redirect_id in batch]
+            timestamps = [
+                When(pk=redirect_id, then=Value(_to_datetime(hits[redirect_id][1]))) for redirect_id in batch
+            ]
+            Redirect.objects.filter(pk__in=batch).update(
+                hit_count=F("hit_count") + Case(*counts, output_field=PositiveIntegerField()),
+                last_hit=Case(*timestamps, output_field=DateTimeField()),
+            )
+            for redirect_id in batch:
+                del hits[redirect_id]
+    except Exception:
+        logger.exception("Error writing the hits of %s redirects", len(hits))
+        _restore_hits(hits)
+        return len(redirect_ids) - len(hits)
+    return len(redirect_ids)
+
+
+def _flush_in_thread():
+    try:
+        flush_hits()
+    finally:
+        connections.close_all()
+
+
+def _flush_at_exit():
+    """Write the buffered hits when the process exits, as the next flush would only come with a request."""
+    if _hits and is_enabled():
+        flush_hits()
+
+
+atexit.register(_flush_at_exit)
+
+
+def schedule_flush(executor):
+    """
+    Flush the buffered hits in the given executor, if ``DJANGOCMS_REDIRECT_HIT_FLUSH_INTERVAL`` seconds elapsed
+    since the last flush of the current process.
+    """
+    global _last_flush
+    now = time.monotonic()
+    if now - _last_flush < getattr(settings, "DJANGOCMS_REDIRECT_HIT_FLUSH_INTERVAL", 60):
+        return False
+    with _hits_lock:
+        if now - _last_flush < getattr(settings, "DJANGOCMS_REDIRECT_HIT_FLUSH_INTERVAL", 60) or not _hits:
+            return False
+        _last_flush = now
+    executor.submit(_flush_in_thread)
+    return True
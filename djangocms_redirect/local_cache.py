@@ -0,0 +1,44 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class LocalCache:
+    """
+    Thread-safe in-process LRU cache bounded in size and entries lifetime.
+
+    Each entry is stored with the redirects generation of its site, and it's considered a miss if the generation
+    changed, to stay coherent with changes done in other processes.
+    """
+
+    def __init__(self, max_size, timeout):
+        self.max_size = max_size
+        self.timeout = timeout
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, generation):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at, entry_generation = entry
+            if entry_generation != generation or expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, generation):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.timeout, generation)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
@@ -0,0 +1,56 @@
+import os
+import time
+
+from django.conf import settings
+from django.contrib.sites.models import Site
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from ...snapshot import get_snapshot_path, write_snapshot
+
+
+class Command(BaseCommand):
+    help = (
+        "Write the redirects of each site to the snapshot files memory mapped by the workers. Files are only "
+        "rewritten when the redirects of the site changed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--directory", help="Directory the snapshots are written to (default: DJANGOCMS_REDIRECT_SNAPSHOT_DIR)"
+        )
+        parser.add_argument("--site", type=int, action="append", help="Only write the snapshot of the given site")
+        parser.add_argument(
+            "--force", action="store_true", help="Rewrite the files even if the redirects are unchanged"
+        )
+        parser.add_argument(
+            "--interval", type=float, help="Keep running, checking the redirects for changes every given seconds"
+        )
+
+    def handle(self, *args, **options):
+        directory = options["directory"] or getattr(settings, "DJANGOCMS_REDIRECT_SNAPSHOT_DIR", None)
+        if not directory:
+            raise CommandError("Set DJANGOCMS_REDIRECT_SNAPSHOT_DIR or pass --directory")
+        if not os.path.isdir(directory):
+            raise CommandError("{} is not a directory".format(directory))
+        if options["interval"] is not None and options["interval"] <= 0:
+            raise CommandError("--interval must be a positive number")
+        force = options["force"]
+        while True:
+            self._write(directory, options["site"], force)
+            if options["interval"] is None:
+                return
+            force = False
+            time.sleep(options["interval"])
+            close_old_connections()
+
+    def _write(self, directory, site_ids, force):
+        for site_id in site_ids or Site.objects.order_by("pk").values_list("pk", flat=True):
+            start = time.perf_counter()
+            written = write_snapshot(site_id, directory, force)
+            if written is not None:
+                self.stdout.write(
+                    "Site {}: {} redirects written to {} in {:.2f} seconds".format(
+                        site_id, written, get_snapshot_path(site_id, directory), time.perf_counter() - start
+                    )
+                )
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from ...export import FORMATS, iter_lines
+from ...models import Redirect
+
+
+class Command(BaseCommand):
+    help = "Export redirects to a CSV or JSON Lines file which can be loaded back with import_redirects."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--output", "-o", default="-", help="Destination file, '-' for standard output")
+        parser.add_argument("--format", choices=FORMATS, help="File format (default: guessed from --output, or csv)")
+        parser.add_argument("--site", type=int, action="append", help="Only export the redirects of the given site")
+        parser.add_argument("--chunk-size", type=int, default=2000, help="Number of rows fetched per query")
+
+    def handle(self, *args, **options):
+        output = options["output"]
+        file_format = options["format"] or ("jsonl" if output.endswith((".jsonl", ".json")) else "csv")
+        if options["chunk_size"] < 1:
+            raise CommandError("--chunk-size must be a positive number")
+        queryset = Redirect.objects.all()
+        if options["site"]:
+            queryset = queryset.filter(site_id__in=options["site"])
+
+        exported = -1 if file_format == "csv" else 0
+        lines = iter_lines(queryset, file_format, options["chunk_size"])
+        if output == "-":
+            for line in lines:
+                self.stdout.write(line, ending="")
+                exported += 1
+            return
+        with open(output, "w", encoding="utf-8", newline="") as stream:
+            for line in lines:
+                stream.write(line)
+                exported += 1
+        self.stderr.write("Exported {} redirects to {}".format(max(exported, 0), output))
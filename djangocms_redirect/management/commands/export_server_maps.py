@@ -0,0 +1,66 @@
+import os
+import shlex
+import subprocess
+import time
+
+from django.contrib.sites.models import Site
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from ...server_maps import FORMATS, export_site_maps
+
+
+class Command(BaseCommand):
+    help = (
+        "Write the redirects of each site to nginx map and Apache RewriteMap files, so that the web server serves "
+        "them without reaching Django. Files are only rewritten when the redirects of the site changed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("output_dir", help="Directory the map files are written to")
+        parser.add_argument(
+            "--format", choices=FORMATS, action="append", help="File format to write (default: all of them)"
+        )
+        parser.add_argument("--site", type=int, action="append", help="Only export the redirects of the given site")
+        parser.add_argument(
+            "--force", action="store_true", help="Rewrite the files even if the redirects are unchanged"
+        )
+        parser.add_argument(
+            "--interval", type=float, help="Keep running, checking the redirects for changes every given seconds"
+        )
+        parser.add_argument(
+            "--reload-command", help="Command run after any file content changed (e.g. 'nginx -s reload')"
+        )
+
+    def handle(self, *args, **options):
+        if not os.path.isdir(options["output_dir"]):
+            raise CommandError("{} is not a directory".format(options["output_dir"]))
+        if options["interval"] is not None and options["interval"] <= 0:
+            raise CommandError("--interval must be a positive number")
+        force = options["force"]
+        while True:
+            self._export(options, force)
+            if options["interval"] is None:
+                return
+            force = False
+            time.sleep(options["interval"])
+            close_old_connections()
+
+    def _export(self, options, force):
+        site_ids = options["site"] or list(Site.objects.order_by("pk").values_list("pk", flat=True))
+        formats = options["format"] or FORMATS
+        changed = False
+        for site_id in site_ids:
+            states, skipped = export_site_maps(site_id, options["output_dir"], formats, force)
+            if skipped is None:
+                continue
+            changed = changed or "written" in states.values()
+            self.stdout.write(
+                "Site {}: {} ({} redirects skipped)".format(
+                    site_id, ", ".join("{} {}".format(*item) for item in states.items()), skipped
+                )
+            )
+        if changed and options["reload_command"]:
+            result = subprocess.run(shlex.split(options["reload_command"]))
+            if result.returncode:
+                self.stderr.write("Reload command failed with exit status {}".format(result.returncode))
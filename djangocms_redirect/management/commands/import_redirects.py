@@ -0,0 +1,196 @@
+import csv
+import json
+import re
+import sys
+import time
+
+import django
+from django.conf import settings
+from django.contrib.sites.models import Site
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from ... import chains
+from ...models import RESPONSE_CODES, Redirect
+from ...utils import normalize_url
+
+FIELDS = ("old_path", "new_path", "response_code", "subpath_match", "catchall_redirect", "regex_match")
+TRUE_VALUES = ("1", "true", "yes", "y", "t")
+
+
+class Command(BaseCommand):
+    help = "Import redirects from a CSV or JSON Lines file, creating or updating them in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="File to import, '-' to read from standard input")
+        parser.add_argument(
+            "--format", choices=("csv", "jsonl"), help="File format (default: guessed from the file extension)"
+        )
+        parser.add_argument("--site", type=int, help="Site id for rows without a site column (default: SITE_ID)")
+        parser.add_argument("--batch-size", type=int, default=1000, help="Number of rows written per query")
+
+    def handle(self, *args, **options):
+        file_format = options["format"] or ("jsonl" if options["path"].endswith((".jsonl", ".json")) else "csv")
+        self.default_site = options["site"] or settings.SITE_ID
+        self.verbosity = options["verbosity"]
+        self.valid_codes = {code for code, _label in RESPONSE_CODES}
+        self.max_lengths = {name: Redirect._meta.get_field(name).max_length for name in ("old_path", "new_path")}
+        # redirect graph of each site, loaded once and kept up to date, to flatten redirect chains
+        self.graphs = {}
+        batch_size = options["batch_size"]
+        if batch_size < 1:
+            raise CommandError("--batch-size must be a positive number")
+
+        imported = errors = 0
+        start = time.perf_counter()
+        try:
+            stream = sys.stdin if options["path"] == "-" else open(options["path"], encoding="utf-8", newline="")
+        except OSError as e:
+            raise CommandError("Can't read {}: {}".format(options["path"], e.strerror))
+        try:
+            batch = []
+            for line_number, row in self._read_rows(stream, file_format):
+                redirect = self._make_redirect(line_number, row)
+                if redirect is None:
+                    errors += 1
+                    continue
+                batch.append((line_number, redirect))
+                if len(batch) >= batch_size:
+                    imported, errors = self._flush(batch, imported, errors, start)
+                    batch = []
+            if batch:
+                imported, errors = self._flush(batch, imported, errors, start)
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            "Imported {} redirects in {:.2f} seconds ({:.0f} redirects/s), {} rows skipped".format(
+                imported, elapsed, imported / elapsed if elapsed else 0, errors
+            )
+        )
+
+    def _read_rows(self, stream, file_format):
+        if file_format == "csv":
+            # line 1 is the header
+            yield from enumerate(csv.DictReader(stream), start=2)
+            return
+        for line_number, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                row = e
+            yield line_number, row
+
+    def _error(self, line_number, message):
+        self.stderr.write("Line {}: {}".format(line_number, message))
+
+    def _make_redirect(self, line_number, row):
+        """Validate and normalize a row, returning the unsaved redirect, or ``None`` if the row is invalid."""
+        if not isinstance(row, dict):
+            self._error(line_number, "invalid row ({})".format(row))
+            return None
+        old_path = str(row.get("old_path") or "").strip()
+        if not old_path:
+            self._error(line_number, "old_path is required")
+            return None
+        values = {
+            "old_path": old_path,
+            "new_path": str(row.get("new_path") or "").strip(),
+            "response_code": str(row.get("response_code") or RESPONSE_CODES[0][0]).strip(),
+            "subpath_match": self._to_bool(row.get("subpath_match")),
+            "catchall_redirect": self._to_bool(row.get("catchall_redirect")),
+            "regex_match": self._to_bool(row.get("regex_match")),
+        }
+        if values["regex_match"]:
+            if values["subpath_match"] or values["catchall_redirect"]:
+                self._error(line_number, "Regular expression redirects can't be subpath or catchall redirects.")
+                return None
+            try:
+                re.compile(old_path)
+            except re.error as e:
+                self._error(line_number, "invalid regular expression {} ({})".format(old_path, e))
+                return None
+        else:
+            values["old_path"] = normalize_url(old_path)
+        if values["response_code"] not in self.valid_codes:
+            self._error(line_number, "invalid response_code {}".format(values["response_code"]))
+            return None
+        for name, max_length in self.max_lengths.items():
+            if len(values[name]) > max_length:
+                self._error(line_number, "{} longer than {} characters".format(name, max_length))
+                return None
+        try:
+            site_id = int(row.get("site") or self.default_site)
+        except (TypeError, ValueError):
+            self._error(line_number, "invalid site {}".format(row.get("site")))
+            return None
+        return Redirect(site_id=site_id, **values)
+
+    def _to_bool(self, value):
+        if isinstance(value, str):
+            return value.strip().lower() in TRUE_VALUES
+        return bool(value)
+
+    def _flush(self, batch, imported, errors, start):
+        site_ids = set(
+            Site.objects.filter(pk__in={redirect.site_id for _line, redirect in batch}).values_list("pk", flat=True)
+        )
+        # the last row wins for duplicated paths in the same batch
+        redirects = {}
+        for line_number, redirect in batch:
+            if redirect.site_id not in site_ids:
+                self._error(line_number, "site {} does not exist".format(redirect.site_id))
+                errors += 1
+                continue
+            redirects[(redirect.site_id, redirect.old_path)] = redirect
+        redirects = list(redirects.values())
+        if chains.is_enabled():
+            self._flatten(redirects)
+        self._save(redirects)
+        if chains.is_enabled():
+            for site_id, graph in self.graphs.items():
+                chains.update_upstream([redirect for redirect in redirects if redirect.site_id == site_id], graph)
+        imported += len(redirects)
+        if self.verbosity > 1:
+            elapsed = time.perf_counter() - start
+            self.stdout.write(
+                "{} redirects imported ({:.0f} redirects/s)".format(imported, imported / elapsed if elapsed else 0)
+            )
+        return imported, errors
+
+    def _flatten(self, redirects):
+        for site_id in {redirect.site_id for redirect in redirects}:
+            if site_id not in self.graphs:
+                self.graphs[site_id] = chains.RedirectGraph.load(site_id)
+            chains.flatten_redirects(
+                [redirect for redirect in redirects if redirect.site_id == site_id], self.graphs[site_id]
+            )
+
+    def _save(self, redirects):
+        """Create or update the redirects, invalidating the cache once for the whole batch."""
+        update_fields = ["lookup_path", *FIELDS[1:]]
+        if django.VERSION >= (4, 1):
+            Redirect.objects.bulk_create(
+                redirects, update_conflicts=True, unique_fields=["site", "old_path"], update_fields=update_fields
+            )
+            return
+        with transaction.atomic():
+            existing = {}
+            for site_id in {redirect.site_id for redirect in redirects}:
+                paths = [redirect.old_path for redirect in redirects if redirect.site_id == site_id]
+                for pk, old_path in Redirect.objects.filter(site_id=site_id, old_path__in=paths).values_list(
+                    "pk", "old_path"
+                ):
+                    existing[(site_id, old_path)] = pk
+            to_update = []
+            to_create = []
+            for redirect in redirects:
+                redirect.pk = existing.get((redirect.site_id, redirect.old_path))
+                (to_update if redirect.pk else to_create).append(redirect)
+            if to_create:
+                Redirect.objects.bulk_create(to_create)
+            if to_update:
+                Redirect.objects.bulk_update(to_update, ["old_path", *update_fields])
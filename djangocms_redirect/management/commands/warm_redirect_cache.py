@@ -0,0 +1,99 @@
+import time
+from itertools import groupby
+from operator import itemgetter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from ...middleware import RedirectMiddleware
+from ...models import Redirect
+from ...table import RedirectMatch
+from ...utils import get_key_from_path_and_site, get_lookup_path, get_lookup_paths, get_site_generation
+
+
+class Command(BaseCommand):
+    help = "Store the exact redirects of a site in the redirects cache, so that they are served without queries."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--site", type=int, action="append", help="Site to warm up (default: SITE_ID)")
+        parser.add_argument("--chunk-size", type=int, default=1000, help="Number of redirects cached per query")
+        parser.add_argument(
+            "--paths-file",
+            help="File with one request path per line (e.g. the most hit ones) to look up and cache first",
+        )
+
+    def handle(self, *args, **options):
+        if options["chunk_size"] < 1:
+            raise CommandError("--chunk-size must be a positive number")
+        self.middleware = RedirectMiddleware(lambda request: None)
+        start = time.perf_counter()
+        for site_id in options["site"] or [settings.SITE_ID]:
+            if options["paths_file"]:
+                self.stdout.write(
+                    "Site {}: {} paths looked up".format(site_id, self._warm_paths(site_id, options["paths_file"]))
+                )
+            cached = self._warm_exact(site_id, options["chunk_size"])
+            self.stdout.write("Site {}: {} cache entries stored".format(site_id, cached))
+        self.stdout.write("Cache warmed up in {:.2f} seconds".format(time.perf_counter() - start))
+
+    def _warm_paths(self, site_id, paths_file):
+        """Resolve the listed paths exactly as requests would do, including subpath and catchall redirects."""
+        warmed = 0
+        with open(paths_file, encoding="utf-8") as stream:
+            for line in stream:
+                path = line.strip()
+                if path:
+                    # listed as requested, e.g. in the access logs: unquoted as the server does
+                    paths = get_lookup_paths(get_lookup_path(path))
+                    key = get_key_from_path_and_site(paths[0], site_id)
+                    self.middleware._compute_cached_redirect(key, paths, site_id)
+                    warmed += 1
+        return warmed
+
+    def _warm_exact(self, site_id, chunk_size):
+        generation = get_site_generation(site_id)
+        # the same redirects the middleware exact lookups match, subpath and catchall ones included
+        rows = (
+            Redirect.objects.filter(site_id=site_id, regex_match=False)
+            .order_by("lookup_path")
+            .values_list(
+                "lookup_path", "old_path", "new_path", "response_code", "pk", "subpath_match", "catchall_redirect"
+            )
+            .iterator(chunk_size=chunk_size)
+        )
+        cached = 0
+        chunk = []
+        for _lookup_path, redirects in groupby(rows, key=itemgetter(0)):
+            # the first ``old_path`` wins among the redirects sharing a lookup path, as in the middleware
+            chunk.append(min(redirects, key=itemgetter(1)))
+            if len(chunk) >= chunk_size:
+                cached += self._warm_chunk(chunk, site_id, generation)
+                chunk = []
+        if chunk:
+            cached += self._warm_chunk(chunk, site_id, generation)
+        return cached
+
+    def _warm_chunk(self, chunk, site_id, generation):
+        """
+        Cache a chunk of exact redirects, both for their path and for the same path without the trailing slash.
+
+        The latter is only cached when there's no exact redirect for it, which would take precedence.
+        """
+        entries = {}
+        values = {}
+        for lookup_path, _old_path, new_path, response_code, pk, subpath_match, catchall_redirect in chunk:
+            match_type = "subpath" if subpath_match else "catchall" if catchall_redirect else "exact"
+            redirect = RedirectMatch(new_path, response_code, pk, match_type)
+            values[lookup_path] = self.middleware._get_cached_redirect(redirect, site_id)
+            entries[get_key_from_path_and_site(lookup_path, site_id, generation)] = values[lookup_path]
+        stripped = {path[:-1]: path for path in values if len(path) > 1 and path.endswith("/")}
+        shadowed = set(
+            Redirect.objects.filter(site_id=site_id, lookup_path__in=stripped, regex_match=False).values_list(
+                "lookup_path", flat=True
+            )
+        )
+        for path, lookup_path in stripped.items():
+            if path not in shadowed:
+                entries[get_key_from_path_and_site(path, site_id, generation)] = values[lookup_path]
+        self.middleware._cache_set_many(entries, generation)
+        return len(entries)
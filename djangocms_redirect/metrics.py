@@ -0,0 +1,164 @@
+import bisect
+import threading
+import time
+
+from django.conf import settings
+from django.db import connections, router
+from django.dispatch import Signal
+
+#: sent after each redirect lookup when ``DJANGOCMS_REDIRECT_METRICS`` is enabled, with the ``path``, the ``cache``
+#: outcome, the ``match`` type, the number of database ``queries`` (``None`` if not counted) and the ``duration``
+#: in seconds
+redirect_lookup = Signal()
+
+#: upper bounds of the lookup latency histogram buckets, in seconds
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25)
+#: upper bounds of the database queries per miss histogram buckets
+QUERIES_BUCKETS = (0, 1, 2, 3, 5, 10)
+
+
+def is_enabled():
+    """Return whether redirect lookups are measured."""
+    return getattr(settings, "DJANGOCMS_REDIRECT_METRICS", False)
+
+
+class Histogram:
+    """Cumulative histogram with fixed buckets, in the Prometheus format."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def get_buckets(self):
+        """Return the ``(upper bound, cumulative count)`` pairs of the histogram, ending with ``+Inf``."""
+        bounds = [repr(bound) for bound in self.buckets] + ["+Inf"]
+        cumulative = 0
+        result = []
+        for bound, count in zip(bounds, self.counts):
+            cumulative += count
+            result.append((bound, cumulative))
+        return result
+
+
+class MetricsRegistry:
+    """
+    Counters and histograms of the redirect lookups served by the current process.
+
+    * ``lookups``: lookups by cache outcome: ``hit``, ``negative_hit`` (cached absence of redirect), ``stale``
+      (expired value served while refreshed), ``miss``, ``filtered`` (rejected by the bloom filter), ``snapshot``
+      (resolved on the shared snapshot) or ``table`` (resolved on the in-memory table)
+    * ``matches``: lookups by redirect type: ``exact``, ``subpath``, ``catchall``, ``regex`` or ``none``
+    * ``queries``: histogram of the database queries run by each cache miss
+    * ``latency``: histogram of the lookup duration
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.lookups = {}
+            self.matches = {}
+            self.queries = Histogram(QUERIES_BUCKETS)
+            self.latency = Histogram(LATENCY_BUCKETS)
+
+    def record(self, cache, match, queries, duration):
+        with self._lock:
+            self.lookups[cache] = self.lookups.get(cache, 0) + 1
+            self.matches[match] = self.matches.get(match, 0) + 1
+            if queries is not None and cache == "miss":
+                self.queries.observe(queries)
+            self.latency.observe(duration)
+
+    def render(self):
+        """Return the metrics in the Prometheus text exposition format."""
+        with self._lock:
+            lines = []
+            lines.extend(self._render_counter("lookups", "Redirect lookups by cache outcome.", "cache", self.lookups))
+            lines.extend(self._render_counter("matches", "Redirect lookups by match type.", "match", self.matches))
+            lines.extend(
+                self._render_histogram("miss_queries", "Database queries run by each cache miss.", self.queries)
+            )
+            lines.extend(self._render_histogram("lookup_seconds", "Redirect lookups duration.", self.latency))
+        return "\n".join(lines) + "\n"
+
+    def _render_counter(self, name, help_text, label, values):
+        name = "djangocms_redirect_{}_total".format(name)
+        yield "# HELP {} {}".format(name, help_text)
+        yield "# TYPE {} counter".format(name)
+        for value, count in sorted(values.items()):
+            yield '{}{{{}="{}"}} {}'.format(name, label, value, count)
+
+    def _render_histogram(self, name, help_text, histogram):
+        name = "djangocms_redirect_{}".format(name)
+        yield "# HELP {} {}".format(name, help_text)
+        yield "# TYPE {} histogram".format(name)
+        for bound, count in histogram.get_buckets():
+            yield '{}_bucket{{le="{}"}} {}'.format(name, bound, count)
+        yield "{}_sum {}".format(name, histogram.sum)
+        yield "{}_count {}".format(name, histogram.count)
+
+
+registry = MetricsRegistry()
+
+
+def get_match_type(cached_redirect):
+    if cached_redirect is None or cached_redirect["status_code"] is None:
+        return "none"
+    return cached_redirect.get("match", "unknown")
+
+
+def record(path, cache, cached_redirect, queries, duration):
+    """Record a lookup in the process registry and notify the ``redirect_lookup`` receivers."""
+    match = get_match_type(cached_redirect)
+    if cache == "hit" and match == "none":
+        cache = "negative_hit"
+    registry.record(cache, match, queries, duration)
+    redirect_lookup.send(
+        sender=MetricsRegistry, path=path, cache=cache, match=match, queries=queries, duration=duration
+    )
+
+
+class _QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def measure(lookup, path, site_id):
+    """
+    Run ``lookup(path, site_id)``, which returns the cached redirect value and the cache outcome, and record it.
+
+    Return the cached redirect value.
+    """
+    from .models import Redirect
+
+    counter = _QueryCounter()
+    start = time.perf_counter()
+    with connections[router.db_for_read(Redirect)].execute_wrapper(counter):
+        cached_redirect, cache = lookup(path, site_id)
+    record(path, cache, cached_redirect, counter.count, time.perf_counter() - start)
+    return cached_redirect
+
+
+async def ameasure(lookup, path, site_id):
+    """
+    Async version of :py:func:`measure`.
+
+    Queries are run in worker threads with their own connections, thus they are not counted.
+    """
+    start = time.perf_counter()
+    cached_redirect, cache = await lookup(path, site_id)
+    record(path, cache, cached_redirect, None, time.perf_counter() - start)
+    return cached_redirect
@@ -1,17 +1,59 @@
-from operator import itemgetter
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 
+import django
 from django import http
 from django.apps import apps
 from django.conf import settings
-from django.contrib.sites.shortcuts import get_current_site
 from django.core.cache import cache
 from django.core.exceptions import ImproperlyConfigured
+from django.db import connections
 from django.db.models import Q
+from django.db.models.functions import Length
 from django.utils.deprecation import MiddlewareMixin
-from django.utils.encoding import escape_uri_path, iri_to_uri
+from django.utils.encoding import iri_to_uri
 
+from . import hits, metrics
+from .bloom import aget_redirect_filter, get_redirect_filter
+from .local_cache import LocalCache
 from .models import Redirect
-from .utils import get_key_from_path_and_site
+from .patterns import aget_regex_matcher, get_regex_matcher
+from .snapshot import aget_redirect_snapshot, get_redirect_snapshot
+from .table import RedirectMatch, aget_redirect_table, get_redirect_table, replace_subpath
+from .utils import (
+    aget_site_generation,
+    aincrement_counter,
+    decode_cached_redirect,
+    encode_cached_redirect,
+    get_cache_format,
+    get_key_from_path_and_site,
+    get_lookup_paths,
+    get_path_prefixes,
+    get_site_generation,
+    increment_counter,
+)
+
+#: native async support requires the async cache and ORM interfaces
+ASYNC_SUPPORT = django.VERSION >= (4, 1)
+
+_refresh_executor = None
+_refresh_executor_lock = threading.Lock()
+
+
+def get_refresh_executor():
+    """Return the thread pool used to refresh stale cached redirects."""
+    global _refresh_executor
+    if _refresh_executor is None:
+        with _refresh_executor_lock:
+            if _refresh_executor is None:
+                _refresh_executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, "DJANGOCMS_REDIRECT_REFRESH_WORKERS", 2),
+                    thread_name_prefix="djangocms_redirect",
+                )
+    return _refresh_executor
 
 
 class RedirectMiddleware(MiddlewareMixin):
@@ -22,57 +64,122 @@ class RedirectMiddleware(MiddlewareMixin):
 
     no_site_message = "RedirectFallbackMiddleware requires django.contrib.sites to work."
 
+    #: seconds between checks of the cache while waiting for another request to compute a redirect
+    lock_poll_interval = 0.02
+
     def __init__(self, *args, **kwargs):
         if not apps.is_installed("django.contrib.sites"):
             raise ImproperlyConfigured(self.no_site_message)
         super().__init__(*args, **kwargs)
+        local_cache_size = getattr(settings, "DJANGOCMS_REDIRECT_LOCAL_CACHE_SIZE", 0)
+        if local_cache_size:
+            self.local_cache = LocalCache(
+                local_cache_size, getattr(settings, "DJANGOCMS_REDIRECT_LOCAL_CACHE_TIMEOUT", 60)
+            )
+        else:
+            self.local_cache = None
+        self.excluded_prefixes = tuple(getattr(settings, "DJANGOCMS_REDIRECT_EXCLUDED_PREFIXES", ()))
+        self.excluded_suffixes = tuple(getattr(settings, "DJANGOCMS_REDIRECT_EXCLUDED_SUFFIXES", ()))
+        self.has_excluded_paths = bool(self.excluded_prefixes or self.excluded_suffixes)
+
+    def is_excluded(self, path):
+        """Return whether the path is never redirected, according to the excluded prefixes and suffixes."""
+        return path.startswith(self.excluded_prefixes) or path.endswith(self.excluded_suffixes)
 
     def do_redirect(self, request, response=None):
+        if self.has_excluded_paths and self.is_excluded(request.path):
+            return response
         site_id = int(settings.SITE_ID)
         if getattr(settings, "DJANGOCMS_REDIRECT_404_ONLY", True) and response and response.status_code != 404:
             return response
 
-        req_path = request.path
-        # get the query string
+        if metrics.is_enabled():
+            cached_redirect = metrics.measure(self._lookup, request.path, site_id)
+        else:
+            cached_redirect = self._lookup(request.path, site_id)[0]
+        if cached_redirect is None:
+            return None
+        self._record_hit(cached_redirect)
+        return self._get_response(request, cached_redirect)
+
+    async def ado_redirect(self, request, response=None):
+        """Async version of :py:meth:`do_redirect`, using the async cache and ORM interfaces."""
+        if self.has_excluded_paths and self.is_excluded(request.path):
+            return response
+        site_id = int(settings.SITE_ID)
+        if getattr(settings, "DJANGOCMS_REDIRECT_404_ONLY", True) and response and response.status_code != 404:
+            return response
+
+        if metrics.is_enabled():
+            cached_redirect = await metrics.ameasure(self._alookup, request.path, site_id)
+        else:
+            cached_redirect = (await self._alookup(request.path, site_id))[0]
+        if cached_redirect is None:
+            return None
+        self._record_hit(cached_redirect)
+        return self._get_response(request, cached_redirect)
+
+    def _lookup(self, path, site_id):
+        """
+        Return the cached redirect value for the given request path and how it has been found.
+
+        The latter is one of ``"filtered"`` (rejected by the bloom filter), ``"snapshot"`` (resolved on the shared
+        snapshot), ``"table"`` (resolved on the in-memory table), ``"hit"``, ``"stale"`` (expired value, refreshed
+        in the background) and ``"miss"``.
+        """
+        # request path (already unquoted), and the same with a trailing slash if missing
+        possible_paths = get_lookup_paths(path)
+        if getattr(settings, "DJANGOCMS_REDIRECT_BLOOM_FILTER", False):
+            if not get_redirect_filter(site_id).may_match(possible_paths):
+                return None, "filtered"
+
+        if getattr(settings, "DJANGOCMS_REDIRECT_SNAPSHOT_DIR", None):
+            snapshot = get_redirect_snapshot(site_id)
+            if snapshot is not None:
+                return self._get_cached_redirect(snapshot.resolve(possible_paths), site_id), "snapshot"
+
+        if getattr(settings, "DJANGOCMS_REDIRECT_IN_MEMORY_TABLE", False):
+            r = get_redirect_table(site_id).resolve(possible_paths)
+            return self._get_cached_redirect(r, site_id), "table"
+
+        key = get_key_from_path_and_site(possible_paths[0], site_id)
+        cached_redirect = self._cache_get(key, site_id, possible_paths[0])
+        if not cached_redirect:
+            return self._compute_cached_redirect(key, possible_paths, site_id), "miss"
+        if self._is_stale(cached_redirect):
+            self._schedule_refresh(key, possible_paths, site_id)
+            return cached_redirect, "stale"
+        return cached_redirect, "hit"
+
+    async def _alookup(self, path, site_id):
+        possible_paths = get_lookup_paths(path)
+        if getattr(settings, "DJANGOCMS_REDIRECT_BLOOM_FILTER", False):
+            if not (await aget_redirect_filter(site_id)).may_match(possible_paths):
+                return None, "filtered"
+
+        if getattr(settings, "DJANGOCMS_REDIRECT_SNAPSHOT_DIR", None):
+            snapshot = await aget_redirect_snapshot(site_id)
+            if snapshot is not None:
+                return self._get_cached_redirect(snapshot.resolve(possible_paths), site_id), "snapshot"
+
+        if getattr(settings, "DJANGOCMS_REDIRECT_IN_MEMORY_TABLE", False):
+            r = (await aget_redirect_table(site_id)).resolve(possible_paths)
+            return self._get_cached_redirect(r, site_id), "table"
+
+        generation = await aget_site_generation(site_id)
+        key = get_key_from_path_and_site(possible_paths[0], site_id, generation)
+        cached_redirect = await self._acache_get(key, generation, site_id, possible_paths[0])
+        if not cached_redirect:
+            return await self._acompute_cached_redirect(key, possible_paths, site_id, generation), "miss"
+        if self._is_stale(cached_redirect):
+            await self._aschedule_refresh(key, possible_paths, site_id)
+            return cached_redirect, "stale"
+        return cached_redirect, "hit"
+
+    def _get_response(self, request, cached_redirect):
         querystring = request.META.get("QUERY_STRING", "")
         if querystring:
             querystring = "?%s" % iri_to_uri(querystring)
-        # start with the path as is
-        possible_paths = [req_path]
-        # add the unquoted path if it differs
-        req_path_quoted = escape_uri_path(req_path)
-        if req_path_quoted != req_path:
-            possible_paths.append(req_path_quoted)
-        # if a slash is missing, try to append it
-        if not req_path.endswith("/"):
-            req_path_slash = req_path + "/"
-            possible_paths.append(req_path_slash)
-            req_path_slash_quoted = escape_uri_path(req_path_slash)
-            if req_path_slash_quoted != req_path_slash:
-                possible_paths.append(req_path_slash_quoted)
-
-        current_site = get_current_site(request)
-        r = None
-        key = get_key_from_path_and_site(req_path, site_id)
-        cached_redirect = cache.get(key)
-
-        if not cached_redirect:
-            for path in possible_paths:
-                filters = dict(site=current_site, old_path=path)
-                try:
-                    r = Redirect.objects.get(**filters)
-                    break
-                except Redirect.DoesNotExist:
-                    r = self._match_substring(path)
-                    if r:
-                        break
-
-            cached_redirect = {
-                "site": site_id,
-                "redirect": r.new_path if r else None,
-                "status_code": r.response_code if r else None,
-            }
-            cache.set(key, cached_redirect, timeout=getattr(settings, "DJANGOCMS_REDIRECT_CACHE_TIMEOUT", 3600))
         if cached_redirect["redirect"] == "":
             return self.response_gone_class()
         if cached_redirect["status_code"] == "302":
@@ -82,6 +189,264 @@ class RedirectMiddleware(MiddlewareMixin):
         elif cached_redirect["status_code"] == "410":
             return self.response_gone_class()
 
+    def _get_cached_redirect(self, redirect, site_id):
+        cached_redirect = {
+            "site": site_id,
+            "redirect": redirect.new_path if redirect else None,
+            "status_code": redirect.response_code if redirect else None,
+        }
+        if redirect and hits.is_enabled():
+            cached_redirect["id"] = redirect.pk
+        if redirect and metrics.is_enabled():
+            cached_redirect["match"] = redirect.match_type
+        if getattr(settings, "DJANGOCMS_REDIRECT_CACHE_STALE_TIMEOUT", 0):
+            # soft expiry: after this the value is still served while it's refreshed in the background
+            cached_redirect["expires"] = time.time() + getattr(settings, "DJANGOCMS_REDIRECT_CACHE_TIMEOUT", 3600)
+        return cached_redirect
+
+    def _record_hit(self, cached_redirect):
+        """
+        Count the hit of the served redirect, if ``DJANGOCMS_REDIRECT_HIT_COUNT`` is set.
+
+        Hits are buffered in the process and periodically written to the database in the background.
+        """
+        redirect_id = cached_redirect.get("id")
+        if redirect_id is not None and hits.is_enabled():
+            hits.record_hit(redirect_id)
+            hits.schedule_flush(get_refresh_executor())
+
+    def _is_stale(self, cached_redirect):
+        return cached_redirect.get("expires", float("inf")) < time.time()
+
+    def _cache_get(self, key, site_id, path=None):
+        """Get the cached redirect from the local cache (if enabled), falling back to the shared cache."""
+        if self.local_cache is None:
+            return self._shared_cache_get(key, site_id, path)
+        generation = get_site_generation(site_id)
+        cached_redirect = self.local_cache.get(key, generation)
+        if cached_redirect is None or self._is_stale(cached_redirect):
+            cached_redirect = self._shared_cache_get(key, site_id, path, generation)
+            if cached_redirect:
+                self.local_cache.set(key, cached_redirect, generation)
+        return cached_redirect
+
+    def _use_legacy_fallback(self, path):
+        return (
+            path is not None
+            and getattr(settings, "DJANGOCMS_REDIRECT_CACHE_LEGACY_FALLBACK", False)
+            and get_cache_format() == "compact"
+        )
+
+    def _shared_cache_get(self, key, site_id, path=None, generation=None):
+        """
+        Get the cached redirect of the request path ``path`` from the shared cache.
+
+        With the compact format and ``DJANGOCMS_REDIRECT_CACHE_LEGACY_FALLBACK``, the entry in the legacy format
+        is fetched in the same round-trip, and copied in the compact format if the latter is missing, so that
+        switching format does not empty the cache at once.
+        """
+        if not self._use_legacy_fallback(path):
+            return decode_cached_redirect(cache.get(key))
+        if generation is None:
+            generation = get_site_generation(site_id)
+        legacy_key = get_key_from_path_and_site(path, site_id, generation, cache_format="legacy")
+        values = cache.get_many([key, legacy_key])
+        if key in values:
+            return decode_cached_redirect(values[key])
+        cached_redirect = values.get(legacy_key)
+        if cached_redirect:
+            cache.set(key, encode_cached_redirect(cached_redirect), timeout=self._get_cache_timeout())
+        return cached_redirect
+
+    def _cache_set(self, key, cached_redirect, site_id):
+        self._cache_set_many({key: cached_redirect}, get_site_generation(site_id))
+
+    def _get_cache_timeout(self):
+        timeout = getattr(settings, "DJANGOCMS_REDIRECT_CACHE_TIMEOUT", 3600)
+        return timeout + getattr(settings, "DJANGOCMS_REDIRECT_CACHE_STALE_TIMEOUT", 0)
+
+    def _encode_entries(self, entries):
+        if get_cache_format() == "compact":
+            return {key: encode_cached_redirect(cached_redirect) for key, cached_redirect in entries.items()}
+        return entries
+
+    def _cache_set_many(self, entries, generation):
+        timeout = self._get_cache_timeout()
+        if len(entries) == 1:
+            key, value = next(iter(self._encode_entries(entries).items()))
+            cache.set(key, value, timeout=timeout)
+        else:
+            cache.set_many(self._encode_entries(entries), timeout=timeout)
+        if self.local_cache is not None:
+            for key, cached_redirect in entries.items():
+                self.local_cache.set(key, cached_redirect, generation)
+
+    async def _acache_get(self, key, generation, site_id=None, path=None):
+        if self.local_cache is not None:
+            cached_redirect = self.local_cache.get(key, generation)
+            if cached_redirect is not None and not self._is_stale(cached_redirect):
+                return cached_redirect
+        if self._use_legacy_fallback(path):
+            legacy_key = get_key_from_path_and_site(path, site_id, generation, cache_format="legacy")
+            values = await cache.aget_many([key, legacy_key])
+            cached_redirect = decode_cached_redirect(values.get(key))
+            if cached_redirect is None:
+                cached_redirect = values.get(legacy_key)
+                if cached_redirect:
+                    timeout = self._get_cache_timeout()
+                    await cache.aset(key, encode_cached_redirect(cached_redirect), timeout=timeout)
+        else:
+            cached_redirect = decode_cached_redirect(await cache.aget(key))
+        if cached_redirect and self.local_cache is not None:
+            self.local_cache.set(key, cached_redirect, generation)
+        return cached_redirect
+
+    async def _acache_set_many(self, entries, generation):
+        await cache.aset_many(self._encode_entries(entries), timeout=self._get_cache_timeout())
+        if self.local_cache is not None:
+            for key, cached_redirect in entries.items():
+                self.local_cache.set(key, cached_redirect, generation)
+
+    def _find_redirect(self, paths, site_id):
+        """Look up the redirect for the given paths in the database and return the value to cache."""
+        return self._find_redirects(paths, site_id)[paths[0]]
+
+    def _find_redirects(self, paths, site_id):
+        """
+        Look up the redirect for the request path (``paths[0]``) and its variants in the database.
+
+        Return the values to cache for the request path and for each variant whose redirect is known without
+        further lookups (e.g.: the redirect for ``/path/`` is known once ``/path`` and ``/path/`` are looked up).
+        """
+        exact = self._get_exact_redirects(paths, site_id)
+        prefix_matcher = regex_matcher = None
+        if not self._pick_exact(exact, paths):
+            prefix_matcher = self._get_prefix_matcher(paths, site_id)
+            regex_matcher = self._get_regex_matcher(site_id)
+        return self._resolve_variants(paths, site_id, exact, prefix_matcher, regex_matcher)
+
+    async def _afind_redirects(self, paths, site_id):
+        exact = await self._aget_exact_redirects(paths, site_id)
+        prefix_matcher = regex_matcher = None
+        if not self._pick_exact(exact, paths):
+            prefix_matcher = await self._aget_prefix_matcher(paths, site_id)
+            regex_matcher = await self._aget_regex_matcher(site_id)
+        return self._resolve_variants(paths, site_id, exact, prefix_matcher, regex_matcher)
+
+    def _resolve_variants(self, paths, site_id, exact, prefix_matcher, regex_matcher=None):
+        results = {}
+        for path in paths:
+            # a path is also matched by redirects with a trailing slash appended
+            variants = [variant for variant in paths if variant in (path, path + "/")]
+            redirect = self._pick_exact(exact, variants)
+            if redirect is None:
+                if prefix_matcher is None:
+                    continue
+                redirect = prefix_matcher(variants)
+                if redirect is None and regex_matcher is not None:
+                    redirect = regex_matcher(variants)
+            results[path] = self._get_cached_redirect(redirect, site_id)
+        return results
+
+    def _get_cache_entries(self, key, paths, results, site_id, generation):
+        """Map the looked up redirects to their cache keys, ``key`` being the one of the request path."""
+        entries = {key: results.pop(paths[0])}
+        for path, cached_redirect in results.items():
+            entries[get_key_from_path_and_site(path, site_id, generation)] = cached_redirect
+        return entries
+
+    def _compute_cached_redirect(self, key, paths, site_id):
+        """
+        Look up the redirect in the database and store it in the cache.
+
+        If ``DJANGOCMS_REDIRECT_LOCK_TIMEOUT`` is set, only one request at a time computes the value for a given
+        key: concurrent requests wait up to ``DJANGOCMS_REDIRECT_LOCK_WAIT`` seconds for it to be cached, and
+        compute it themselves only if it's still missing.
+        """
+        lock_key = None
+        lock_timeout = getattr(settings, "DJANGOCMS_REDIRECT_LOCK_TIMEOUT", 0)
+        if lock_timeout:
+            lock_key = "%s:LOCK" % key
+            if not cache.add(lock_key, 1, timeout=lock_timeout):
+                lock_key = None
+                cached_redirect = self._wait_cached_redirect(key)
+                if cached_redirect:
+                    increment_counter("coalesced")
+                    if self.local_cache is not None:
+                        self.local_cache.set(key, cached_redirect, get_site_generation(site_id))
+                    return cached_redirect
+        try:
+            generation = get_site_generation(site_id)
+            entries = self._get_cache_entries(key, paths, self._find_redirects(paths, site_id), site_id, generation)
+            cached_redirect = entries[key]
+            self._cache_set_many(entries, generation)
+        finally:
+            if lock_key:
+                cache.delete(lock_key)
+        return cached_redirect
+
+    async def _acompute_cached_redirect(self, key, paths, site_id, generation):
+        lock_key = None
+        lock_timeout = getattr(settings, "DJANGOCMS_REDIRECT_LOCK_TIMEOUT", 0)
+        if lock_timeout:
+            lock_key = "%s:LOCK" % key
+            if not await cache.aadd(lock_key, 1, timeout=lock_timeout):
+                lock_key = None
+                cached_redirect = await self._await_cached_redirect(key)
+                if cached_redirect:
+                    await aincrement_counter("coalesced")
+                    if self.local_cache is not None:
+                        self.local_cache.set(key, cached_redirect, generation)
+                    return cached_redirect
+        try:
+            results = await self._afind_redirects(paths, site_id)
+            entries = self._get_cache_entries(key, paths, results, site_id, generation)
+            cached_redirect = entries[key]
+            await self._acache_set_many(entries, generation)
+        finally:
+            if lock_key:
+                await cache.adelete(lock_key)
+        return cached_redirect
+
+    def _wait_cached_redirect(self, key):
+        deadline = time.monotonic() + getattr(settings, "DJANGOCMS_REDIRECT_LOCK_WAIT", 0.5)
+        while time.monotonic() < deadline:
+            time.sleep(self.lock_poll_interval)
+            cached_redirect = decode_cached_redirect(cache.get(key))
+            if cached_redirect:
+                return cached_redirect
+
+    async def _await_cached_redirect(self, key):
+        deadline = time.monotonic() + getattr(settings, "DJANGOCMS_REDIRECT_LOCK_WAIT", 0.5)
+        while time.monotonic() < deadline:
+            await asyncio.sleep(self.lock_poll_interval)
+            cached_redirect = decode_cached_redirect(await cache.aget(key))
+            if cached_redirect:
+                return cached_redirect
+
+    def _schedule_refresh(self, key, paths, site_id):
+        """Refresh a stale cached redirect in a background thread, unless another request is already doing it."""
+        lock_key = "%s:REFRESH" % key
+        if cache.add(lock_key, 1, timeout=getattr(settings, "DJANGOCMS_REDIRECT_REFRESH_TIMEOUT", 30)):
+            get_refresh_executor().submit(self._refresh_in_thread, key, paths, site_id)
+
+    async def _aschedule_refresh(self, key, paths, site_id):
+        lock_key = "%s:REFRESH" % key
+        if await cache.aadd(lock_key, 1, timeout=getattr(settings, "DJANGOCMS_REDIRECT_REFRESH_TIMEOUT", 30)):
+            get_refresh_executor().submit(self._refresh_in_thread, key, paths, site_id)
+
+    def _refresh_in_thread(self, key, paths, site_id):
+        try:
+            self._refresh_cached_redirect(key, paths, site_id)
+        finally:
+            connections.close_all()
+
+    def _refresh_cached_redirect(self, key, paths, site_id):
+        try:
+            self._cache_set(key, self._find_redirect(paths, site_id), site_id)
+        finally:
+            cache.delete("%s:REFRESH" % key)
+
     def process_request(self, request):
         if getattr(settings, "DJANGOCMS_REDIRECT_USE_REQUEST", True):
             return self.do_redirect(request)
@@ -94,16 +459,123 @@ class RedirectMiddleware(MiddlewareMixin):
             return redirect
         return response
 
-    def _match_substring(self, original_path):
-        redirects = [
-            (r.old_path, r) for r in Redirect.objects.filter(Q(subpath_match=True) | Q(catchall_redirect=True))
-        ]
-        redirects = sorted(redirects, key=itemgetter(0), reverse=True)
-        for url in redirects:
-            if original_path.startswith(url[0]):
-                redirect = url[1]
-                if redirect.subpath_match:
-                    # we change this in memory only to return the proper redirect object
-                    # without persisting the change
-                    redirect.new_path = original_path.replace(redirect.old_path, redirect.new_path)
+    async def __acall__(self, request):
+        """Handle the request without leaving the event loop, instead of running the sync hooks in a thread."""
+        if not ASYNC_SUPPORT:
+            return await super().__acall__(request)
+        use_request = getattr(settings, "DJANGOCMS_REDIRECT_USE_REQUEST", True)
+        if use_request:
+            redirect = await self.ado_redirect(request)
+            if redirect:
+                return redirect
+        response = await self.get_response(request)
+        if not use_request:
+            redirect = await self.ado_redirect(request, response)
+            if redirect:
+                return redirect
+        return response
+
+    def _get_exact_redirects(self, paths, site_id):
+        """Fetch the exact redirects for all the given lookup paths with a single query."""
+        return self._map_exact(
+            Redirect.objects.filter(site_id=site_id, lookup_path__in=paths, regex_match=False).order_by()
+        )
+
+    async def _aget_exact_redirects(self, paths, site_id):
+        return self._map_exact(
+            [
+                redirect
+                async for redirect in Redirect.objects.filter(
+                    site_id=site_id, lookup_path__in=paths, regex_match=False
+                ).order_by()
+            ]
+        )
+
+    def _map_exact(self, redirects):
+        """
+        Map the redirects by lookup path, the first ``old_path`` winning among the redirects sharing one.
+
+        Redirects are sorted here, as sorting them in the query could make the database scan all the site
+        redirects in ``old_path`` order instead of using the ``(site, lookup_path)`` index.
+        """
+        matches = {}
+        for redirect in redirects:
+            match = matches.get(redirect.lookup_path)
+            if match is None or redirect.old_path < match.old_path:
+                matches[redirect.lookup_path] = redirect
+        return matches
+
+    def _pick_exact(self, matches, paths):
+        """Return the exact redirect of the first path in ``paths`` with a match."""
+        for path in paths:
+            if path in matches:
+                return matches[path]
+
+    def _match_substring(self, paths, site_id):
+        return self._get_prefix_matcher(paths, site_id)(paths)
+
+    def _get_prefix_matcher(self, paths, site_id):
+        """
+        Return a function returning the subpath / catchall redirect matching a subset of ``paths``.
+
+        The first path with a matching redirect wins.
+        """
+        if getattr(settings, "DJANGOCMS_REDIRECT_PREFIX_LOOKUP", "memory") == "database":
+            return partial(self._pick_prefix_database, list(self._get_prefix_queryset(paths, site_id)))
+        return partial(self._pick_prefix, get_redirect_table(site_id, prefix_only=True))
+
+    async def _aget_prefix_matcher(self, paths, site_id):
+        if getattr(settings, "DJANGOCMS_REDIRECT_PREFIX_LOOKUP", "memory") == "database":
+            redirects = [redirect async for redirect in self._get_prefix_queryset(paths, site_id)]
+            return partial(self._pick_prefix_database, redirects)
+        return partial(self._pick_prefix, await aget_redirect_table(site_id, prefix_only=True))
+
+    def _get_regex_matcher(self, site_id):
+        """Return a function returning the regular expression redirect matching a subset of ``paths``."""
+        if getattr(settings, "DJANGOCMS_REDIRECT_PREFIX_LOOKUP", "memory") == "database":
+            return partial(self._pick_regex, get_regex_matcher(site_id))
+        return partial(self._pick_regex, get_redirect_table(site_id, prefix_only=True).patterns)
+
+    async def _aget_regex_matcher(self, site_id):
+        if getattr(settings, "DJANGOCMS_REDIRECT_PREFIX_LOOKUP", "memory") == "database":
+            return partial(self._pick_regex, await aget_regex_matcher(site_id))
+        return partial(self._pick_regex, (await aget_redirect_table(site_id, prefix_only=True)).patterns)
+
+    def _pick_regex(self, matcher, paths):
+        for path in paths:
+            redirect = matcher.match(path)
+            if redirect:
                 return redirect
+
+    def _pick_prefix(self, table, paths):
+        for path in paths:
+            redirect = table.match_prefix(path)
+            if redirect:
+                return redirect
+
+    def _get_prefix_queryset(self, paths, site_id):
+        """
+        Return the query fetching the subpath / catchall redirects matching the paths, longest first and then by
+        ``old_path``, as in the exact lookups.
+
+        Every prefix of the paths (up to the ``lookup_path`` length) is a candidate, to keep matching partial
+        segments as the in-memory lookup does, and the query is resolved on the ``lookup_path`` index.
+        """
+        max_length = Redirect._meta.get_field("lookup_path").max_length
+        prefixes = set()
+        for path in paths:
+            prefixes.update(get_path_prefixes(path, max_length))
+        return (
+            Redirect.objects.filter(site_id=site_id, lookup_path__in=prefixes)
+            .filter(Q(subpath_match=True) | Q(catchall_redirect=True))
+            .order_by(Length("lookup_path").desc(), "old_path")
+            .values_list("lookup_path", "new_path", "response_code", "subpath_match", "pk")
+        )
+
+    def _pick_prefix_database(self, redirects, paths):
+        for path in paths:
+            for lookup_path, new_path, response_code, subpath_match, pk in redirects:
+                if path.startswith(lookup_path):
+                    if subpath_match:
+                        new_path = replace_subpath(path, lookup_path, new_path)
+                    return RedirectMatch(new_path, response_code, pk, "subpath" if subpath_match else "catchall")
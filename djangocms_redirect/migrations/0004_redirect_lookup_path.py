@@ -0,0 +1,42 @@
+from urllib.parse import unquote
+
+from django.db import migrations, models
+
+
+def populate_lookup_path(apps, schema_editor):
+    Redirect = apps.get_model("djangocms_redirect", "Redirect")
+    batch = []
+    for redirect in Redirect.objects.only("pk", "old_path").iterator(chunk_size=2000):
+        # same as djangocms_redirect.utils.get_lookup_path, copied to keep the migration stable
+        path = unquote(redirect.old_path)
+        if not path.startswith("/"):
+            path = "/%s" % path
+        redirect.lookup_path = path
+        batch.append(redirect)
+        if len(batch) >= 2000:
+            Redirect.objects.bulk_update(batch, ["lookup_path"])
+            batch = []
+    if batch:
+        Redirect.objects.bulk_update(batch, ["lookup_path"])
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("djangocms_redirect", "0003_auto_20190810_1009"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="redirect",
+            name="lookup_path",
+            field=models.CharField(
+                db_index=True,
+                default="",
+                editable=False,
+                help_text="Canonical form of the redirect from path, automatically computed on save",
+                max_length=200,
+                verbose_name="lookup path",
+            ),
+        ),
+        migrations.RunPython(populate_lookup_path, migrations.RunPython.noop),
+    ]
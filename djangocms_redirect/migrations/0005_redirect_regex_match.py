@@ -0,0 +1,22 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("djangocms_redirect", "0004_redirect_lookup_path"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="redirect",
+            name="regex_match",
+            field=models.BooleanField(
+                default=False,
+                help_text=(
+                    "If selected the redirect from is a regular expression matched against the beginning of the "
+                    "request path, and the redirect to can reference its groups (e.g. \\1 or \\g<name>)."
+                ),
+                verbose_name="Regular expression",
+            ),
+        ),
+    ]
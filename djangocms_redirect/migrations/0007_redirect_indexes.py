@@ -0,0 +1,80 @@
+import logging
+
+import django.db.models.deletion
+from django.db import DatabaseError, migrations, models, transaction
+
+logger = logging.getLogger(__name__)
+
+# matches the ``UPPER("new_path"::text) LIKE UPPER(...)`` condition of the admin ``icontains`` search
+TRIGRAM_INDEX_SQL = (
+    'CREATE INDEX IF NOT EXISTS "django_redirect_new_path_trgm" ON "django_redirect" '
+    'USING gin ((UPPER("new_path"::text)) gin_trgm_ops)'
+)
+
+
+def create_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    try:
+        with transaction.atomic(using=schema_editor.connection.alias):
+            schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    except DatabaseError:
+        logger.warning("pg_trgm extension not available, the redirect to search index is not created")
+        return
+    schema_editor.execute(TRIGRAM_INDEX_SQL)
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS "django_redirect_new_path_trgm"')
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("djangocms_redirect", "0006_redirect_hits"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="redirect",
+            index=models.Index(fields=["site", "lookup_path"], name="django_redirect_site_lookup"),
+        ),
+        migrations.AddIndex(
+            model_name="redirect",
+            index=models.Index(fields=["site", "new_path"], name="django_redirect_site_new_path"),
+        ),
+        migrations.AddIndex(
+            model_name="redirect",
+            index=models.Index(
+                condition=models.Q(
+                    ("subpath_match", True), ("catchall_redirect", True), ("regex_match", True), _connector="OR"
+                ),
+                fields=["site", "lookup_path"],
+                name="django_redirect_prefix_rules",
+            ),
+        ),
+        # superseded by the indexes above, as lookups are always restricted to a site
+        migrations.AlterField(
+            model_name="redirect",
+            name="lookup_path",
+            field=models.CharField(
+                default="",
+                editable=False,
+                help_text="Canonical form of the redirect from path, automatically computed on save",
+                max_length=200,
+                verbose_name="lookup path",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="redirect",
+            name="site",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                to="sites.site",
+                verbose_name="site",
+            ),
+        ),
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-17 22:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("djangocms_redirect", "0007_redirect_indexes"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="redirect",
+            name="id",
+            field=models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID"),
+        ),
+    ]
@@ -1,13 +1,12 @@
-from urllib.parse import unquote_plus
-
 from django.contrib.sites.models import Site
-from django.core.cache import cache
 from django.db import models
+from django.db.models import Case, Value, When
 from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from django.utils.translation import gettext_lazy as _
 
-from .utils import normalize_url
+from . import chains
+from .utils import bump_site_generation, get_lookup_path, normalize_url
 
 RESPONSE_CODES = (
     ("301", _("301 - Permanent redirection")),
@@ -22,11 +21,119 @@ RESPONSE_CODES = (
 )
 
 
+class RedirectQuerySet(models.QuerySet):
+    """
+    Keep ``lookup_path`` and the redirects cache consistent on bulk operations, which skip ``Redirect.save``
+    and the model signals.
+    """
+
+    #: usage statistics, which do not affect the redirects and do not invalidate the cache
+    stats_fields = frozenset(("hit_count", "last_hit"))
+
+    def _bump_generations(self, site_ids):
+        for site_id in set(site_ids):
+            bump_site_generation(site_id)
+
+    def _get_chunks(self, pks):
+        # plain queryset: the filters of this one may not match the updated rows anymore
+        queryset = models.QuerySet(self.model, using=self.db)
+        for start in range(0, len(pks), 2000):
+            yield queryset.filter(pk__in=pks[start : start + 2000])
+
+    def _update_lookup_paths(self, pks):
+        """Recompute ``lookup_path`` of the given redirects, after ``old_path`` or ``regex_match`` changed."""
+        for chunk in self._get_chunks(pks):
+            redirects = list(chunk.only("old_path", "regex_match"))
+            for redirect in redirects:
+                redirect.lookup_path = redirect.get_lookup_path()
+            chunk.bulk_update(redirects, ["lookup_path"])
+
+    def _get_site_ids(self, pks):
+        """Return the sites of the given redirects, after the site has been updated with an expression."""
+        site_ids = set()
+        for chunk in self._get_chunks(pks):
+            site_ids.update(chunk.values_list("site_id", flat=True).order_by().distinct())
+        return site_ids
+
+    def update(self, **kwargs):
+        if not set(kwargs) - self.stats_fields:
+            return super().update(**kwargs)
+        compute_lookup_paths = False
+        old_path = kwargs.get("old_path")
+        regex_match = kwargs.get("regex_match")
+        if "lookup_path" in kwargs:
+            # already computed by the caller, e.g. bulk_update
+            pass
+        elif regex_match is True:
+            kwargs["lookup_path"] = ""
+        elif isinstance(old_path, str) and "regex_match" not in kwargs:
+            # regular expression redirects keep an empty lookup path
+            kwargs["lookup_path"] = Case(
+                When(regex_match=True, then=Value("")), default=Value(get_lookup_path(old_path))
+            )
+        elif isinstance(old_path, str) and regex_match is False:
+            kwargs["lookup_path"] = get_lookup_path(old_path)
+        elif "old_path" in kwargs or "regex_match" in kwargs:
+            compute_lookup_paths = True
+        moved = "site" in kwargs or "site_id" in kwargs
+        site = kwargs.get("site", kwargs.get("site_id"))
+        # sites set with an expression (e.g. by bulk_update) are read back after the update
+        site_expression = moved and not isinstance(site, (int, Site))
+        pks = None
+        if compute_lookup_paths or site_expression:
+            # computed from expressions or from the stored values: collected before the update, which may change
+            # the rows matching the filters
+            pks = list(self.values_list("pk", flat=True))
+        site_ids = set(self.values_list("site_id", flat=True).order_by().distinct())
+        rows = super().update(**kwargs)
+        if compute_lookup_paths:
+            self._update_lookup_paths(pks)
+        if site_expression:
+            site_ids.update(self._get_site_ids(pks))
+        elif moved:
+            site_ids.add(getattr(site, "pk", site))
+        self._bump_generations(site_ids)
+        return rows
+
+    update.alters_data = True
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        for obj in objs:
+            obj.lookup_path = obj.get_lookup_path()
+        objs = super().bulk_create(objs, *args, **kwargs)
+        self._bump_generations(obj.site_id for obj in objs)
+        return objs
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        objs = list(objs)
+        site_ids = set()
+        if "site" in fields or "site_id" in fields:
+            # sites the redirects are moved from
+            site_ids.update(self.filter(pk__in=[obj.pk for obj in objs]).values_list("site_id", flat=True))
+        if "old_path" in fields or "regex_match" in fields:
+            fields = list(fields) + ["lookup_path"]
+            for obj in objs:
+                obj.lookup_path = obj.get_lookup_path()
+        rows = super().bulk_update(objs, fields, *args, **kwargs)
+        site_ids.update(obj.site_id for obj in objs)
+        self._bump_generations(site_ids)
+        return rows
+
+
 class Redirect(models.Model):
-    site = models.ForeignKey(Site, verbose_name=_("site"), on_delete=models.CASCADE)
+    # the (site, old_path) constraint and the indexes below all start with the site
+    site = models.ForeignKey(Site, verbose_name=_("site"), on_delete=models.CASCADE, db_index=False)
     old_path = models.CharField(
         _("redirect from"), max_length=200, db_index=True, help_text=_("Select a Page or write an url")
     )
+    lookup_path = models.CharField(
+        _("lookup path"),
+        max_length=200,
+        editable=False,
+        default="",
+        help_text=_("Canonical form of the redirect from path, automatically computed on save"),
+    )
     new_path = models.CharField(
         _("redirect to"), max_length=200, blank=True, help_text=_("Select a Page or write an url")
     )
@@ -55,6 +162,22 @@ class Redirect(models.Model):
             "If selected all the pages starting with the given string will be redirected to the " "given redirect path"
         ),
     )
+    regex_match = models.BooleanField(
+        _("Regular expression"),
+        default=False,
+        help_text=_(
+            "If selected the redirect from is a regular expression matched against the beginning of the "
+            "request path, and the redirect to can reference its groups (e.g. \\1 or \\g<name>)."
+        ),
+    )
+
+    hit_count = models.PositiveIntegerField(_("hits"), default=0, editable=False)
+    last_hit = models.DateTimeField(_("last hit"), null=True, blank=True, editable=False)
+
+    objects = RedirectQuerySet.as_manager()
+
+    #: fields changing the redirect chains, which are flattened only when one of them is saved
+    chain_fields = frozenset(("site", "old_path", "new_path", "response_code"))
 
     class Meta:
         verbose_name = _("redirect")
@@ -62,11 +185,67 @@ class Redirect(models.Model):
         db_table = "django_redirect"
         unique_together = (("site", "old_path"),)
         ordering = ("old_path",)
+        indexes = [
+            # exact lookups
+            models.Index(fields=["site", "lookup_path"], name="django_redirect_site_lookup"),
+            # redirects pointing to a path, for chains flattening
+            models.Index(fields=["site", "new_path"], name="django_redirect_site_new_path"),
+            # subpath / catchall lookups and rules loading, limited to the (usually few) non exact redirects
+            models.Index(
+                fields=["site", "lookup_path"],
+                condition=models.Q(subpath_match=True) | models.Q(catchall_redirect=True) | models.Q(regex_match=True),
+                name="django_redirect_prefix_rules",
+            ),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # site the redirect is stored with, invalidated as well if the redirect is moved to another site
+        instance._loaded_site_id = instance.__dict__.get("site_id")
+        return instance
 
     def clean(self):
-        self.old_path = normalize_url(self.old_path)
+        if not self.regex_match:
+            self.old_path = normalize_url(self.old_path)
         super().clean()
 
+    def get_lookup_path(self):
+        """Return the canonical path matched by the redirect, empty for regular expression redirects."""
+        if self.regex_match:
+            return ""
+        return get_lookup_path(self.old_path)
+
+    @property
+    def match_type(self):
+        """Kind of rule of the redirect: ``exact``, ``subpath``, ``catchall`` or ``regex``."""
+        if self.regex_match:
+            return "regex"
+        if self.subpath_match:
+            return "subpath"
+        if self.catchall_redirect:
+            return "catchall"
+        return "exact"
+
+    def save(self, *args, **kwargs):
+        self.lookup_path = self.get_lookup_path()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and {"old_path", "regex_match"} & set(update_fields):
+            kwargs["update_fields"] = set(update_fields) | {"lookup_path"}
+        # graph built while validating the redirect in the admin, if any
+        graph = self.__dict__.pop("_redirect_graph", None)
+        if not chains.is_enabled() or (update_fields is not None and not self.chain_fields & set(update_fields)):
+            graph = None
+        elif graph is None or graph.site_id != self.site_id:
+            graph = chains.RedirectGraph(self.site_id, lazy=True)
+        if graph is not None:
+            chains.flatten_redirects([self], graph)
+            if update_fields is not None:
+                kwargs["update_fields"] = set(kwargs["update_fields"]) | {"new_path"}
+        super().save(*args, **kwargs)
+        if graph is not None:
+            chains.update_upstream([self], graph)
+
     def __str__(self):
         return "{} ---> {}".format(self.old_path, self.new_path)
 
@@ -74,8 +253,9 @@ class Redirect(models.Model):
 @receiver(post_save, sender=Redirect)
 @receiver(post_delete, sender=Redirect)
 def clear_redirect_cache(**kwargs):
-    from .utils import get_key_from_path_and_site
-
-    path = unquote_plus(kwargs["instance"].old_path)
-    key = get_key_from_path_and_site(path, kwargs["instance"].site_id)
-    cache.delete(key)
+    instance = kwargs["instance"]
+    bump_site_generation(instance.site_id)
+    loaded_site_id = getattr(instance, "_loaded_site_id", None)
+    if loaded_site_id is not None and loaded_site_id != instance.site_id:
+        bump_site_generation(loaded_site_id)
+    instance._loaded_site_id = instance.site_id
@@ -0,0 +1,222 @@
+import logging
+import re
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from .table import RedirectMatch
+from .utils import aget_site_generation, get_site_generation
+
+logger = logging.getLogger(__name__)
+
+_matchers = {}
+_matchers_lock = threading.Lock()
+
+#: backreferences and global inline flags change meaning (or are invalid) once merged in an alternation
+_UNMERGEABLE = re.compile(r"\\[1-9]|\(\?P=|\(\?[aiLmsux]+\)")
+_SPECIAL = re.compile(r"[.^$*+?{}\[\]\\|()]")
+
+
+def get_literal_prefix(pattern):
+    """Return the literal text all the paths matched by ``pattern`` start with (possibly empty)."""
+    if "|" in pattern:
+        return ""
+    if pattern.startswith("^"):
+        pattern = pattern[1:]
+    special = _SPECIAL.search(pattern)
+    if special is None:
+        return pattern
+    prefix = pattern[: special.start()]
+    if special.group() in "*?{":
+        # the quantifier applies to the last literal character
+        prefix = prefix[:-1]
+    return prefix
+
+
+def get_bucket(path):
+    """Return the first segment of the path with its slashes (e.g. ``/blog/``), or ``""`` if it has one segment."""
+    return path[: path.find("/", 1) + 1]
+
+
+class RegexMatcher:
+    """
+    Compiled regular expression redirects of a site.
+
+    Patterns are matched against the start of the path, as ``re.match`` does, and the one with the lowest
+    priority wins. They are grouped by the first segment of their literal prefix, so that paths are only
+    checked against the patterns which can match them (and the ones without a literal segment), and each group
+    is compiled into alternations of up to ``chunk_size`` patterns, so that a single regular expression
+    evaluation checks many patterns at once.
+    """
+
+    chunk_size = 100
+
+    def __init__(self):
+        self.rules = []
+        #: compiled pattern of each rule, ``None`` for invalid ones
+        self.compiled = []
+        self.buckets = {}
+
+    def __len__(self):
+        return len(self.rules)
+
+    def add(self, priority, pattern, new_path, response_code):
+        self.rules.append((priority, pattern, new_path, response_code))
+
+    def compile(self):
+        """Compile the added patterns: invalid ones are logged and skipped."""
+        self.rules.sort(key=lambda rule: rule[0])
+        self.compiled = [None] * len(self.rules)
+        grouped = {}
+        for index, (_priority, pattern, _new_path, _response_code) in enumerate(self.rules):
+            try:
+                self.compiled[index] = re.compile(pattern)
+            except re.error as e:
+                logger.warning("Skipping invalid redirect pattern %r: %s", pattern, e)
+                continue
+            grouped.setdefault(get_bucket(get_literal_prefix(pattern)), []).append(index)
+        self.buckets = {bucket: self._compile_chunks(indexes) for bucket, indexes in grouped.items()}
+        return self
+
+    def _compile_chunks(self, indexes):
+        chunks = []
+        chunk = []
+        for index in indexes:
+            if _UNMERGEABLE.search(self.rules[index][1]):
+                chunks.extend(self._compile_chunk(chunk))
+                chunks.extend(self._compile_chunk([index]))
+                chunk = []
+                continue
+            chunk.append(index)
+            if len(chunk) >= self.chunk_size:
+                chunks.extend(self._compile_chunk(chunk))
+                chunk = []
+        chunks.extend(self._compile_chunk(chunk))
+        return chunks
+
+    def _compile_chunk(self, indexes):
+        """
+        Return the list of ``(regex, indexes)`` pairs of a chunk of patterns.
+
+        If the patterns can't be merged (e.g. they define the same group name) the chunk is split in halves.
+        """
+        if len(indexes) == 1:
+            return [(self.compiled[indexes[0]], indexes)]
+        if not indexes:
+            return []
+        try:
+            regex = re.compile("|".join("(?P<r{}>{})".format(index, self.rules[index][1]) for index in indexes))
+        except re.error:
+            middle = len(indexes) // 2
+            return self._compile_chunk(indexes[:middle]) + self._compile_chunk(indexes[middle:])
+        return [(regex, indexes)]
+
+    def _match_bucket(self, bucket, path, best, deadline):
+        for regex, indexes in self.buckets.get(bucket, ()):
+            if best is not None and indexes[0] > best:
+                break
+            match = regex.match(path)
+            if match:
+                # the wrapping group of each merged pattern is the last one to be closed
+                index = int(match.lastgroup[1:]) if len(indexes) > 1 else indexes[0]
+                return index if best is None else min(index, best)
+            if deadline and time.perf_counter() > deadline:
+                raise TimeoutError
+        return best
+
+    def match(self, path):
+        """
+        Return the redirect of the first pattern matching the path, with the groups references expanded.
+
+        If matching takes more than ``DJANGOCMS_REDIRECT_REGEX_TIMEOUT`` seconds, the lookup is aborted and
+        ``None`` is returned. The timeout is checked between alternations, thus it can't stop a single pattern
+        with catastrophic backtracking.
+        """
+        if not self.rules:
+            return None
+        timeout = getattr(settings, "DJANGOCMS_REDIRECT_REGEX_TIMEOUT", 0.05)
+        deadline = time.perf_counter() + timeout if timeout else None
+        try:
+            best = self._match_bucket(get_bucket(path), path, None, deadline)
+            if get_bucket(path):
+                best = self._match_bucket("", path, best, deadline)
+        except TimeoutError:
+            logger.warning("Redirect patterns matching of %r aborted after %s seconds", path, timeout)
+            return None
+        if best is None:
+            return None
+        priority, pattern, new_path, response_code = self.rules[best]
+        try:
+            # the compiled pattern is kept, as the re module cache is too small for large sets of redirects
+            new_path = self.compiled[best].match(path).expand(new_path)
+        except (re.error, IndexError) as e:
+            logger.warning("Invalid redirect to %r for pattern %r: %s", new_path, pattern, e)
+            return None
+        # redirects are registered with their primary key as priority
+        return RedirectMatch(new_path, response_code, priority, "regex")
+
+
+class RegexRules:
+    """Regular expression redirects of a site, loaded for the ``"database"`` prefix lookup."""
+
+    def __init__(self, site_id, generation, matcher):
+        self.site_id = site_id
+        self.generation = generation
+        self.matcher = matcher
+
+    @classmethod
+    def build(cls, site_id, generation):
+        from .models import Redirect
+
+        matcher = RegexMatcher()
+        # rules are sorted by priority on compile
+        rows = (
+            Redirect.objects.filter(site_id=site_id, regex_match=True)
+            .order_by()
+            .values_list("pk", "old_path", "new_path", "response_code")
+        )
+        for row in rows.iterator():
+            matcher.add(*row)
+        return cls(site_id, generation, matcher.compile())
+
+
+def _get_fresh_matcher(site_id, generation):
+    rules = _matchers.get(site_id)
+    if rules is not None and rules.generation == generation:
+        return rules.matcher
+
+
+def _build_matcher(site_id, generation):
+    with _matchers_lock:
+        matcher = _get_fresh_matcher(site_id, generation)
+        if matcher is None:
+            rules = RegexRules.build(site_id, generation)
+            _matchers[site_id] = rules
+            matcher = rules.matcher
+    return matcher
+
+
+def get_regex_matcher(site_id):
+    """Return the regular expression redirects matcher of the given site, building it if missing or stale."""
+    generation = get_site_generation(site_id)
+    matcher = _get_fresh_matcher(site_id, generation)
+    if matcher is None:
+        matcher = _build_matcher(site_id, generation)
+    return matcher
+
+
+async def aget_regex_matcher(site_id):
+    """Async version of :py:func:`get_regex_matcher`: the matcher is built in a thread, if needed."""
+    generation = await aget_site_generation(site_id)
+    matcher = _get_fresh_matcher(site_id, generation)
+    if matcher is None:
+        matcher = await sync_to_async(_build_matcher)(site_id, generation)
+    return matcher
+
+
+def clear_regex_matchers():
+    """Drop all the regular expression matchers loaded in the current process."""
+    with _matchers_lock:
+        _matchers.clear()
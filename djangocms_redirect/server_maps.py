@@ -0,0 +1,152 @@
+"""
+Compile the redirects of a site into files the web server reads, to serve them without reaching Django.
+
+* nginx: a ``map`` block of ``$uri`` to ``$djangocms_redirect_<site id>``, to include in the ``http`` context;
+  exact redirects are exact keys, subpath and catchall redirects are regular expression keys tried from the
+  longest prefix.
+* Apache: a ``RewriteMap`` text file of the exact redirects, as ``txt`` maps only support exact keys.
+
+Values are ``<code>:<new path>`` for 301 / 302 redirects and ``410`` for gone paths. Regular expression
+redirects and paths which cannot be written in the file syntax are skipped, so that Django still serves them.
+"""
+
+import os
+import re
+
+from django.conf import settings
+
+from .models import Redirect
+from .utils import get_site_generation, write_atomic
+
+FORMATS = ("nginx", "apache")
+FILE_NAMES = {"nginx": "redirects-{site_id}.map", "apache": "redirects-{site_id}.txt"}
+NGINX_VARIABLE = "djangocms_redirect_{site_id}"
+
+#: first line of the generated files, recording the redirects generation they have been built from
+HEADER = "# djangocms_redirect site {site_id} generation {generation}\n"
+_HEADER_RE = re.compile(r"# djangocms_redirect site (\d+) generation (\S+)\n")
+
+# quotes, backslashes, whitespace and control characters can't be written safely in either file
+_UNSAFE_RE = re.compile(r"[\"'\\\s\x00-\x1f\x7f]")
+
+
+def get_value(new_path, response_code):
+    """Return the map value of a redirect, handled like :py:meth:`RedirectMiddleware._get_response` does."""
+    if not new_path or response_code == "410":
+        return "410"
+    return "{}:{}".format(response_code, new_path)
+
+
+class SiteMaps:
+    """Exact and prefix redirects of a site, in the priority order of the middleware lookups."""
+
+    def __init__(self, site_id):
+        self.site_id = site_id
+        self.exact = {}
+        self.prefixes = {}
+        self.skipped = 0
+        self.excluded_prefixes = tuple(getattr(settings, "DJANGOCMS_REDIRECT_EXCLUDED_PREFIXES", ()))
+        self.excluded_suffixes = tuple(getattr(settings, "DJANGOCMS_REDIRECT_EXCLUDED_SUFFIXES", ()))
+
+    def is_excluded(self, path):
+        return path.startswith(self.excluded_prefixes) or path.endswith(self.excluded_suffixes)
+
+    @classmethod
+    def load(cls, site_id):
+        maps = cls(site_id)
+        rows = (
+            Redirect.objects.filter(site_id=site_id)
+            .order_by("old_path")
+            .values_list(
+                "lookup_path", "new_path", "response_code", "subpath_match", "catchall_redirect", "regex_match"
+            )
+        )
+        variants = {}
+        for lookup_path, new_path, response_code, subpath_match, catchall_redirect, regex_match in rows.iterator():
+            if regex_match or _UNSAFE_RE.search(lookup_path) or _UNSAFE_RE.search(new_path) or "$" in new_path:
+                maps.skipped += 1
+                continue
+            value = get_value(new_path, response_code)
+            if subpath_match or catchall_redirect:
+                maps.prefixes.setdefault(lookup_path, (value, subpath_match))
+            elif maps.is_excluded(lookup_path):
+                maps.skipped += 1
+                continue
+            # subpath and catchall redirects are also found by the exact lookup of their own path
+            if not maps.is_excluded(lookup_path):
+                maps.exact.setdefault(lookup_path, value)
+            # a redirect with a trailing slash matches the request path without it
+            if len(lookup_path) > 1 and lookup_path.endswith("/") and not maps.is_excluded(lookup_path[:-1]):
+                variants.setdefault(lookup_path[:-1], value)
+        for path, value in variants.items():
+            maps.exact.setdefault(path, value)
+        return maps
+
+    def get_nginx(self):
+        lines = ["map $uri ${} {{".format(NGINX_VARIABLE.format(site_id=self.site_id)), '    default "";']
+        for path, value in sorted(self.exact.items()):
+            # exact keys starting with ~ would be read as regular expressions
+            lines.append('    "{}{}" "{}";'.format("\\" if path.startswith("~") else "", path, value))
+        if self.prefixes:
+            # regular expressions are tried in order: excluded paths first, then the longest prefixes
+            for prefix in self.excluded_prefixes:
+                lines.append('    "~^{}" "";'.format(re.escape(prefix)))
+            for suffix in self.excluded_suffixes:
+                lines.append('    "~{}$" "";'.format(re.escape(suffix)))
+        for lookup_path, (value, subpath_match) in sorted(self.prefixes.items(), key=lambda item: -len(item[0])):
+            if subpath_match and value != "410":
+                lines.append('    "~^{}(.*)$" "{}$1";'.format(re.escape(lookup_path), value))
+            else:
+                lines.append('    "~^{}" "{}";'.format(re.escape(lookup_path), value))
+        lines.append("}")
+        return "\n".join(lines) + "\n"
+
+    def get_apache(self):
+        return "".join("{} {}\n".format(path, value) for path, value in sorted(self.exact.items()))
+
+    def render(self, file_format):
+        return getattr(self, "get_{}".format(file_format))()
+
+
+def get_map_path(directory, site_id, file_format):
+    return os.path.join(directory, FILE_NAMES[file_format].format(site_id=site_id))
+
+
+def read_header(path):
+    """Return the ``(site id, generation)`` recorded in the given file, or ``None`` if missing or not generated."""
+    try:
+        with open(path, encoding="utf-8") as stream:
+            match = _HEADER_RE.fullmatch(stream.readline())
+    except (OSError, UnicodeDecodeError):
+        return None
+    return (int(match.group(1)), match.group(2)) if match else None
+
+
+def export_site_maps(site_id, directory, formats=FORMATS, force=False):
+    """
+    Write the map files of the site in the directory, if the redirects changed since they have been written.
+
+    Changes are detected on the redirects generation recorded in the files, thus the cache must be shared with
+    the processes editing the redirects. Return a dict of the ``written`` (content changed), ``refreshed``
+    (same content, new generation) or ``unchanged`` state of each format, and the number of skipped redirects
+    (``None`` if the redirects have not been loaded).
+    """
+    generation = str(get_site_generation(site_id))
+    paths = {file_format: get_map_path(directory, site_id, file_format) for file_format in formats}
+    if not force and all(read_header(path) == (site_id, generation) for path in paths.values()):
+        return {file_format: "unchanged" for file_format in formats}, None
+    # generation read before the redirects, so that changes made meanwhile are exported on the next run
+    maps = SiteMaps.load(site_id)
+    header = HEADER.format(site_id=site_id, generation=generation)
+    states = {}
+    for file_format, path in paths.items():
+        body = maps.render(file_format)
+        try:
+            with open(path, encoding="utf-8") as stream:
+                stream.readline()
+                changed = stream.read() != body
+        except (OSError, UnicodeDecodeError):
+            changed = True
+        write_atomic(path, (header + body).encode("utf-8"))
+        states[file_format] = "written" if changed else "refreshed"
+    return states, maps.skipped
@@ -0,0 +1,259 @@
+"""
+Redirect tables stored in a binary file per site, memory mapped by the worker processes.
+
+All the workers of a host share the page cache copy of the file instead of building their own in-memory
+table. The file layout (little endian) is:
+
+* header: magic, format version, site id, redirects generation and the number of records of each section
+* exact, then subpath / catchall records, sorted by the UTF-8 bytes of their path, then regular expression
+  records sorted by priority: fixed size records pointing to their path and target in the string pool
+* string pool: the UTF-8 paths and targets
+
+Snapshots are written by the ``build_redirect_snapshot`` management command to a temporary file renamed over
+the previous one; workers map the new file when its identity changes, and use it only while its generation is
+the current one of the site.
+"""
+
+import logging
+import mmap
+import os
+import struct
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from .patterns import RegexMatcher
+from .table import RedirectMatch, RedirectTable, replace_subpath
+from .utils import aget_site_generation, get_site_generation, write_atomic
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"DCRS"
+VERSION = 1
+#: magic, version, site id, generation, exact / prefix / pattern records count
+HEADER = struct.Struct("<4sHxxIqIII")
+#: path offset, target offset, path length, target length, response code, flags, redirect id
+RECORD = struct.Struct("<IIHHHHI")
+SUBPATH = 1
+
+#: per-process mapped snapshots: ``{site_id: (snapshot or None, checked_at)}``
+_snapshots = {}
+
+
+def build_snapshot(site_id, generation):
+    """Return the snapshot of the redirects of the site, with the redirects generation it has been built from."""
+    table = RedirectTable.build(site_id, generation)
+    pool = bytearray()
+    records = bytearray()
+
+    def add_record(path, new_path, response_code, flags, pk):
+        path = path.encode("utf-8")
+        new_path = new_path.encode("utf-8")
+        records.extend(
+            RECORD.pack(len(pool), len(pool) + len(path), len(path), len(new_path), int(response_code), flags, pk)
+        )
+        pool.extend(path)
+        pool.extend(new_path)
+
+    exact = sorted(table.exact.items(), key=lambda item: item[0].encode("utf-8"))
+    for path, redirect in exact:
+        add_record(path, redirect.new_path, redirect.response_code, 0, redirect.pk)
+    prefixes = sorted(table.prefixes.items(), key=lambda item: item[0].encode("utf-8"))
+    for old_path, (new_path, response_code, subpath_match, pk) in prefixes:
+        add_record(old_path, new_path, response_code, SUBPATH if subpath_match else 0, pk)
+    for priority, pattern, new_path, response_code in table.patterns.rules:
+        add_record(pattern, new_path, response_code, 0, priority)
+    header = HEADER.pack(MAGIC, VERSION, site_id, generation, len(exact), len(prefixes), len(table.patterns))
+    return header + bytes(records) + bytes(pool)
+
+
+class RedirectSnapshot:
+    """
+    Read only view of a memory mapped snapshot, with the lookup methods of
+    :py:class:`djangocms_redirect.table.RedirectTable`.
+
+    Exact lookups are binary searches on the records, prefix lookups repeat them on the common prefix of the
+    path and the closest record, thus no per-redirect data is loaded in the process except for the regular
+    expression redirects, which are compiled on load.
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as stream:
+            stat = os.fstat(stream.fileno())
+            self.buffer = mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+        self.identity = get_file_identity(stat)
+        try:
+            magic, version, self.site_id, self.generation, exact, prefixes, patterns = HEADER.unpack_from(self.buffer)
+        except struct.error:
+            raise ValueError("Truncated redirect snapshot {}".format(path))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("Unsupported redirect snapshot {}".format(path))
+        self.exact = (HEADER.size, exact)
+        self.prefixes = (HEADER.size + exact * RECORD.size, prefixes)
+        self.pool = HEADER.size + (exact + prefixes + patterns) * RECORD.size
+        if self.pool > len(self.buffer):
+            raise ValueError("Truncated redirect snapshot {}".format(path))
+        self.size = exact + prefixes + patterns
+        self.patterns = RegexMatcher()
+        for index in range(patterns):
+            record = self._get_record(self.pool - (patterns - index) * RECORD.size)
+            self.patterns.add(record[6], self._get_path(record), self._get_target(record), str(record[4]))
+        self.patterns.compile()
+
+    def _get_record(self, offset):
+        return RECORD.unpack_from(self.buffer, offset)
+
+    def _get_path(self, record):
+        start = self.pool + record[0]
+        return self.buffer[start : start + record[2]].decode("utf-8")
+
+    def _get_target(self, record):
+        start = self.pool + record[1]
+        return self.buffer[start : start + record[3]].decode("utf-8")
+
+    def _get_key(self, section, index):
+        offset, length = struct.unpack_from("<I4xH", self.buffer, section[0] + index * RECORD.size)
+        start = self.pool + offset
+        return self.buffer[start : start + length]
+
+    def _bisect_right(self, section, key):
+        low, high = 0, section[1]
+        while low < high:
+            middle = (low + high) // 2
+            if key < self._get_key(section, middle):
+                high = middle
+            else:
+                low = middle + 1
+        return low
+
+    def match_exact(self, path):
+        key = path.encode("utf-8")
+        index = self._bisect_right(self.exact, key) - 1
+        if index >= 0 and self._get_key(self.exact, index) == key:
+            record = self._get_record(self.exact[0] + index * RECORD.size)
+            return RedirectMatch(self._get_target(record), str(record[4]), record[6])
+
+    def match_prefix(self, path):
+        """Return the subpath / catchall redirect with the longest ``old_path`` matching the given path."""
+        key = path.encode("utf-8")
+        while key:
+            index = self._bisect_right(self.prefixes, key) - 1
+            if index < 0:
+                return None
+            candidate = self._get_key(self.prefixes, index)
+            if key.startswith(candidate):
+                record = self._get_record(self.prefixes[0] + index * RECORD.size)
+                new_path = self._get_target(record)
+                if record[5] & SUBPATH:
+                    new_path = replace_subpath(path, candidate.decode("utf-8"), new_path)
+                return RedirectMatch(
+                    new_path, str(record[4]), record[6], "subpath" if record[5] & SUBPATH else "catchall"
+                )
+            # matching prefixes can't be longer than the common prefix of the path and the closest record
+            common = 0
+            while candidate[common] == key[common]:
+                common += 1
+            key = key[:common]
+
+    def match_regex(self, path):
+        return self.patterns.match(path)
+
+    def resolve(self, paths):
+        """Return the redirect matching the first of the given paths, as ``RedirectTable.resolve`` does."""
+        for path in paths:
+            redirect = self.match_exact(path)
+            if redirect:
+                return redirect
+        for path in paths:
+            redirect = self.match_prefix(path)
+            if redirect:
+                return redirect
+        for path in paths:
+            redirect = self.match_regex(path)
+            if redirect:
+                return redirect
+
+
+def get_file_identity(stat):
+    return (stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+
+def get_snapshot_path(site_id, directory=None):
+    if directory is None:
+        directory = settings.DJANGOCMS_REDIRECT_SNAPSHOT_DIR
+    return os.path.join(directory, "redirects-{}.snapshot".format(site_id))
+
+
+def read_snapshot_generation(path):
+    """Return the generation recorded in the snapshot file, or ``None`` if missing or unsupported."""
+    try:
+        with open(path, "rb") as stream:
+            magic, version, _site_id, generation, *_counts = HEADER.unpack(stream.read(HEADER.size))
+    except (OSError, struct.error):
+        return None
+    return generation if magic == MAGIC and version == VERSION else None
+
+
+def write_snapshot(site_id, directory=None, force=False):
+    """
+    Write the snapshot of the site, if the redirects changed since it has been written.
+
+    Return the number of redirects written, or ``None`` if the snapshot is up to date.
+    """
+    # generation read before the redirects, so that changes made meanwhile are written on the next run
+    generation = get_site_generation(site_id)
+    path = get_snapshot_path(site_id, directory)
+    if not force and read_snapshot_generation(path) == generation:
+        return None
+    content = build_snapshot(site_id, generation)
+    write_atomic(path, content)
+    return sum(HEADER.unpack_from(content)[4:])
+
+
+def _get_mapped_snapshot(site_id):
+    """
+    Return the snapshot of the site mapped in the process, or ``None`` if missing or invalid.
+
+    The file is checked at most every ``DJANGOCMS_REDIRECT_GENERATION_CHECK_INTERVAL`` seconds, and mapped
+    again if it has been replaced.
+    """
+    interval = getattr(settings, "DJANGOCMS_REDIRECT_GENERATION_CHECK_INTERVAL", 1)
+    now = time.monotonic()
+    snapshot, checked_at = _snapshots.get(site_id, (None, None))
+    if checked_at is not None and now - checked_at < interval:
+        return snapshot
+    path = get_snapshot_path(site_id)
+    try:
+        if snapshot is None or snapshot.identity != get_file_identity(os.stat(path)):
+            # the previous mapping is released once the lookups still using it are done
+            snapshot = RedirectSnapshot(path)
+    except FileNotFoundError:
+        snapshot = None
+    except (OSError, ValueError) as e:
+        logger.warning("Can't load the redirect snapshot of site %s: %s", site_id, e)
+        snapshot = None
+    _snapshots[site_id] = (snapshot, now)
+    return snapshot
+
+
+def get_redirect_snapshot(site_id):
+    """Return the snapshot of the site if it's up to date with the site redirects, else ``None``."""
+    snapshot = _get_mapped_snapshot(site_id)
+    if snapshot is not None and snapshot.generation == get_site_generation(site_id):
+        return snapshot
+
+
+async def aget_redirect_snapshot(site_id):
+    """Async version of :py:func:`get_redirect_snapshot`: the file is checked in a thread, if needed."""
+    interval = getattr(settings, "DJANGOCMS_REDIRECT_GENERATION_CHECK_INTERVAL", 1)
+    snapshot, checked_at = _snapshots.get(site_id, (None, None))
+    if checked_at is None or time.monotonic() - checked_at >= interval:
+        snapshot = await sync_to_async(_get_mapped_snapshot)(site_id)
+    if snapshot is not None and snapshot.generation == await aget_site_generation(site_id):
+        return snapshot
+
+
+def clear_redirect_snapshots():
+    """Drop all the snapshots mapped in the current process."""
+    _snapshots.clear()
@@ -0,0 +1,238 @@
+import logging
+import threading
+import time
+from collections import namedtuple
+from operator import itemgetter
+
+from asgiref.sync import sync_to_async
+from django.db.models import Q
+
+from .utils import aget_site_generation, get_site_generation
+
+logger = logging.getLogger(__name__)
+
+#: lightweight replacement of a ``Redirect`` instance, exposing only the attributes needed to build the response
+RedirectMatch = namedtuple(
+    "RedirectMatch", ("new_path", "response_code", "pk", "match_type"), defaults=(None, "exact")
+)
+
+_tables = {}
+_tables_lock = threading.Lock()
+
+
+class _PrefixNode:
+    __slots__ = ("children", "values")
+
+    def __init__(self):
+        self.children = {}
+        self.values = {}
+
+
+class PrefixIndex:
+    """
+    Segment based radix tree of subpath / catchall redirects.
+
+    Each ``old_path`` is split on its last slash: the leading segments select the tree node, the trailing
+    (possibly partial) segment is the key of the redirect in the node, so that ``/en/test`` still matches
+    ``/en/test-page/`` as with a plain ``startswith`` check.
+
+    Looking up a path walks the tree once along the path segments, thus the cost depends on the path depth and
+    not on the number of registered redirects.
+    """
+
+    def __init__(self):
+        self.root = _PrefixNode()
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def add(self, old_path, value):
+        head, separator, tail = old_path.rpartition("/")
+        node = self.root
+        if separator:
+            for segment in head.split("/"):
+                node = node.children.setdefault(segment, _PrefixNode())
+        # redirects are added in ``old_path`` order: the first one wins, as in the exact lookups
+        if tail not in node.values:
+            self.size += 1
+            node.values[tail] = (old_path, value)
+
+    def items(self):
+        """Yield the ``(old_path, value)`` pairs of the index, in no particular order."""
+        nodes = [self.root]
+        while nodes:
+            node = nodes.pop()
+            yield from node.values.values()
+            nodes.extend(node.children.values())
+
+    def lookup(self, path):
+        """
+        Return the ``(old_path, value)`` pair with the longest ``old_path`` the given path starts with.
+
+        Returns ``None`` if no ``old_path`` matches.
+        """
+        parts = path.split("/")
+        node = self.root
+        candidates = [(node, parts[0])]
+        for index, segment in enumerate(parts[:-1], start=1):
+            node = node.children.get(segment)
+            if node is None:
+                break
+            candidates.append((node, parts[index]))
+        # deeper nodes always have longer ``old_path`` than shallower ones
+        for node, segment in reversed(candidates):
+            if node.values:
+                for end in range(len(segment), -1, -1):
+                    match = node.values.get(segment[:end])
+                    if match:
+                        return match
+
+
+class RedirectTable:
+    """
+    In-process compiled copy of the redirects of a single site.
+
+    Exact redirects are stored in a dictionary keyed by ``lookup_path``, subpath and catchall redirects in a
+    :py:class:`PrefixIndex`, regular expression redirects in a :py:class:`djangocms_redirect.patterns.RegexMatcher`,
+    so that resolving a path does not require any database query.
+
+    If ``prefix_only`` is set, only subpath, catchall and regular expression redirects are loaded.
+    """
+
+    def __init__(self, site_id, generation, prefix_only=False):
+        from .patterns import RegexMatcher
+
+        self.site_id = site_id
+        self.generation = generation
+        self.prefix_only = prefix_only
+        self.exact = {}
+        self.prefixes = PrefixIndex()
+        self.patterns = RegexMatcher()
+        self.size = 0
+        self.build_time = None
+        self.built_at = None
+
+    @classmethod
+    def build(cls, site_id, generation, prefix_only=False):
+        from .models import Redirect
+
+        start = time.perf_counter()
+        table = cls(site_id, generation, prefix_only)
+        columns = ("lookup_path", "new_path", "response_code", "subpath_match", "catchall_redirect", "regex_match")
+        rows = Redirect.objects.filter(site_id=site_id).values_list("pk", "old_path", *columns)
+        if prefix_only:
+            # few rules, sorted here as sorting in the query could skip the partial index on the non exact rules
+            rows = rows.filter(Q(subpath_match=True) | Q(catchall_redirect=True) | Q(regex_match=True)).order_by()
+            rows = sorted(rows, key=itemgetter(1))
+        else:
+            rows = rows.iterator()
+        for pk, old_path, *row in rows:
+            lookup_path, new_path, response_code, subpath_match, catchall_redirect, regex_match = row
+            if regex_match:
+                table.patterns.add(pk, old_path, new_path, response_code)
+            elif subpath_match or catchall_redirect:
+                table.prefixes.add(lookup_path, (new_path, response_code, subpath_match, pk))
+            else:
+                table.exact.setdefault(lookup_path, RedirectMatch(new_path, response_code, pk))
+            table.size += 1
+        table.patterns.compile()
+        table.built_at = time.time()
+        table.build_time = time.perf_counter() - start
+        logger.debug(
+            "Built redirect table for site %s: %s redirects in %.4f seconds", site_id, table.size, table.build_time
+        )
+        return table
+
+    def __len__(self):
+        return self.size
+
+    def match_prefix(self, path):
+        """Return the subpath / catchall redirect with the longest ``old_path`` matching the given path."""
+        match = self.prefixes.lookup(path)
+        if match:
+            old_path, (new_path, response_code, subpath_match, pk) = match
+            if subpath_match:
+                new_path = replace_subpath(path, old_path, new_path)
+            return RedirectMatch(new_path, response_code, pk, "subpath" if subpath_match else "catchall")
+
+    def match_regex(self, path):
+        """Return the regular expression redirect matching the given path."""
+        return self.patterns.match(path)
+
+    def resolve(self, paths):
+        """
+        Return the redirect matching the first of the given paths.
+
+        All the paths are checked against exact redirects first, then against subpath / catchall redirects, then
+        against regular expression redirects, like
+        :py:meth:`djangocms_redirect.middleware.RedirectMiddleware.do_redirect` does on the database.
+        """
+        for path in paths:
+            if path in self.exact:
+                return self.exact[path]
+        for path in paths:
+            redirect = self.match_prefix(path)
+            if redirect:
+                return redirect
+        for path in paths:
+            redirect = self.match_regex(path)
+            if redirect:
+                return redirect
+
+
+def replace_subpath(path, old_path, new_path):
+    """Replace the matching ``old_path`` prefix of the given path with ``new_path``."""
+    return new_path + path[len(old_path) :]
+
+
+def _get_fresh_table(site_id, prefix_only, generation):
+    table = _tables.get((site_id, prefix_only))
+    if table is not None and table.generation == generation:
+        return table
+
+
+def _build_table(site_id, prefix_only, generation):
+    with _tables_lock:
+        table = _get_fresh_table(site_id, prefix_only, generation)
+        if table is None:
+            table = RedirectTable.build(site_id, generation, prefix_only)
+            _tables[(site_id, prefix_only)] = table
+    return table
+
+
+def get_redirect_table(site_id, prefix_only=False):
+    """
+    Return the redirect table for the given site, building it if missing or stale.
+
+    A table is stale when the site generation changed since it has been built.
+    """
+    generation = get_site_generation(site_id)
+    table = _get_fresh_table(site_id, prefix_only, generation)
+    if table is None:
+        table = _build_table(site_id, prefix_only, generation)
+    return table
+
+
+async def aget_redirect_table(site_id, prefix_only=False):
+    """Async version of :py:func:`get_redirect_table`: the table is built in a thread, if needed."""
+    generation = await aget_site_generation(site_id)
+    table = _get_fresh_table(site_id, prefix_only, generation)
+    if table is None:
+        table = await sync_to_async(_build_table)(site_id, prefix_only, generation)
+    return table
+
+
+def get_redirect_tables_info():
+    """Return the build time and size of the full redirect tables loaded in the current process."""
+    return {
+        site_id: {"size": table.size, "build_time": table.build_time, "built_at": table.built_at}
+        for (site_id, prefix_only), table in _tables.items()
+        if not prefix_only
+    }
+
+
+def clear_redirect_tables():
+    """Drop all the redirect tables loaded in the current process."""
+    with _tables_lock:
+        _tables.clear()
@@ -1,24 +1,242 @@
+import base64
 import hashlib
+import os
+import re
+import tempfile
+import time
+from urllib.parse import unquote
 
 from django.conf import settings
+from django.core.cache import cache
 
+#: per-process memo of the site generations: ``{site_id: (generation, checked_at)}``
+_generations = {}
 
-def get_key_from_path_and_site(path, site_id):
+#: longest path used as is in the compact cache keys
+COMPACT_KEY_MAX_PATH_LENGTH = 100
+#: printable ASCII characters, except space
+_MEMCACHED_SAFE = re.compile(r"[!-~]+\Z")
+#: optional items of the cached redirects, in the order of the compact format
+_OPTIONAL_FIELDS = ("expires", "id", "match")
+
+
+def get_cache_format():
+    """Return the format of the cache keys and values: ``"legacy"`` or ``"compact"``."""
+    return getattr(settings, "DJANGOCMS_REDIRECT_CACHE_FORMAT", "legacy")
+
+
+def get_key_from_path_and_site(path, site_id, generation=None, cache_format=None):
     """
     cache key has to be < 250 chars to avoid memcache.Client.MemcachedKeyLengthError.
 
-    SHA-224 is the best algorithm whose output (224 chars) respects this limitations:
+    SHA-224 is the best algorithm whose output (224 bits, 56 hex chars) respects this limitations:
 
-    total key length: Prefix (11) + HASH (224) + ID (max 3) + 2 separators (2) = 240
+    total key length: Prefix (11) + HASH (56) + ID (max 3) + generation (max 20) + 3 separators (3) = 93
+
+    With the ``"compact"`` format (see :py:func:`get_compact_path_token`) the key is at most
+    Prefix (4) + ID (max 3) + generation (max 20) + path (max 100) + 3 separators (3) = 130 chars long, and
+    usually much shorter.
+
+    The key includes the site generation (the current one if not provided), thus all the keys of a site are
+    invalidated at once by :py:func:`bump_site_generation`.
     """
+    if generation is None:
+        generation = get_site_generation(site_id)
+    if (cache_format or get_cache_format()) == "compact":
+        return "CMSR:{}:{}:{}".format(site_id, generation, get_compact_path_token(path))
     hashed_path = hashlib.sha224(path.encode("utf-8")).hexdigest()
-    key = "CMSREDIRECT:{}:{}".format(hashed_path, site_id)
+    key = "CMSREDIRECT:{}:{}:{}".format(hashed_path, site_id, generation)
     return key
 
 
+def get_compact_path_token(path):
+    """
+    Return the path itself if it's short and made of characters allowed in memcached keys, its digest otherwise.
+
+    The digest is 20 chars long (120 bits, url-safe base64), and never starts with a slash as paths do.
+    """
+    if len(path) <= COMPACT_KEY_MAX_PATH_LENGTH and _MEMCACHED_SAFE.match(path):
+        return path
+    digest = hashlib.blake2b(path.encode("utf-8"), digest_size=15).digest()
+    return base64.urlsafe_b64encode(digest).decode("ascii")
+
+
+def encode_cached_redirect(cached_redirect):
+    """
+    Return the compact form of a cached redirect, to be stored in the shared cache.
+
+    The compact form is a ``(redirect, status code, expires, id, match)`` tuple, without the trailing empty
+    items: the status code is stored as an integer (``0`` if there's no redirect) and the site, which is part of
+    the key, is omitted.
+    """
+    status_code = cached_redirect["status_code"]
+    value = [cached_redirect["redirect"], int(status_code) if status_code else 0]
+    value.extend(cached_redirect.get(name) for name in _OPTIONAL_FIELDS)
+    while value[-1] is None:
+        value.pop()
+    return tuple(value)
+
+
+def decode_cached_redirect(value):
+    """Return the cached redirect of a value read from the shared cache, stored in any format."""
+    if value is None or isinstance(value, dict):
+        return value
+    cached_redirect = {"redirect": value[0], "status_code": str(value[1]) if value[1] else None}
+    for name, item in zip(_OPTIONAL_FIELDS, value[2:]):
+        if item is not None:
+            cached_redirect[name] = item
+    return cached_redirect
+
+
+def get_generation_key(site_id):
+    return "CMSREDIRECT:GENERATION:{}".format(site_id)
+
+
+def _new_generation():
+    # time based to never reuse a generation already seen by a worker if the cache is flushed
+    return int(time.time() * 1000)
+
+
+def get_site_generation(site_id):
+    """
+    Return the current redirects generation for the given site.
+
+    The generation is stored in the shared cache and changes each time a redirect of the site is changed,
+    thus allowing each worker to detect stale in-process data.
+    To avoid a cache round-trip on each call, the value is kept in memory for
+    ``DJANGOCMS_REDIRECT_GENERATION_CHECK_INTERVAL`` seconds.
+    """
+    interval = getattr(settings, "DJANGOCMS_REDIRECT_GENERATION_CHECK_INTERVAL", 1)
+    now = time.monotonic()
+    local = _generations.get(site_id)
+    if local and now - local[1] < interval:
+        return local[0]
+    key = get_generation_key(site_id)
+    generation = cache.get(key)
+    if generation is None:
+        generation = _new_generation()
+        if not cache.add(key, generation, timeout=None):
+            generation = cache.get(key, generation)
+    _generations[site_id] = (generation, now)
+    return generation
+
+
+async def aget_site_generation(site_id):
+    """Async version of :py:func:`get_site_generation`."""
+    interval = getattr(settings, "DJANGOCMS_REDIRECT_GENERATION_CHECK_INTERVAL", 1)
+    now = time.monotonic()
+    local = _generations.get(site_id)
+    if local and now - local[1] < interval:
+        return local[0]
+    key = get_generation_key(site_id)
+    generation = await cache.aget(key)
+    if generation is None:
+        generation = _new_generation()
+        if not await cache.aadd(key, generation, timeout=None):
+            generation = await cache.aget(key, generation)
+    _generations[site_id] = (generation, now)
+    return generation
+
+
+def bump_site_generation(site_id):
+    """Mark all the redirects data of the given site as stale, across all the workers."""
+    key = get_generation_key(site_id)
+    try:
+        generation = cache.incr(key)
+    except ValueError:
+        generation = _new_generation()
+        cache.set(key, generation, timeout=None)
+    _generations[site_id] = (generation, time.monotonic())
+    return generation
+
+
+def get_counter_key(name):
+    return "CMSREDIRECT:COUNTER:{}".format(name)
+
+
+def increment_counter(name):
+    """Increment the counter with the given name, shared across all the workers through the cache."""
+    key = get_counter_key(name)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        if cache.add(key, 1, timeout=None):
+            return 1
+        return cache.incr(key)
+
+
+async def aincrement_counter(name):
+    """Async version of :py:func:`increment_counter`."""
+    key = get_counter_key(name)
+    try:
+        return await cache.aincr(key)
+    except ValueError:
+        if await cache.aadd(key, 1, timeout=None):
+            return 1
+        return await cache.aincr(key)
+
+
+def get_counter(name):
+    """Return the value of the counter with the given name."""
+    return cache.get(get_counter_key(name), 0)
+
+
+def get_path_prefixes(path, max_length=None):
+    """Return all the non empty prefixes of the given path, optionally up to ``max_length`` characters."""
+    if max_length is not None:
+        path = path[:max_length]
+    return [path[:end] for end in range(1, len(path) + 1)]
+
+
+def get_lookup_path(path):
+    """
+    Return the canonical form of the path used to match redirects.
+
+    The path is unquoted and a leading slash is added, so that ``Redirect.old_path`` values match the (already
+    unquoted) request paths regardless of the way the redirect has been written.
+    """
+    path = unquote(path)
+    if not path.startswith("/"):
+        path = "/%s" % path
+    return path
+
+
+def get_lookup_paths(path):
+    """
+    Return the forms of the given request path to match against redirects, in priority order.
+
+    The path is expected to be unquoted already, as ``request.path`` is. A redirect with a trailing slash
+    matches the request path without it.
+    """
+    if not path.startswith("/"):
+        path = "/%s" % path
+    if path.endswith("/"):
+        return [path]
+    return [path, "%s/" % path]
+
+
 def normalize_url(path):
     if settings.APPEND_SLASH and not path.endswith("/"):
         path = "%s/" % path
     if not path.startswith("/"):
         path = "/%s" % path
     return path
+
+
+def write_atomic(path, content):
+    """
+    Write the bytes to the file through a temporary file in the same directory renamed over the destination.
+
+    Readers, like a web server reloading its configuration, always see either the old or the new content.
+    """
+    handle, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix=".", suffix=".tmp")
+    try:
+        with os.fdopen(handle, "wb") as stream:
+            stream.write(content)
+            stream.flush()
+            os.fsync(stream.fileno())
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
@@ -0,0 +1,12 @@
+from django.http import Http404, HttpResponse
+
+from . import metrics
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def metrics_view(request):
+    """Return the redirect lookup metrics of the current process in the Prometheus text format."""
+    if not metrics.is_enabled():
+        raise Http404
+    return HttpResponse(metrics.registry.render(), content_type=PROMETHEUS_CONTENT_TYPE)
@@ -1,8 +1,19 @@
 from app_helper.base_test import BaseTestCase
 from django.core.cache import cache
 
+from djangocms_redirect.bloom import clear_redirect_filters
+from djangocms_redirect.hits import clear_hits
+from djangocms_redirect.patterns import clear_regex_matchers
+from djangocms_redirect.snapshot import clear_redirect_snapshots
+from djangocms_redirect.table import clear_redirect_tables
+
 
 class BaseRedirectTest(BaseTestCase):
     def setUp(self):
         super().setUp()
         cache.clear()
+        clear_redirect_tables()
+        clear_redirect_filters()
+        clear_regex_matchers()
+        clear_redirect_snapshots()
+        clear_hits()
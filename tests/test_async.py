@@ -0,0 +1,87 @@
+from unittest import skipUnless
+from unittest.mock import patch
+
+from asgiref.sync import async_to_sync
+from django.contrib.sites.models import Site
+from django.test.utils import override_settings
+
+from djangocms_redirect.middleware import ASYNC_SUPPORT, RedirectMiddleware
+from djangocms_redirect.models import Redirect
+
+from . import BaseRedirectTest
+
+
+@skipUnless(ASYNC_SUPPORT, "Native async support requires Django 4.1+")
+class TestAsyncRedirect(BaseRedirectTest):
+    def setUp(self):
+        super().setUp()
+        Redirect.objects.create(site=self.site_1, old_path="/en/a/", new_path="/en/b/", response_code="301")
+        Redirect.objects.create(site=self.site_1, old_path="/en/c/", new_path="/en/d/", response_code="302")
+        Redirect.objects.create(site=self.site_1, old_path="/en/e/", new_path="", response_code="410")
+        Redirect.objects.create(site=self.site_1, old_path="/en/f", new_path="/en/g", subpath_match=True)
+        Site.objects.get_current()
+
+    def _get(self, path):
+        async def get_response(request):
+            return None
+
+        middleware = RedirectMiddleware(get_response)
+        return async_to_sync(middleware.ado_redirect)(self.request(path))
+
+    def _assert_responses(self, get):
+        response = get("/en/a/?q=1")
+        self.assertEqual(response.status_code, 301)
+        self.assertEqual(response["Location"], "/en/b/?q=1")
+        response = get("/en/c")
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response["Location"], "/en/d/")
+        self.assertEqual(get("/en/e/").status_code, 410)
+        response = get("/en/foo/bar/")
+        self.assertEqual(response.status_code, 301)
+        self.assertEqual(response["Location"], "/en/goo/bar/")
+
+    def test_ado_redirect(self):
+        with self.assertNumQueries(1):
+            response = self._get("/en/a/")
+        self.assertEqual(response["Location"], "/en/b/")
+        with self.assertNumQueries(0):
+            response = self._get("/en/a/")
+        self.assertEqual(response["Location"], "/en/b/")
+        # one query for the exact redirects, one to build the prefix index
+        with self.assertNumQueries(2):
+            response = self._get("/en/foo/")
+        self.assertEqual(response["Location"], "/en/goo/")
+        with self.assertNumQueries(1):
+            self.assertIsNone(self._get("/en/missing/"))
+
+    @override_settings(DJANGOCMS_REDIRECT_PREFIX_LOOKUP="database")
+    def test_ado_redirect_database_prefix(self):
+        with self.assertNumQueries(3):
+            response = self._get("/en/foo/")
+        self.assertEqual(response["Location"], "/en/goo/")
+        with self.assertNumQueries(2):
+            self.assertIsNone(self._get("/en/missing/"))
+
+    @override_settings(DJANGOCMS_REDIRECT_IN_MEMORY_TABLE=True)
+    def test_ado_redirect_table(self):
+        with self.assertNumQueries(1):
+            response = self._get("/en/foo/")
+        self.assertEqual(response["Location"], "/en/goo/")
+        with self.assertNumQueries(0):
+            response = self._get("/en/a/")
+        self.assertEqual(response["Location"], "/en/b/")
+
+    def test_wsgi_client(self):
+        self._assert_responses(self.client.get)
+
+    def test_asgi_client(self):
+        with patch.object(RedirectMiddleware, "do_redirect", side_effect=AssertionError("sync path used")):
+            self._assert_responses(self.async_client_get)
+
+    def async_client_get(self, path):
+        return async_to_sync(self.async_client.get)(path)
+
+    @override_settings(DJANGOCMS_REDIRECT_USE_REQUEST=False)
+    def test_asgi_client_response(self):
+        with patch.object(RedirectMiddleware, "do_redirect", side_effect=AssertionError("sync path used")):
+            self._assert_responses(self.async_client_get)
@@ -0,0 +1,72 @@
+from unittest.mock import patch
+
+from django.contrib.sites.models import Site
+from django.test.utils import override_settings
+
+from djangocms_redirect.bloom import BloomFilter, get_redirect_filter, get_redirect_filters_info
+from djangocms_redirect.middleware import RedirectMiddleware
+from djangocms_redirect.models import Redirect
+
+from . import BaseRedirectTest
+
+
+class TestBloomFilter(BaseRedirectTest):
+    def test_membership(self):
+        bloom = BloomFilter(1000, 0.01)
+        items = ["/path/%s/" % index for index in range(1000)]
+        for item in items:
+            bloom.add(item)
+        for item in items:
+            self.assertIn(item, bloom)
+        false_positives = sum("/other/%s/" % index in bloom for index in range(10000))
+        self.assertLess(false_positives, 300)
+        self.assertAlmostEqual(bloom.false_positive_rate, 0.01, delta=0.005)
+        self.assertEqual(bloom.count, 1000)
+
+    def test_max_bytes(self):
+        bloom = BloomFilter(1000, 0.01, max_bytes=64)
+        self.assertEqual(bloom.size_bytes, 64)
+        for index in range(1000):
+            bloom.add("/path/%s/" % index)
+        self.assertGreater(bloom.false_positive_rate, 0.5)
+
+    def test_empty(self):
+        bloom = BloomFilter(0)
+        self.assertNotIn("/", bloom)
+
+
+@override_settings(DJANGOCMS_REDIRECT_BLOOM_FILTER=True)
+class TestBloomFilterMiddleware(BaseRedirectTest):
+    def setUp(self):
+        super().setUp()
+        Redirect.objects.create(site=self.site_1, old_path="/en/a/", new_path="/en/b/")
+        Redirect.objects.create(site=self.site_1, old_path="/en/c/d", new_path="/en/e/", catchall_redirect=True)
+        Site.objects.get_current()
+        self.middleware = RedirectMiddleware(lambda request: None)
+
+    def test_filter(self):
+        redirect_filter = get_redirect_filter(self.site_1.pk)
+        self.assertTrue(redirect_filter.may_match(["/en/a", "/en/a/"]))
+        self.assertTrue(redirect_filter.may_match(["/en/c/dd/"]))
+        self.assertFalse(redirect_filter.may_match(["/en/x/", "/en/x/y/"]))
+
+        info = get_redirect_filters_info()[self.site_1.pk]
+        self.assertEqual(info["items"], 2)
+        self.assertGreater(info["size_bytes"], 0)
+
+    def test_skip_lookup(self):
+        get_redirect_filter(self.site_1.pk)
+        with self.assertNumQueries(0), patch("djangocms_redirect.middleware.cache") as cache:
+            self.assertIsNone(self.middleware.do_redirect(self.request("/en/missing/")))
+        self.assertFalse(cache.method_calls)
+
+        response = self.middleware.do_redirect(self.request("/en/a/"))
+        self.assertEqual(response["Location"], "/en/b/")
+        response = self.middleware.do_redirect(self.request("/en/c/dd/"))
+        self.assertEqual(response["Location"], "/en/e/")
+
+    def test_rebuild(self):
+        self.assertIsNone(self.middleware.do_redirect(self.request("/en/f/")))
+        Redirect.objects.create(site=self.site_1, old_path="/en/f/", new_path="/en/g/")
+        response = self.middleware.do_redirect(self.request("/en/f/"))
+        self.assertEqual(response["Location"], "/en/g/")
@@ -0,0 +1,108 @@
+from unittest import skipUnless
+
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.test.utils import override_settings
+
+from djangocms_redirect.middleware import ASYNC_SUPPORT, RedirectMiddleware
+from djangocms_redirect.models import Redirect
+from djangocms_redirect.utils import (
+    decode_cached_redirect,
+    encode_cached_redirect,
+    get_compact_path_token,
+    get_key_from_path_and_site,
+)
+
+from . import BaseRedirectTest
+
+
+class TestCompactFormat(BaseRedirectTest):
+    def test_key(self):
+        self.assertEqual(get_key_from_path_and_site("/en/a/", 1, 5, cache_format="compact"), "CMSR:1:5:/en/a/")
+        self.assertEqual(len(get_key_from_path_and_site("/en/a/", 1, 5, cache_format="legacy")), 72)
+        with self.settings(DJANGOCMS_REDIRECT_CACHE_FORMAT="compact"):
+            self.assertEqual(get_key_from_path_and_site("/en/a/", 1, 5), "CMSR:1:5:/en/a/")
+        for path in ("/en/à/", "/en/a b/", "/en/" + "a" * 100):
+            token = get_compact_path_token(path)
+            self.assertEqual(len(token), 20)
+            self.assertNotEqual(token[0], "/")
+            self.assertTrue(token.isprintable() and " " not in token)
+        self.assertNotEqual(get_compact_path_token("/en/à/"), get_compact_path_token("/en/è/"))
+
+    def test_values(self):
+        cached_redirect = {"site": 1, "redirect": "/en/b/", "status_code": "301"}
+        self.assertEqual(encode_cached_redirect(cached_redirect), ("/en/b/", 301))
+        self.assertEqual(decode_cached_redirect(("/en/b/", 301)), {"redirect": "/en/b/", "status_code": "301"})
+        self.assertEqual(encode_cached_redirect({"site": 1, "redirect": None, "status_code": None}), (None, 0))
+        self.assertEqual(decode_cached_redirect((None, 0)), {"redirect": None, "status_code": None})
+        cached_redirect = {"redirect": "", "status_code": "410", "expires": 10.5, "match": "exact"}
+        self.assertEqual(encode_cached_redirect(cached_redirect), ("", 410, 10.5, None, "exact"))
+        self.assertEqual(decode_cached_redirect(encode_cached_redirect(cached_redirect)), cached_redirect)
+        # legacy values are returned as is
+        self.assertEqual(decode_cached_redirect({"redirect": "/a/", "status_code": "302"})["redirect"], "/a/")
+        self.assertIsNone(decode_cached_redirect(None))
+
+
+@override_settings(DJANGOCMS_REDIRECT_CACHE_FORMAT="compact")
+class TestCompactCache(BaseRedirectTest):
+    def setUp(self):
+        super().setUp()
+        Redirect.objects.create(site=self.site_1, old_path="/en/a/", new_path="/en/b/")
+
+    def _get(self, path):
+        return RedirectMiddleware(lambda request: None).do_redirect(self.request(path))
+
+    def _legacy_key(self, path):
+        return get_key_from_path_and_site(path, self.site_1.pk, cache_format="legacy")
+
+    def test_redirect(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(self._get("/en/a")["Location"], "/en/b/")
+        self.assertEqual(cache.get(get_key_from_path_and_site("/en/a", self.site_1.pk)), ("/en/b/", 301))
+        self.assertEqual(cache.get(get_key_from_path_and_site("/en/a/", self.site_1.pk)), ("/en/b/", 301))
+        self.assertIsNone(cache.get(self._legacy_key("/en/a")))
+        with self.assertNumQueries(0):
+            self.assertEqual(self._get("/en/a")["Location"], "/en/b/")
+            self.assertEqual(self._get("/en/a/")["Location"], "/en/b/")
+        self.assertIsNone(self._get("/en/missing/"))
+        with self.assertNumQueries(0):
+            self.assertIsNone(self._get("/en/missing/"))
+
+    @override_settings(DJANGOCMS_REDIRECT_LOCAL_CACHE_SIZE=10)
+    def test_local_cache(self):
+        self._get("/en/a/")
+        with self.assertNumQueries(0):
+            self.assertEqual(self._get("/en/a/")["Location"], "/en/b/")
+
+    def test_legacy_fallback(self):
+        with self.settings(DJANGOCMS_REDIRECT_CACHE_FORMAT="legacy"):
+            self._get("/en/a/")
+        # without fallback, legacy entries are ignored
+        with self.assertNumQueries(1):
+            self._get("/en/a/")
+        cache.delete(get_key_from_path_and_site("/en/a/", self.site_1.pk))
+        with self.settings(DJANGOCMS_REDIRECT_CACHE_LEGACY_FALLBACK=True):
+            with self.assertNumQueries(0):
+                self.assertEqual(self._get("/en/a/")["Location"], "/en/b/")
+            self.assertEqual(cache.get(get_key_from_path_and_site("/en/a/", self.site_1.pk)), ("/en/b/", 301))
+            # exact redirects, and prefix redirects table
+            with self.assertNumQueries(2):
+                self.assertIsNone(self._get("/en/missing/"))
+
+    @skipUnless(ASYNC_SUPPORT, "Native async support requires Django 4.1+")
+    @override_settings(DJANGOCMS_REDIRECT_CACHE_LEGACY_FALLBACK=True)
+    def test_async(self):
+        async def get_response(request):
+            return None
+
+        middleware = RedirectMiddleware(get_response)
+        with self.settings(DJANGOCMS_REDIRECT_CACHE_FORMAT="legacy"):
+            async_to_sync(middleware.ado_redirect)(self.request("/en/a/"))
+        with self.assertNumQueries(0):
+            response = async_to_sync(middleware.ado_redirect)(self.request("/en/a/"))
+        self.assertEqual(response["Location"], "/en/b/")
+        self.assertEqual(cache.get(get_key_from_path_and_site("/en/a/", self.site_1.pk)), ("/en/b/", 301))
+        with self.assertNumQueries(2):
+            response = async_to_sync(middleware.ado_redirect)(self.request("/en/c/"))
+        self.assertIsNone(response)
+        self.assertEqual(cache.get(get_key_from_path_and_site("/en/c/", self.site_1.pk)), (None, 0))
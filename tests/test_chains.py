@@ -0,0 +1,168 @@
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.test.utils import override_settings
+
+from djangocms_redirect.admin import RedirectForm
+from djangocms_redirect.chains import RedirectGraph
+from djangocms_redirect.middleware import RedirectMiddleware
+from djangocms_redirect.models import Redirect
+
+from . import BaseRedirectTest
+
+
+class TestRedirectGraph(BaseRedirectTest):
+    def _graph(self, *edges):
+        graph = RedirectGraph(1)
+        for edge in edges:
+            graph.add(*edge)
+        return graph
+
+    def test_resolve(self):
+        graph = self._graph(("/a/", "/b", "301"), ("/b/", "/c/", "301"), ("/c/", "/d/?q=1", "301"))
+        self.assertEqual(graph.resolve("/a/"), "/d/?q=1")
+        self.assertEqual(graph.resolve("/x/"), "/x/")
+        self.assertEqual(graph.resolve("http://example.com/a/"), "http://example.com/a/")
+
+    def test_resolve_permanent_only(self):
+        graph = self._graph(("/a/", "/b/", "301"), ("/b/", "/c/", "302"), ("/c/", "/d/", "301"))
+        self.assertEqual(graph.resolve("/a/"), "/b/")
+
+    def test_resolve_loop(self):
+        graph = self._graph(("/a/", "/b/", "301"), ("/b/", "/a/", "301"))
+        self.assertEqual(graph.resolve("/a/"), "/a/")
+
+    def test_exact_priority(self):
+        graph = self._graph(("/b", "/c/", "301"), ("/b/", "/d/", "301"))
+        self.assertEqual(graph.resolve("/b"), "/c/")
+        self.assertEqual(graph.resolve("/b/"), "/d/")
+
+    def test_find_loop(self):
+        graph = self._graph(("/a/", "/b/", "301"), ("/b/", "/c/", "302"), ("/c/", "/a", "301"))
+        self.assertEqual(graph.find_loop("/a/", "/b/"), ["/a/", "/b/", "/c/", "/a"])
+        graph.add("/c/", "", "410")
+        self.assertIsNone(graph.find_loop("/a/", "/b/"))
+
+    def test_load(self):
+        Redirect.objects.create(site=self.site_1, old_path="/a/", new_path="/b/")
+        Redirect.objects.create(site=self.site_1, old_path="/c/", new_path="")
+        Redirect.objects.create(site=self.site_1, old_path="/d/", new_path="/e/", subpath_match=True)
+        with self.assertNumQueries(1):
+            graph = RedirectGraph.load(self.site_1.pk)
+        self.assertEqual(graph.edges, {"/a/": ("/b/", "301")})
+
+
+@override_settings(DJANGOCMS_REDIRECT_FLATTEN_CHAINS=True)
+class TestFlattenChains(BaseRedirectTest):
+    def test_save_forward(self):
+        Redirect.objects.create(site=self.site_1, old_path="/c/", new_path="/d/")
+        Redirect.objects.create(site=self.site_1, old_path="/b/", new_path="/c/")
+        redirect = Redirect.objects.create(site=self.site_1, old_path="/a/", new_path="/b/", response_code="302")
+        self.assertEqual(redirect.new_path, "/d/")
+        self.assertEqual(Redirect.objects.get(old_path="/b/").new_path, "/d/")
+
+    def test_save_upstream(self):
+        Redirect.objects.create(site=self.site_1, old_path="/a/", new_path="/b/")
+        Redirect.objects.create(site=self.site_1, old_path="/x/", new_path="/b/", subpath_match=True)
+        middleware = RedirectMiddleware(lambda request: None)
+        self.assertEqual(middleware.do_redirect(self.request("/a/"))["Location"], "/b/")
+        Redirect.objects.create(site=self.site_1, old_path="/b/", new_path="/c/")
+        self.assertEqual(Redirect.objects.get(old_path="/a/").new_path, "/c/")
+        self.assertEqual(Redirect.objects.get(old_path="/x/").new_path, "/b/")
+        self.assertEqual(middleware.do_redirect(self.request("/a/"))["Location"], "/c/")
+
+    def test_temporary_not_flattened(self):
+        Redirect.objects.create(site=self.site_1, old_path="/b/", new_path="/c/", response_code="302")
+        redirect = Redirect.objects.create(site=self.site_1, old_path="/a/", new_path="/b/")
+        self.assertEqual(redirect.new_path, "/b/")
+
+    def test_save_update_fields(self):
+        Redirect.objects.create(site=self.site_1, old_path="/b/", new_path="/c/")
+        redirect = Redirect.objects.create(site=self.site_1, old_path="/a/", new_path="/x/")
+
+        # saving other fields does not load the chain
+        redirect.new_path = "/b/"
+        redirect.hit_count = 1
+        with self.assertNumQueries(1):
+            redirect.save(update_fields=["hit_count"])
+        self.assertEqual(redirect.new_path, "/b/")
+
+        redirect.save(update_fields=["new_path"])
+        self.assertEqual(Redirect.objects.get(old_path="/a/").new_path, "/c/")
+
+        # the flattened new_path is saved along with the other fields
+        Redirect.objects.filter(old_path="/a/").update(new_path="/b/", response_code="302")
+        redirect.refresh_from_db()
+        redirect.response_code = "301"
+        redirect.save(update_fields=["response_code"])
+        self.assertEqual(Redirect.objects.get(old_path="/a/").new_path, "/c/")
+
+    def test_import(self):
+        Redirect.objects.create(site=self.site_1, old_path="/a/", new_path="/b/")
+        handle, path = tempfile.mkstemp(suffix=".csv")
+        with os.fdopen(handle, "w", encoding="utf-8") as stream:
+            stream.write("old_path,new_path\n/x/,/y/\n/b/,/c/\n/c/,/d/\n/y/,/z/\n")
+        self.addCleanup(os.unlink, path)
+        with self.assertNumQueries(11):
+            call_command("import_redirects", path, "--batch-size", "2", stdout=StringIO(), stderr=StringIO())
+        self.assertEqual(
+            dict(Redirect.objects.values_list("old_path", "new_path")),
+            {"/a/": "/d/", "/b/": "/d/", "/c/": "/d/", "/x/": "/z/", "/y/": "/z/"},
+        )
+
+    @override_settings(DJANGOCMS_REDIRECT_FLATTEN_CHAINS=False)
+    def test_disabled(self):
+        Redirect.objects.create(site=self.site_1, old_path="/b/", new_path="/c/")
+        redirect = Redirect.objects.create(site=self.site_1, old_path="/a/", new_path="/b/")
+        self.assertEqual(redirect.new_path, "/b/")
+
+
+class TestLoopValidation(BaseRedirectTest):
+    def _form(self, old_path, new_path, instance=None, **data):
+        data.update({"site": self.site_1.pk, "old_path": old_path, "new_path": new_path, "response_code": "301"})
+        return RedirectForm(data=data, instance=instance)
+
+    def test_self_loop(self):
+        form = self._form("/a/", "/a/")
+        self.assertFalse(form.is_valid())
+        self.assertIn("/a/ -> /a/", form.errors["new_path"][0])
+
+    def test_loop(self):
+        Redirect.objects.create(site=self.site_1, old_path="/b/", new_path="/c/", response_code="302")
+        Redirect.objects.create(site=self.site_1, old_path="/c/", new_path="/a")
+        form = self._form("/a/", "/b/")
+        self.assertFalse(form.is_valid())
+        self.assertIn("/a/ -> /b/ -> /c/ -> /a", form.errors["new_path"][0])
+
+    def test_no_loop(self):
+        Redirect.objects.create(site=self.site_1, old_path="/b/", new_path="/c/")
+        self.assertTrue(self._form("/a/", "/b/").is_valid())
+        self.assertTrue(self._form("/c/", "/b/", catchall_redirect=True).is_valid())
+
+    def test_edit(self):
+        redirect = Redirect.objects.create(site=self.site_1, old_path="/a/", new_path="/x/")
+        Redirect.objects.create(site=self.site_1, old_path="/b/", new_path="/a/")
+        self.assertTrue(self._form("/a/old/", "/b/", instance=redirect).is_valid())
+        self.assertFalse(self._form("/a/", "/b/", instance=redirect).is_valid())
+
+    def test_queries(self):
+        Redirect.objects.bulk_create(
+            Redirect(site=self.site_1, old_path="/other-{}/".format(index), new_path="/x/") for index in range(50)
+        )
+        Redirect.objects.create(site=self.site_1, old_path="/b/", new_path="/c/")
+        form = self._form("/a/", "/b/")
+        # the site, one query per hop of the chain (/b/ then /c/) and the unique checks
+        with self.assertNumQueries(5):
+            self.assertTrue(form.is_valid())
+
+    @override_settings(DJANGOCMS_REDIRECT_FLATTEN_CHAINS=True)
+    def test_save_reuses_graph(self):
+        Redirect.objects.create(site=self.site_1, old_path="/b/", new_path="/c/")
+        form = self._form("/a/", "/b/")
+        self.assertTrue(form.is_valid())
+        # the insert and the redirects to update upstream: the chain fetched by the validation is reused
+        with self.assertNumQueries(2):
+            redirect = form.save()
+        self.assertEqual(redirect.new_path, "/c/")
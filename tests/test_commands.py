@@ -0,0 +1,243 @@
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.sites.models import Site
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from djangocms_redirect.middleware import RedirectMiddleware
+from djangocms_redirect.models import Redirect
+
+from . import BaseRedirectTest
+
+
+class TestImportRedirects(BaseRedirectTest):
+    def _write(self, content, suffix):
+        handle, path = tempfile.mkstemp(suffix=suffix)
+        with os.fdopen(handle, "w", encoding="utf-8") as stream:
+            stream.write(content)
+        self.addCleanup(os.unlink, path)
+        return path
+
+    def _import(self, path, *args):
+        stdout, stderr = StringIO(), StringIO()
+        call_command("import_redirects", path, *args, stdout=stdout, stderr=stderr)
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_import_csv(self):
+        path = self._write(
+            "old_path,new_path,response_code,subpath_match,catchall_redirect\n"
+            "/en/a/,/en/b/,302,,\n"
+            "en/c,/en/d/,,true,\n",
+            ".csv",
+        )
+        stdout, stderr = self._import(path)
+        self.assertIn("Imported 2 redirects", stdout)
+        self.assertEqual(stderr, "")
+        first = Redirect.objects.get(old_path="/en/a/")
+        self.assertEqual(first.response_code, "302")
+        self.assertEqual(first.site_id, self.site_1.pk)
+        self.assertFalse(first.subpath_match)
+        second = Redirect.objects.get(old_path="/en/c/")
+        self.assertEqual(second.response_code, "301")
+        self.assertEqual(second.lookup_path, "/en/c/")
+        self.assertTrue(second.subpath_match)
+
+    def test_import_jsonl_updates(self):
+        Redirect.objects.create(site=self.site_1, old_path="/en/a/", new_path="/en/old/")
+        path = self._write(
+            json.dumps({"old_path": "/en/a/", "new_path": "/en/new/", "response_code": "302"})
+            + "\n\n"
+            + json.dumps({"old_path": "/en/b/", "new_path": "/en/c/", "catchall_redirect": True})
+            + "\n",
+            ".jsonl",
+        )
+        self._import(path)
+        self.assertEqual(Redirect.objects.count(), 2)
+        updated = Redirect.objects.get(old_path="/en/a/")
+        self.assertEqual(updated.new_path, "/en/new/")
+        self.assertEqual(updated.response_code, "302")
+        self.assertTrue(Redirect.objects.get(old_path="/en/b/").catchall_redirect)
+
+    def test_invalid_rows(self):
+        path = self._write(
+            "{not json}\n"
+            + json.dumps({"new_path": "/en/a/"})
+            + "\n"
+            + json.dumps({"old_path": "/en/a/", "response_code": "200"})
+            + "\n"
+            + json.dumps({"old_path": "/en/b/", "site": 999})
+            + "\n"
+            + json.dumps({"old_path": "/en/" + "c" * 200})
+            + "\n"
+            + json.dumps({"old_path": "/en/d/", "new_path": "/en/e/"})
+            + "\n",
+            ".jsonl",
+        )
+        stdout, stderr = self._import(path)
+        self.assertIn("Imported 1 redirects", stdout)
+        self.assertIn("5 rows skipped", stdout)
+        for line in range(1, 6):
+            self.assertIn("Line {}:".format(line), stderr)
+        self.assertEqual(list(Redirect.objects.values_list("old_path", flat=True)), ["/en/d/"])
+
+    def test_regex_prefix_rows(self):
+        path = self._write(
+            "old_path,new_path,subpath_match,catchall_redirect,regex_match\n"
+            "^/en/a/(.*)$,/en/b/,1,0,1\n"
+            "^/en/c/(.*)$,/en/d/,0,1,1\n"
+            "^/en/e/(.*)$,/en/f/\\1,0,0,1\n",
+            ".csv",
+        )
+        stdout, stderr = self._import(path)
+        self.assertIn("2 rows skipped", stdout)
+        for line in (2, 3):
+            self.assertIn(
+                "Line {}: Regular expression redirects can't be subpath or catchall redirects.".format(line), stderr
+            )
+        self.assertEqual(list(Redirect.objects.values_list("old_path", flat=True)), ["^/en/e/(.*)$"])
+
+    def test_duplicated_rows(self):
+        path = self._write("old_path,new_path\n/en/a/,/en/b/\n/en/a/,/en/c/\n", ".csv")
+        self._import(path)
+        self.assertEqual(Redirect.objects.get(old_path="/en/a/").new_path, "/en/c/")
+
+    def test_missing_file(self):
+        with self.assertRaisesMessage(CommandError, "No such file or directory"):
+            self._import(os.path.join(tempfile.gettempdir(), "missing-redirects.csv"))
+        with self.assertRaisesMessage(CommandError, "Is a directory"):
+            self._import(tempfile.gettempdir())
+
+    def test_batches(self):
+        rows = "".join("/en/{0}/,/en/{0}-new/\n".format(index) for index in range(25))
+        path = self._write("old_path,new_path\n" + rows, ".csv")
+        with patch("djangocms_redirect.models.bump_site_generation") as bump:
+            stdout, _stderr = self._import(path, "--batch-size", "10", "--verbosity", "2")
+        self.assertEqual(Redirect.objects.count(), 25)
+        self.assertEqual(bump.call_count, 3)
+        self.assertIn("10 redirects imported", stdout)
+        self.assertIn("20 redirects imported", stdout)
+
+    def test_cache_invalidated(self):
+        middleware = RedirectMiddleware(lambda request: None)
+        self.assertIsNone(middleware.do_redirect(self.request("/en/a/")))
+        path = self._write("old_path,new_path\n/en/a/,/en/b/\n", ".csv")
+        self._import(path)
+        response = middleware.do_redirect(self.request("/en/a/"))
+        self.assertEqual(response.status_code, 301)
+        self.assertEqual(response["Location"], "/en/b/")
+
+
+class TestExportRedirects(BaseRedirectTest):
+    def _export(self, *args):
+        stdout = StringIO()
+        call_command("export_redirects", *args, stdout=stdout, stderr=StringIO())
+        return stdout.getvalue()
+
+    def test_export_csv(self):
+        Redirect.objects.create(site=self.site_1, old_path="/en/b/", new_path="/en/c/", catchall_redirect=True)
+        Redirect.objects.create(site=self.site_1, old_path="/en/a/", new_path="/en/b/", response_code="302")
+        self.assertEqual(
+            self._export().splitlines(),
+            [
+                "site,old_path,new_path,response_code,subpath_match,catchall_redirect,regex_match",
+                "{},/en/a/,/en/b/,302,False,False,False".format(self.site_1.pk),
+                "{},/en/b/,/en/c/,301,False,True,False".format(self.site_1.pk),
+            ],
+        )
+
+    def test_export_site(self):
+        site_2 = Site.objects.create(domain="example2.com", name="example2.com")
+        Redirect.objects.create(site=self.site_1, old_path="/en/a/", new_path="/en/b/")
+        Redirect.objects.create(site=site_2, old_path="/en/c/", new_path="/en/d/")
+        lines = self._export("--format", "jsonl", "--site", str(site_2.pk)).splitlines()
+        self.assertEqual(len(lines), 1)
+        self.assertEqual(
+            json.loads(lines[0]),
+            {
+                "site": site_2.pk,
+                "old_path": "/en/c/",
+                "new_path": "/en/d/",
+                "response_code": "301",
+                "subpath_match": False,
+                "catchall_redirect": False,
+                "regex_match": False,
+            },
+        )
+
+    def test_round_trip(self):
+        site_2 = Site.objects.create(domain="example2.com", name="example2.com")
+        Redirect.objects.create(site=self.site_1, old_path="/en/a/", new_path="/en/b/", subpath_match=True)
+        Redirect.objects.create(site=site_2, old_path="/en/c/", new_path="", response_code="410")
+        Redirect.objects.create(site=site_2, old_path=r"^/blog/(\d+)$", new_path=r"/news/\1", regex_match=True)
+        columns = (
+            "site_id",
+            "old_path",
+            "new_path",
+            "response_code",
+            "subpath_match",
+            "catchall_redirect",
+            "regex_match",
+        )
+        expected = list(Redirect.objects.order_by("pk").values_list(*columns))
+        for suffix in (".csv", ".jsonl"):
+            handle, path = tempfile.mkstemp(suffix=suffix)
+            os.close(handle)
+            self.addCleanup(os.unlink, path)
+            call_command("export_redirects", "--output", path, "--chunk-size", "1", stderr=StringIO())
+            Redirect.objects.all().delete()
+            call_command("import_redirects", path, stdout=StringIO(), stderr=StringIO())
+            self.assertEqual(list(Redirect.objects.order_by("site_id").values_list(*columns)), expected)
+
+
+class TestWarmRedirectCache(BaseRedirectTest):
+    def _warm(self, *args):
+        stdout = StringIO()
+        call_command("warm_redirect_cache", *args, stdout=stdout)
+        return stdout.getvalue()
+
+    def test_warm_exact(self):
+        Redirect.objects.create(site=self.site_1, old_path="/en/a/", new_path="/en/b/")
+        Redirect.objects.create(site=self.site_1, old_path="/en/c", new_path="/en/d/", response_code="302")
+        Redirect.objects.create(site=self.site_1, old_path="/en/c/", new_path="/en/e/")
+        Redirect.objects.create(site=self.site_1, old_path="/en/f/", new_path="/en/g/", subpath_match=True)
+        # /en/a/ and /en/a, /en/c and /en/c/, /en/f/ and /en/f (matched by the subpath redirect itself)
+        self.assertIn("6 cache entries stored", self._warm("--chunk-size", "1"))
+
+        middleware = RedirectMiddleware(lambda request: None)
+        with self.assertNumQueries(0):
+            self.assertEqual(middleware.do_redirect(self.request("/en/a/"))["Location"], "/en/b/")
+            self.assertEqual(middleware.do_redirect(self.request("/en/a"))["Location"], "/en/b/")
+            self.assertEqual(middleware.do_redirect(self.request("/en/c"))["Location"], "/en/d/")
+            self.assertEqual(middleware.do_redirect(self.request("/en/c/"))["Location"], "/en/e/")
+            self.assertEqual(middleware.do_redirect(self.request("/en/f/"))["Location"], "/en/g/")
+        with self.assertNumQueries(2):
+            self.assertEqual(middleware.do_redirect(self.request("/en/f/x/"))["Location"], "/en/g/x/")
+
+    def test_warm_shared_lookup_path(self):
+        Redirect.objects.create(site=self.site_1, old_path="/en/a b/", new_path="/en/c/")
+        Redirect.objects.create(site=self.site_1, old_path="/en/a%20b/", new_path="/en/d/")
+        middleware = RedirectMiddleware(lambda request: None)
+        expected = middleware.do_redirect(self.request("/en/a b/"))["Location"]
+        cache.clear()
+
+        self._warm()
+        with self.assertNumQueries(0):
+            self.assertEqual(middleware.do_redirect(self.request("/en/a b/"))["Location"], expected)
+
+    def test_warm_paths_file(self):
+        Redirect.objects.create(site=self.site_1, old_path="/en/f/", new_path="/en/g/", subpath_match=True)
+        handle, path = tempfile.mkstemp()
+        with os.fdopen(handle, "w", encoding="utf-8") as stream:
+            stream.write("/en/f/x/\n\n/en/missing/\n")
+        self.addCleanup(os.unlink, path)
+        self.assertIn("2 paths looked up", self._warm("--paths-file", path))
+
+        middleware = RedirectMiddleware(lambda request: None)
+        with self.assertNumQueries(0):
+            self.assertEqual(middleware.do_redirect(self.request("/en/f/x/"))["Location"], "/en/g/x/")
+            self.assertIsNone(middleware.do_redirect(self.request("/en/missing/")))
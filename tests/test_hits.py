@@ -0,0 +1,111 @@
+from unittest.mock import patch
+
+from django.test.utils import override_settings
+
+from djangocms_redirect import hits
+from djangocms_redirect.middleware import RedirectMiddleware
+from djangocms_redirect.models import Redirect
+from djangocms_redirect.utils import get_site_generation
+
+from . import BaseRedirectTest
+
+
+class ImmediateExecutor:
+    def __init__(self):
+        self.calls = 0
+
+    def submit(self, function, *args):
+        self.calls += 1
+        function(*args)
+
+
+@override_settings(DJANGOCMS_REDIRECT_HIT_COUNT=True)
+class TestHitCount(BaseRedirectTest):
+    def setUp(self):
+        super().setUp()
+        self.exact = Redirect.objects.create(site=self.site_1, old_path="/en/a/", new_path="/en/b/")
+        self.prefix = Redirect.objects.create(site=self.site_1, old_path="/en/f", new_path="/en/g", subpath_match=True)
+        self.regex = Redirect.objects.create(
+            site=self.site_1, old_path=r"^/en/x/(\d+)/$", new_path=r"/en/y/\1/", regex_match=True
+        )
+
+    def _assert_recorded(self):
+        middleware = RedirectMiddleware(lambda request: None)
+        with patch("djangocms_redirect.hits.schedule_flush") as schedule_flush:
+            for path in ("/en/a/", "/en/a", "/en/foo/", "/en/x/1/", "/en/x/2/", "/en/missing/"):
+                middleware.do_redirect(self.request(path))
+        self.assertEqual(schedule_flush.call_count, 5)
+        pending = hits.get_pending_hits()
+        self.assertEqual(
+            {redirect_id: count for redirect_id, (count, _timestamp) in pending.items()},
+            {self.exact.pk: 2, self.prefix.pk: 1, self.regex.pk: 2},
+        )
+
+    def test_record(self):
+        self._assert_recorded()
+
+    @override_settings(DJANGOCMS_REDIRECT_PREFIX_LOOKUP="database")
+    def test_record_database(self):
+        self._assert_recorded()
+
+    @override_settings(DJANGOCMS_REDIRECT_IN_MEMORY_TABLE=True)
+    def test_record_table(self):
+        self._assert_recorded()
+
+    @override_settings(DJANGOCMS_REDIRECT_HIT_COUNT=False)
+    def test_disabled(self):
+        middleware = RedirectMiddleware(lambda request: None)
+        middleware.do_redirect(self.request("/en/a/"))
+        self.assertEqual(hits.get_pending_hits(), {})
+
+    def test_flush(self):
+        generation = get_site_generation(self.site_1.pk)
+        for _ in range(3):
+            hits.record_hit(self.exact.pk)
+        hits.record_hit(self.prefix.pk)
+        with patch("djangocms_redirect.hits.FLUSH_BATCH_SIZE", 1), self.assertNumQueries(2):
+            self.assertEqual(hits.flush_hits(), 2)
+        self.assertEqual(hits.get_pending_hits(), {})
+        self.exact.refresh_from_db()
+        self.prefix.refresh_from_db()
+        self.regex.refresh_from_db()
+        self.assertEqual((self.exact.hit_count, self.prefix.hit_count, self.regex.hit_count), (3, 1, 0))
+        self.assertIsNotNone(self.exact.last_hit)
+        self.assertIsNone(self.regex.last_hit)
+        # counts are added to the stored ones, without invalidating the cached redirects
+        hits.record_hit(self.exact.pk)
+        hits.flush_hits()
+        self.exact.refresh_from_db()
+        self.assertEqual(self.exact.hit_count, 4)
+        self.assertEqual(get_site_generation(self.site_1.pk), generation)
+
+    def test_flush_error(self):
+        hits.record_hit(self.exact.pk)
+        with patch("djangocms_redirect.models.RedirectQuerySet.update", side_effect=ValueError):
+            with self.assertLogs("djangocms_redirect.hits", "ERROR"):
+                self.assertEqual(hits.flush_hits(), 0)
+        hits.record_hit(self.exact.pk)
+        self.assertEqual(hits.get_pending_hits()[self.exact.pk][0], 2)
+
+    def test_schedule_flush(self):
+        executor = ImmediateExecutor()
+        with patch("djangocms_redirect.hits._last_flush", float("-inf")), patch(
+            "djangocms_redirect.hits._flush_in_thread"
+        ):
+            self.assertFalse(hits.schedule_flush(executor))
+            hits.record_hit(self.exact.pk)
+            self.assertTrue(hits.schedule_flush(executor))
+            hits.record_hit(self.exact.pk)
+            self.assertFalse(hits.schedule_flush(executor))
+        self.assertEqual(executor.calls, 1)
+
+    def test_flush_at_exit(self):
+        hits.record_hit(self.exact.pk)
+        with override_settings(DJANGOCMS_REDIRECT_HIT_COUNT=False), self.assertNumQueries(0):
+            hits._flush_at_exit()
+        hits._flush_at_exit()
+        self.assertEqual(hits.get_pending_hits(), {})
+        self.exact.refresh_from_db()
+        self.assertEqual(self.exact.hit_count, 1)
+        with self.assertNumQueries(0):
+            hits._flush_at_exit()
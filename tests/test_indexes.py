@@ -0,0 +1,94 @@
+from unittest import skipUnless
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from djangocms_redirect.middleware import RedirectMiddleware
+from djangocms_redirect.models import Redirect
+
+from . import BaseRedirectTest
+
+
+class IndexesMixin:
+    explain_prefix = None
+
+    def setUp(self):
+        super().setUp()
+        Redirect.objects.create(site=self.site_1, old_path="/en/a/", new_path="/en/b/")
+        Redirect.objects.create(site=self.site_1, old_path="/en/f", new_path="/en/g", subpath_match=True)
+        Redirect.objects.create(site=self.site_1, old_path=r"^/en/x/(\d+)/$", new_path=r"/en/y/\1/", regex_match=True)
+
+    def _explain(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(self.explain_prefix + sql)
+            return "\n".join(" ".join(str(column) for column in row) for row in cursor.fetchall())
+
+    def assertUsesIndexes(self, queries, indexes):
+        """Check that the captured queries use the given indexes, in order."""
+        # iterator() queries are wrapped in a server side cursor declaration on PostgreSQL
+        selects = [
+            query["sql"][query["sql"].index('SELECT "django_redirect"') :]
+            for query in queries
+            if 'SELECT "django_redirect"' in query["sql"]
+        ]
+        self.assertEqual(len(selects), len(indexes), selects)
+        for sql, index in zip(selects, indexes):
+            plan = self._explain(sql)
+            self.assertIn(index, plan, "{}\n{}".format(sql, plan))
+
+    def _lookup(self, path):
+        with CaptureQueriesContext(connection) as queries:
+            RedirectMiddleware(lambda request: None).do_redirect(self.request(path))
+        return queries
+
+    def test_exact(self):
+        self.assertUsesIndexes(self._lookup("/en/a/"), ["django_redirect_site_lookup"])
+
+    def test_prefix_table(self):
+        self.assertUsesIndexes(
+            self._lookup("/en/missing/"), ["django_redirect_site_lookup", "django_redirect_prefix_rules"]
+        )
+
+    @override_settings(DJANGOCMS_REDIRECT_PREFIX_LOOKUP="database")
+    def test_prefix_database(self):
+        self.assertUsesIndexes(
+            self._lookup("/en/missing/"),
+            ["django_redirect_site_lookup", "django_redirect_prefix_rules", "django_redirect_prefix_rules"],
+        )
+
+    @override_settings(DJANGOCMS_REDIRECT_FLATTEN_CHAINS=True)
+    def test_chains(self):
+        with CaptureQueriesContext(connection) as queries:
+            Redirect.objects.create(site=self.site_1, old_path="/en/b/", new_path="/en/c/")
+        # the chain from the new path, then the redirects pointing to the old path
+        self.assertUsesIndexes(queries, ["django_redirect_site_lookup", "django_redirect_site_new_path"])
+
+
+@skipUnless(connection.vendor == "sqlite", "SQLite query plans")
+class TestSQLiteIndexes(IndexesMixin, BaseRedirectTest):
+    explain_prefix = "EXPLAIN QUERY PLAN "
+
+
+@skipUnless(connection.vendor == "postgresql", "PostgreSQL query plans")
+class TestPostgreSQLIndexes(IndexesMixin, BaseRedirectTest):
+    explain_prefix = "EXPLAIN "
+
+    def setUp(self):
+        super().setUp()
+        # enough exact redirects and statistics for the planner to tell the indexes apart
+        Redirect.objects.bulk_create(
+            Redirect(site=self.site_1, old_path="/en/page-{}/".format(index), new_path="/en/b/")
+            for index in range(1000)
+        )
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE django_redirect")
+            # the test table is still too small for the planner to prefer an index to a sequential scan
+            cursor.execute("SET LOCAL enable_seqscan = off")
+
+    def test_admin_search(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM pg_indexes WHERE indexname = 'django_redirect_new_path_trgm'")
+            if not cursor.fetchone():
+                self.skipTest("pg_trgm extension not available")
+        plan = Redirect.objects.filter(new_path__icontains="en/b").explain()
+        self.assertIn("django_redirect_new_path_trgm", plan)
@@ -0,0 +1,73 @@
+from unittest.mock import patch
+
+from django.contrib.sites.models import Site
+from django.core.cache import cache
+from django.test.utils import override_settings
+
+from djangocms_redirect.local_cache import LocalCache
+from djangocms_redirect.middleware import RedirectMiddleware
+from djangocms_redirect.models import Redirect
+
+from . import BaseRedirectTest
+
+
+class TestLocalCache(BaseRedirectTest):
+    def test_lru(self):
+        local_cache = LocalCache(2, 60)
+        local_cache.set("a", 1, 1)
+        local_cache.set("b", 2, 1)
+        self.assertEqual(local_cache.get("a", 1), 1)
+        local_cache.set("c", 3, 1)
+        self.assertEqual(len(local_cache), 2)
+        self.assertIsNone(local_cache.get("b", 1))
+        self.assertEqual(local_cache.get("a", 1), 1)
+        self.assertEqual(local_cache.get("c", 1), 3)
+        local_cache.clear()
+        self.assertIsNone(local_cache.get("a", 1))
+
+    def test_timeout(self):
+        local_cache = LocalCache(2, 60)
+        with patch("djangocms_redirect.local_cache.time.monotonic", return_value=1000):
+            local_cache.set("a", 1, 1)
+        with patch("djangocms_redirect.local_cache.time.monotonic", return_value=1059):
+            self.assertEqual(local_cache.get("a", 1), 1)
+        with patch("djangocms_redirect.local_cache.time.monotonic", return_value=1061):
+            self.assertIsNone(local_cache.get("a", 1))
+        self.assertEqual(len(local_cache), 0)
+
+    def test_generation(self):
+        local_cache = LocalCache(2, 60)
+        local_cache.set("a", 1, 1)
+        self.assertIsNone(local_cache.get("a", 2))
+        self.assertEqual(len(local_cache), 0)
+
+
+@override_settings(DJANGOCMS_REDIRECT_LOCAL_CACHE_SIZE=10, DJANGOCMS_REDIRECT_GENERATION_CHECK_INTERVAL=60)
+class TestLocalCacheMiddleware(BaseRedirectTest):
+    def test_two_tiers(self):
+        redirect = Redirect.objects.create(site=self.site_1, old_path="/en/a/", new_path="/en/b/")
+        middleware = RedirectMiddleware(lambda request: None)
+        Site.objects.get_current()
+
+        with self.assertNumQueries(1):
+            response = middleware.do_redirect(self.request("/en/a/"))
+        self.assertEqual(response["Location"], "/en/b/")
+
+        # served by the local cache even if the shared one is flushed
+        cache.clear()
+        with self.assertNumQueries(0), patch("djangocms_redirect.middleware.cache.get") as cache_get:
+            response = middleware.do_redirect(self.request("/en/a/"))
+        cache_get.assert_not_called()
+        self.assertEqual(response["Location"], "/en/b/")
+
+        # a change in the redirects invalidates the local cache
+        redirect.new_path = "/en/c/"
+        redirect.save()
+        with self.assertNumQueries(1):
+            response = middleware.do_redirect(self.request("/en/a/"))
+        self.assertEqual(response["Location"], "/en/c/")
+
+    def test_disabled(self):
+        with self.settings(DJANGOCMS_REDIRECT_LOCAL_CACHE_SIZE=0):
+            middleware = RedirectMiddleware(lambda request: None)
+        self.assertIsNone(middleware.local_cache)
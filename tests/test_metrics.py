@@ -0,0 +1,109 @@
+from unittest import skipUnless
+
+from asgiref.sync import async_to_sync
+from django.http import Http404
+from django.test.utils import override_settings
+
+from djangocms_redirect.metrics import Histogram, MetricsRegistry, redirect_lookup, registry
+from djangocms_redirect.middleware import ASYNC_SUPPORT, RedirectMiddleware
+from djangocms_redirect.models import Redirect
+from djangocms_redirect.views import metrics_view
+
+from . import BaseRedirectTest
+
+
+@override_settings(DJANGOCMS_REDIRECT_METRICS=True)
+class TestMetrics(BaseRedirectTest):
+    def setUp(self):
+        super().setUp()
+        registry.reset()
+        Redirect.objects.create(site=self.site_1, old_path="/en/a/", new_path="/en/b/")
+        Redirect.objects.create(site=self.site_1, old_path="/en/f", new_path="/en/g", subpath_match=True)
+        Redirect.objects.create(site=self.site_1, old_path="/en/h", new_path="/en/i/", catchall_redirect=True)
+        Redirect.objects.create(site=self.site_1, old_path=r"^/en/x/(\d+)/$", new_path=r"/en/y/\1/", regex_match=True)
+        self.events = []
+        redirect_lookup.connect(self._receiver)
+        self.addCleanup(redirect_lookup.disconnect, self._receiver)
+
+    def _receiver(self, **kwargs):
+        self.events.append(kwargs)
+
+    def _lookups(self, *paths):
+        middleware = RedirectMiddleware(lambda request: None)
+        for path in paths:
+            middleware.do_redirect(self.request(path))
+
+    def test_record(self):
+        self._lookups("/en/a/", "/en/a/", "/en/foo/", "/en/home/", "/en/x/1/", "/en/missing/", "/en/missing/")
+        self.assertEqual(registry.lookups, {"miss": 5, "hit": 1, "negative_hit": 1})
+        self.assertEqual(registry.matches, {"exact": 2, "subpath": 1, "catchall": 1, "regex": 1, "none": 2})
+        self.assertEqual(registry.latency.count, 7)
+        # exact redirect found at once, prefix and pattern redirects loaded on the first lookup only
+        self.assertEqual(registry.queries.count, 5)
+        self.assertEqual(registry.queries.sum, 1 + 2 + 1 + 1 + 1)
+        self.assertEqual(len(self.events), 7)
+        self.assertEqual(
+            {key: value for key, value in self.events[0].items() if key not in ("signal", "sender", "duration")},
+            {"path": "/en/a/", "cache": "miss", "match": "exact", "queries": 1},
+        )
+
+    @override_settings(DJANGOCMS_REDIRECT_BLOOM_FILTER=True)
+    def test_filtered(self):
+        # regular expression redirects disable the filter
+        Redirect.objects.filter(regex_match=True).delete()
+        self._lookups("/de/missing/")
+        self.assertEqual(registry.lookups, {"filtered": 1})
+        self.assertEqual(registry.matches, {"none": 1})
+
+    @override_settings(DJANGOCMS_REDIRECT_IN_MEMORY_TABLE=True)
+    def test_table(self):
+        self._lookups("/en/a/", "/en/foo/")
+        self.assertEqual(registry.lookups, {"table": 2})
+        self.assertEqual(registry.matches, {"exact": 1, "subpath": 1})
+        self.assertEqual(registry.queries.count, 0)
+
+    @skipUnless(ASYNC_SUPPORT, "Native async support requires Django 4.1+")
+    def test_async(self):
+        async def get_response(request):
+            return None
+
+        middleware = RedirectMiddleware(get_response)
+        async_to_sync(middleware.ado_redirect)(self.request("/en/a/"))
+        async_to_sync(middleware.ado_redirect)(self.request("/en/a/"))
+        self.assertEqual(registry.lookups, {"miss": 1, "hit": 1})
+        self.assertEqual(registry.queries.count, 0)
+        self.assertIsNone(self.events[0]["queries"])
+
+    @override_settings(DJANGOCMS_REDIRECT_METRICS=False)
+    def test_disabled(self):
+        self._lookups("/en/a/", "/en/missing/")
+        self.assertEqual(registry.lookups, {})
+        self.assertEqual(self.events, [])
+        with self.assertRaises(Http404):
+            metrics_view(self.request("/metrics/"))
+
+    def test_view(self):
+        self._lookups("/en/a/", "/en/a/")
+        response = metrics_view(self.request("/metrics/"))
+        self.assertEqual(response["Content-Type"], "text/plain; version=0.0.4; charset=utf-8")
+        content = response.content.decode()
+        self.assertIn("# TYPE djangocms_redirect_lookups_total counter", content)
+        self.assertIn('djangocms_redirect_lookups_total{cache="hit"} 1', content)
+        self.assertIn('djangocms_redirect_matches_total{match="exact"} 2', content)
+        self.assertIn('djangocms_redirect_miss_queries_bucket{le="1"} 1', content)
+        self.assertIn('djangocms_redirect_lookup_seconds_bucket{le="+Inf"} 2', content)
+        self.assertIn("djangocms_redirect_lookup_seconds_count 2", content)
+
+
+class TestHistogram(BaseRedirectTest):
+    def test_buckets(self):
+        histogram = Histogram((1, 5))
+        for value in (0, 1, 2, 7):
+            histogram.observe(value)
+        self.assertEqual(histogram.get_buckets(), [("1", 2), ("5", 3), ("+Inf", 4)])
+        self.assertEqual((histogram.sum, histogram.count), (10, 4))
+
+    def test_render_empty(self):
+        content = MetricsRegistry().render()
+        self.assertIn('djangocms_redirect_lookup_seconds_bucket{le="+Inf"} 0', content)
+        self.assertNotIn("djangocms_redirect_lookups_total{", content)
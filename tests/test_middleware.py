@@ -1,15 +1,26 @@
+import time
+import warnings
+from unittest.mock import patch
 from urllib.parse import unquote_plus
 
 import django
 from django.conf import settings
+from django.contrib.sites.models import Site
+from django.core.cache import cache
+from django.core.cache.backends.base import CacheKeyWarning
 from django.core.exceptions import ImproperlyConfigured
+from django.db.models import F, Value
+from django.db.models.functions import Concat
+from django.http import HttpResponseNotFound
 from django.test.utils import override_settings
 from django.utils.encoding import force_str
 from setuptools._distutils.version import LooseVersion
 
 from djangocms_redirect.admin import RedirectForm
 from djangocms_redirect.middleware import RedirectMiddleware
-from djangocms_redirect.models import Redirect
+from djangocms_redirect.models import Redirect, RedirectQuerySet
+from djangocms_redirect.table import get_redirect_table, get_redirect_tables_info
+from djangocms_redirect.utils import get_counter, get_key_from_path_and_site, get_site_generation
 
 from . import BaseRedirectTest
 
@@ -111,8 +122,10 @@ class TestRedirect(BaseRedirectTest):
             response_code="302",
         )
 
+        # paths are unquoted before lookup, thus a fully quoted path matches too
         response = self.client.get(escaped_path)
-        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.status_code, 302)
+        self.assertRedirects(response, redirect.new_path, status_code=302)
 
         redirect.old_path = "/path%20(escaped)/"
         redirect.save()
@@ -128,6 +141,92 @@ class TestRedirect(BaseRedirectTest):
         self.assertEqual(response.status_code, 302)
         self.assertRedirects(response, redirect.new_path, status_code=302)
 
+    def test_literal_percent_path(self):
+        Redirect.objects.create(site=self.site_1, old_path="/a b/", new_path="/unquoted/")
+        middleware = RedirectMiddleware(lambda request: None)
+
+        # the request path is /a%20b/ once unquoted by the server: it is not unquoted a second time
+        request = self.request("/a%2520b/")
+        self.assertEqual(request.path, "/a%20b/")
+        self.assertIsNone(middleware.do_redirect(request))
+
+        Redirect.objects.create(site=self.site_1, old_path="/a%2520b/", new_path="/percent/")
+        self.assertEqual(middleware.do_redirect(self.request("/a%2520b/"))["Location"], "/percent/")
+        self.assertEqual(middleware.do_redirect(self.request("/a%20b/"))["Location"], "/unquoted/")
+
+    def test_lookup_path(self):
+        redirect = Redirect.objects.create(site=self.site_1, old_path="path%20(escaped)", new_path="/")
+        self.assertEqual(redirect.lookup_path, "/path (escaped)")
+
+        redirect.old_path = "/other%20path/"
+        redirect.save(update_fields=["old_path"])
+        redirect.refresh_from_db()
+        self.assertEqual(redirect.lookup_path, "/other path/")
+
+        middleware = RedirectMiddleware(lambda request: None)
+        with self.assertNumQueries(1):
+            response = middleware.do_redirect(self.request("/other path"))
+        self.assertEqual(response.status_code, 301)
+
+    def test_bulk_invalidation(self):
+        Redirect.objects.create(site=self.site_1, old_path="/en/a/", new_path="/en/b/", catchall_redirect=True)
+        middleware = RedirectMiddleware(lambda request: None)
+        response = middleware.do_redirect(self.request("/en/a/child/"))
+        self.assertEqual(response["Location"], "/en/b/")
+
+        # the cached entry of the child path is invalidated as well
+        Redirect.objects.filter(old_path="/en/a/").update(new_path="/en/c/")
+        response = middleware.do_redirect(self.request("/en/a/child/"))
+        self.assertEqual(response["Location"], "/en/c/")
+
+        Redirect.objects.filter(old_path="/en/a/").update(old_path="/en/d%20e/")
+        self.assertIsNone(middleware.do_redirect(self.request("/en/a/child/")))
+        response = middleware.do_redirect(self.request("/en/d e/child/"))
+        self.assertEqual(response["Location"], "/en/c/")
+
+        Redirect.objects.bulk_create([Redirect(site=self.site_1, old_path="/en/f%20g/", new_path="/en/h/")])
+        response = middleware.do_redirect(self.request("/en/f g/"))
+        self.assertEqual(response["Location"], "/en/h/")
+
+        redirect = Redirect.objects.get(old_path="/en/f%20g/")
+        redirect.old_path = "/en/i/"
+        Redirect.objects.bulk_update([redirect], ["old_path"])
+        self.assertIsNone(middleware.do_redirect(self.request("/en/f g/")))
+        response = middleware.do_redirect(self.request("/en/i/"))
+        self.assertEqual(response["Location"], "/en/h/")
+
+    def test_update_expression(self):
+        Redirect.objects.create(site=self.site_1, old_path="/en/a%20b/", new_path="/en/c/")
+        middleware = RedirectMiddleware(lambda request: None)
+        self.assertEqual(middleware.do_redirect(self.request("/en/a b/"))["Location"], "/en/c/")
+
+        # lookup path computed from the value set by the database
+        Redirect.objects.filter(old_path="/en/a%20b/").update(old_path=Concat(Value("/fr"), F("old_path")))
+        self.assertEqual(Redirect.objects.get().lookup_path, "/fr/en/a b/")
+        self.assertIsNone(middleware.do_redirect(self.request("/en/a b/")))
+        self.assertEqual(middleware.do_redirect(self.request("/fr/en/a b/"))["Location"], "/en/c/")
+
+    def test_update_site_expression(self):
+        other_site = Site.objects.create(domain="other.example.com", name="other")
+        redirect = Redirect.objects.create(site=self.site_1, old_path="/en/a/", new_path="/en/b/")
+        generation, other_generation = get_site_generation(self.site_1.pk), get_site_generation(other_site.pk)
+
+        # target sites are read back from the database, and used as cache keys only once resolved
+        with warnings.catch_warnings():
+            warnings.simplefilter("error", CacheKeyWarning)
+            Redirect.objects.filter(pk=redirect.pk).update(site_id=Value(other_site.pk))
+            self.assertNotEqual(get_site_generation(self.site_1.pk), generation)
+            self.assertNotEqual(get_site_generation(other_site.pk), other_generation)
+
+            redirect.refresh_from_db()
+            redirect.site = self.site_1
+            redirect.old_path = "/en/c/"
+            # lookup_path is set along with the other fields, not recomputed afterwards
+            with patch.object(RedirectQuerySet, "_update_lookup_paths") as update_lookup_paths:
+                Redirect.objects.bulk_update([redirect], ["site", "old_path"])
+            update_lookup_paths.assert_not_called()
+        self.assertEqual(Redirect.objects.get(site=self.site_1).lookup_path, "/en/c/")
+
     def test_410_redirect(self):
         pages = self.get_pages()
 
@@ -198,6 +297,70 @@ class TestRedirect(BaseRedirectTest):
             response2 = self.client.get(pages[1].get_absolute_url())
         self.assertEqual(response2.status_code, 200)
 
+    def test_miss_queries(self):
+        Redirect.objects.create(site=self.site_1, old_path="/en/some/", new_path="/en/", subpath_match=True)
+        middleware = RedirectMiddleware(lambda request: None)
+
+        # one query for all the exact variants, one to build the prefix index
+        with self.assertNumQueries(2):
+            self.assertIsNone(middleware.do_redirect(self.request("/en/missing path")))
+        # prefix index is reused
+        with self.assertNumQueries(1):
+            self.assertIsNone(middleware.do_redirect(self.request("/en/other missing path")))
+        # cached
+        with self.assertNumQueries(0):
+            self.assertIsNone(middleware.do_redirect(self.request("/en/missing path")))
+
+        with override_settings(DJANGOCMS_REDIRECT_PREFIX_LOOKUP="database"):
+            # one query for all the exact variants, one for all the prefixes, one for the regular expressions
+            with self.assertNumQueries(3):
+                self.assertIsNone(middleware.do_redirect(self.request("/en/yet another missing path")))
+            # regular expressions are reused
+            with self.assertNumQueries(2):
+                self.assertIsNone(middleware.do_redirect(self.request("/en/last missing path")))
+
+    def test_variants_cached(self):
+        Redirect.objects.create(site=self.site_1, old_path="/en/a/", new_path="/en/b/")
+        Redirect.objects.create(site=self.site_1, old_path="/en/c", new_path="/en/d/")
+        Redirect.objects.create(site=self.site_1, old_path="/en/e/", new_path="/en/f/", subpath_match=True)
+        middleware = RedirectMiddleware(lambda request: None)
+
+        # the redirect of the slash terminated path is known, and cached with a single call
+        with patch("djangocms_redirect.middleware.cache.set_many", wraps=cache.set_many) as set_many:
+            middleware.do_redirect(self.request("/en/a"))
+        set_many.assert_called_once()
+        with self.assertNumQueries(0):
+            response = middleware.do_redirect(self.request("/en/a/"))
+        self.assertEqual(response["Location"], "/en/b/")
+
+        middleware.do_redirect(self.request("/en/e/g"))
+        with self.assertNumQueries(0):
+            response = middleware.do_redirect(self.request("/en/e/g/"))
+        self.assertEqual(response["Location"], "/en/f/g/")
+
+        middleware.do_redirect(self.request("/en/missing"))
+        with self.assertNumQueries(0):
+            self.assertIsNone(middleware.do_redirect(self.request("/en/missing/")))
+
+        # the slash terminated path has not been checked against prefix redirects
+        response = middleware.do_redirect(self.request("/en/c"))
+        self.assertEqual(response["Location"], "/en/d/")
+        self.assertIsNone(cache.get(get_key_from_path_and_site("/en/c/", self.site_1.pk)))
+
+    def test_exact_priority(self):
+        Redirect.objects.create(site=self.site_1, old_path="/en/path (escaped)/", new_path="/en/unquoted-slash/")
+        Redirect.objects.create(site=self.site_1, old_path="/en/path%20(escaped)", new_path="/en/quoted/")
+        Redirect.objects.create(site=self.site_1, old_path="/en/path", new_path="/en/prefix/", catchall_redirect=True)
+        middleware = RedirectMiddleware(lambda request: None)
+
+        with self.assertNumQueries(1):
+            response = middleware.do_redirect(self.request("/en/path (escaped)"))
+        self.assertEqual(response["Location"], "/en/quoted/")
+
+        Redirect.objects.filter(old_path="/en/path%20(escaped)").delete()
+        response = middleware.do_redirect(self.request("/en/path (escaped)"))
+        self.assertEqual(response["Location"], "/en/unquoted-slash/")
+
     def test_redirect_no_append_slash(self):
         pages = self.get_pages()
 
@@ -209,7 +372,7 @@ class TestRedirect(BaseRedirectTest):
                 response_code="301",
             )
 
-            with self.assertNumQueries(3):
+            with self.assertNumQueries(1):
                 response = self.client.get(pages[1].get_absolute_url().rstrip("/"))
             self.assertRedirects(response, redirect.new_path, status_code=301)
 
@@ -225,7 +388,7 @@ class TestRedirect(BaseRedirectTest):
                 response_code="301",
             )
 
-            with self.assertNumQueries(5):
+            with self.assertNumQueries(1):
                 response = self.client.get(original_path.rstrip("/"))
             self.assertRedirects(response, redirect.new_path, status_code=301)
 
@@ -241,7 +404,7 @@ class TestRedirect(BaseRedirectTest):
                 response_code="301",
             )
 
-            with self.assertNumQueries(7):
+            with self.assertNumQueries(1):
                 response = self.client.get(original_path.rstrip("/"))
             self.assertRedirects(response, redirect.new_path, status_code=301)
 
@@ -256,7 +419,7 @@ class TestRedirect(BaseRedirectTest):
                 response_code="301",
             )
 
-            with self.assertNumQueries(4):
+            with self.assertNumQueries(2):
                 response = self.client.get(pages[1].get_absolute_url().rstrip("/"))
             self.assertEqual(404, response.status_code)
 
@@ -393,6 +556,8 @@ class TestPartialMatch(BaseRedirectTest):
         {"en": {"title": "test page", "template": "page.html", "publish": True}},
         {"en": {"title": "internal page", "template": "page.html", "publish": True, "parent": "test-page"}},
     )
+    #: queries to look up a redirect which is not cached: exact redirects and prefix redirects table
+    lookup_queries = 2
 
     def setUp(self):
         super().setUp()
@@ -439,21 +604,21 @@ class TestPartialMatch(BaseRedirectTest):
 
     def test_no_substring(self):
         pages = self.get_pages()
-        with self.assertNumQueries(13):
+        with self.assertNumQueries(11 + self.lookup_queries):
             response = self.client.get(pages[2].get_absolute_url())
         self.assertEqual(response.status_code, 200)
 
     def test_partial_success(self):
         pages = self.get_pages()
         redirect = self._patch_catchall_redirect(Redirect.objects.get(old_path="/en/test-page/in"))
-        with self.assertNumQueries(2):
+        with self.assertNumQueries(self.lookup_queries):
             response = self.client.get(pages[2].get_absolute_url())
         self.assertRedirects(response, redirect.new_path, status_code=301, fetch_redirect_response=False)
 
     def test_partial_subpath_replace(self):
         pages = self.get_pages()
         self._patch_subpath_match(Redirect.objects.get(old_path="/en/test-page/in"))
-        with self.assertNumQueries(2):
+        with self.assertNumQueries(self.lookup_queries):
             response = self.client.get(pages[2].get_absolute_url())
         new_path = pages[2].get_absolute_url().replace("/en/test-page/in", "/bar")
         self.assertRedirects(response, new_path, status_code=301, fetch_redirect_response=False)
@@ -463,10 +628,288 @@ class TestPartialMatch(BaseRedirectTest):
         redirect = Redirect.objects.get(old_path="/en/test-page/internal")
         for patched in Redirect.objects.all():
             self._patch_catchall_redirect(patched)
-        with self.assertNumQueries(2):
+        with self.assertNumQueries(self.lookup_queries):
             response = self.client.get(pages[2].get_absolute_url())
         self.assertRedirects(response, redirect.new_path, status_code=302, fetch_redirect_response=False)
 
+    def test_shared_lookup_path(self):
+        # both redirects match /en/shared/: the smallest old_path wins, as for the exact lookups
+        Redirect.objects.create(site=self.site_1, old_path="/en/shared/", new_path="/second/", subpath_match=True)
+        Redirect.objects.create(site=self.site_1, old_path="/en/sh%61red/", new_path="/first/", subpath_match=True)
+        middleware = RedirectMiddleware(lambda request: None)
+        self.assertEqual(middleware.do_redirect(self.request("/en/shared/"))["Location"], "/first/")
+        self.assertEqual(middleware.do_redirect(self.request("/en/shared/page/"))["Location"], "/first/page/")
+
+
+@override_settings(DJANGOCMS_REDIRECT_LOCK_TIMEOUT=5, DJANGOCMS_REDIRECT_LOCK_WAIT=0.2)
+class TestStampedeProtection(BaseRedirectTest):
+    def setUp(self):
+        super().setUp()
+        Redirect.objects.create(site=self.site_1, old_path="/en/a/", new_path="/en/b/")
+        Site.objects.get_current()
+        self.middleware = RedirectMiddleware(lambda request: None)
+        self.key = get_key_from_path_and_site("/en/a/", self.site_1.pk)
+
+    def test_lock_released(self):
+        with self.assertNumQueries(1):
+            response = self.middleware.do_redirect(self.request("/en/a/"))
+        self.assertEqual(response["Location"], "/en/b/")
+        self.assertIsNone(cache.get("%s:LOCK" % self.key))
+
+    def test_coalesced(self):
+        cache.add("%s:LOCK" % self.key, 1)
+        cached_redirect = {"site": self.site_1.pk, "redirect": "/en/c/", "status_code": "301"}
+
+        def compute_elsewhere(seconds):
+            cache.set(self.key, cached_redirect)
+
+        with patch("djangocms_redirect.middleware.time.sleep", side_effect=compute_elsewhere) as sleep:
+            with self.assertNumQueries(0):
+                response = self.middleware.do_redirect(self.request("/en/a/"))
+        sleep.assert_called_once()
+        self.assertEqual(response["Location"], "/en/c/")
+        self.assertEqual(get_counter("coalesced"), 1)
+
+    def test_lock_wait_timeout(self):
+        cache.add("%s:LOCK" % self.key, 1)
+        with patch("djangocms_redirect.middleware.time.sleep") as sleep:
+            with self.assertNumQueries(1):
+                response = self.middleware.do_redirect(self.request("/en/a/"))
+        self.assertTrue(sleep.called)
+        self.assertEqual(response["Location"], "/en/b/")
+        self.assertEqual(get_counter("coalesced"), 0)
+        # the lock held by the other request is not released
+        self.assertEqual(cache.get("%s:LOCK" % self.key), 1)
+
+
+class SyncExecutor:
+    def __init__(self):
+        self.calls = []
+
+    def submit(self, fn, *args):
+        self.calls.append(args)
+        fn(*args)
+
+
+@override_settings(DJANGOCMS_REDIRECT_CACHE_TIMEOUT=60, DJANGOCMS_REDIRECT_CACHE_STALE_TIMEOUT=600)
+class TestStaleWhileRevalidate(BaseRedirectTest):
+    def setUp(self):
+        super().setUp()
+        self.redirect = Redirect.objects.create(site=self.site_1, old_path="/en/a/", new_path="/en/b/")
+        self.middleware = RedirectMiddleware(lambda request: None)
+        self.key = get_key_from_path_and_site("/en/a/", self.site_1.pk)
+        self.executor = SyncExecutor()
+
+    def _do_redirect(self):
+        with patch("djangocms_redirect.middleware.get_refresh_executor", return_value=self.executor), patch(
+            "djangocms_redirect.middleware.connections"
+        ):
+            return self.middleware.do_redirect(self.request("/en/a/"))
+
+    def _expire(self):
+        cached_redirect = cache.get(self.key)
+        cached_redirect["expires"] = time.time() - 1
+        cache.set(self.key, cached_redirect)
+
+    def test_soft_expiry(self):
+        response = self._do_redirect()
+        self.assertEqual(response["Location"], "/en/b/")
+        self.assertAlmostEqual(cache.get(self.key)["expires"], time.time() + 60, delta=5)
+
+        # change the redirect behind the cache back
+        Redirect.objects.filter(pk=self.redirect.pk).update(new_path="/en/c/")
+        self.key = get_key_from_path_and_site("/en/a/", self.site_1.pk)
+        cache.set(self.key, {"site": self.site_1.pk, "redirect": "/en/b/", "status_code": "301"})
+        self._expire()
+
+        # stale value is served, and refreshed
+        with self.assertNumQueries(1):
+            response = self._do_redirect()
+        self.assertEqual(response["Location"], "/en/b/")
+        self.assertEqual(len(self.executor.calls), 1)
+        self.assertIsNone(cache.get("%s:REFRESH" % self.key))
+
+        with self.assertNumQueries(0):
+            response = self._do_redirect()
+        self.assertEqual(response["Location"], "/en/c/")
+        self.assertEqual(len(self.executor.calls), 1)
+
+    def test_single_refresh(self):
+        self._do_redirect()
+        self._expire()
+        cache.add("%s:REFRESH" % self.key, 1)
+        with self.assertNumQueries(0):
+            response = self._do_redirect()
+        self.assertEqual(response["Location"], "/en/b/")
+        self.assertEqual(self.executor.calls, [])
+
+    def test_disabled(self):
+        with self.settings(DJANGOCMS_REDIRECT_CACHE_STALE_TIMEOUT=0):
+            self._do_redirect()
+        self.assertNotIn("expires", cache.get(self.key))
+
+
+@override_settings(DJANGOCMS_REDIRECT_PREFIX_LOOKUP="database")
+class TestPartialMatchDatabase(TestPartialMatch):
+    # exact redirects, prefix redirects, and regular expression redirects (loaded once)
+    lookup_queries = 3
+
+    def test_database_query(self):
+        pages = self.get_pages()
+        self._patch_subpath_match(Redirect.objects.get(old_path="/en/test"))
+        self._patch_subpath_match(Redirect.objects.get(old_path="/en/test-page/in"))
+        middleware = RedirectMiddleware(lambda request: None)
+        with self.assertNumQueries(1):
+            redirect = middleware._match_substring([pages[2].get_absolute_url()], self.site_1.pk)
+        self.assertEqual(redirect.new_path, pages[2].get_absolute_url().replace("/en/test-page/in", "/bar"))
+        with self.assertNumQueries(1):
+            redirect = middleware._match_substring(["/en/test-other"], self.site_1.pk)
+        self.assertEqual(redirect.new_path, "/baz-other")
+        with self.assertNumQueries(1):
+            self.assertIsNone(middleware._match_substring(["/en/tes/"], self.site_1.pk))
+
+
+@override_settings(DJANGOCMS_REDIRECT_IN_MEMORY_TABLE=True)
+class TestInMemoryTable(BaseRedirectTest):
+    _pages_data = (
+        {"en": {"title": "home page", "template": "page.html", "publish": True}},
+        {"en": {"title": "test page", "template": "page.html", "publish": True}},
+        {"en": {"title": "internal page", "template": "page.html", "publish": True, "parent": "test-page"}},
+    )
+
+    def test_exact_redirect(self):
+        pages = self.get_pages()
+        Redirect.objects.create(
+            site=self.site_1,
+            old_path=pages[1].get_absolute_url(),
+            new_path=pages[0].get_absolute_url(),
+            response_code="301",
+        )
+
+        with self.assertNumQueries(1):
+            response = self.client.get(pages[1].get_absolute_url())
+        self.assertRedirects(response, pages[0].get_absolute_url(), status_code=301)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(pages[1].get_absolute_url())
+        self.assertEqual(response.status_code, 301)
+
+        # a different path does not hit the database either
+        request = self.request("/en/some/missing/path/")
+        middleware = RedirectMiddleware(lambda request: None)
+        with self.assertNumQueries(0):
+            self.assertIsNone(middleware.do_redirect(request))
+
+    def test_prefix_redirect(self):
+        pages = self.get_pages()
+        Redirect.objects.create(
+            site=self.site_1, old_path="/en/test", new_path="/baz", response_code="301", catchall_redirect=True
+        )
+        Redirect.objects.create(
+            site=self.site_1, old_path="/en/test-page/in", new_path="/bar", response_code="302", subpath_match=True
+        )
+
+        response = self.client.get(pages[2].get_absolute_url())
+        new_path = pages[2].get_absolute_url().replace("/en/test-page/in", "/bar")
+        self.assertRedirects(response, new_path, status_code=302, fetch_redirect_response=False)
+
+        response = self.client.get("/en/test-other/")
+        self.assertRedirects(response, "/baz", status_code=301, fetch_redirect_response=False)
+
+    def test_shared_lookup_path(self):
+        Redirect.objects.create(site=self.site_1, old_path="/en/shared/", new_path="/second/", subpath_match=True)
+        Redirect.objects.create(site=self.site_1, old_path="/en/sh%61red/", new_path="/first/", subpath_match=True)
+        middleware = RedirectMiddleware(lambda request: None)
+        self.assertEqual(middleware.do_redirect(self.request("/en/shared/"))["Location"], "/first/")
+        self.assertEqual(middleware.do_redirect(self.request("/en/shared/page/"))["Location"], "/first/page/")
+
+    def test_rebuild_on_change(self):
+        pages = self.get_pages()
+        redirect = Redirect.objects.create(
+            site=self.site_1,
+            old_path=pages[1].get_absolute_url(),
+            new_path=pages[0].get_absolute_url(),
+            response_code="301",
+        )
+        table = get_redirect_table(self.site_1.pk)
+        self.assertEqual(len(table), 1)
+        self.assertIs(table, get_redirect_table(self.site_1.pk))
+
+        redirect.response_code = "302"
+        redirect.save()
+        response = self.client.get(pages[1].get_absolute_url())
+        self.assertRedirects(response, pages[0].get_absolute_url(), status_code=302)
+        self.assertIsNot(table, get_redirect_table(self.site_1.pk))
+
+        redirect.delete()
+        response = self.client.get(pages[1].get_absolute_url())
+        self.assertEqual(response.status_code, 200)
+
+    def test_move_to_other_site(self):
+        other_site = Site.objects.create(domain="other.example.com", name="other")
+        Redirect.objects.create(site=self.site_1, old_path="/en/a/", new_path="/en/b/")
+        Redirect.objects.create(site=self.site_1, old_path="/en/c/", new_path="/en/d/", subpath_match=True)
+        middleware = RedirectMiddleware(lambda request: None)
+        self.assertEqual(middleware.do_redirect(self.request("/en/a/"))["Location"], "/en/b/")
+        self.assertEqual(middleware.do_redirect(self.request("/en/c/e/"))["Location"], "/en/d/e/")
+
+        # the tables of the site the redirects are moved from are rebuilt as well
+        redirect = Redirect.objects.get(old_path="/en/a/")
+        redirect.site = other_site
+        redirect.save()
+        self.assertIsNone(middleware.do_redirect(self.request("/en/a/")))
+        redirect = Redirect.objects.get(old_path="/en/c/")
+        redirect.site = other_site
+        Redirect.objects.bulk_update([redirect], ["site"])
+        self.assertIsNone(middleware.do_redirect(self.request("/en/c/e/")))
+
+    def test_table_info(self):
+        Redirect.objects.create(site=self.site_1, old_path="/a/", new_path="/b/")
+        Redirect.objects.create(site=self.site_1, old_path="/c/", new_path="/d/", subpath_match=True)
+        other_site = Site.objects.create(domain="other.example.com", name="other")
+        Redirect.objects.create(site=other_site, old_path="/e/", new_path="/f/")
+        get_redirect_table(self.site_1.pk)
+
+        info = get_redirect_tables_info()
+        self.assertEqual(list(info.keys()), [self.site_1.pk])
+        self.assertEqual(info[self.site_1.pk]["size"], 2)
+        self.assertGreaterEqual(info[self.site_1.pk]["build_time"], 0)
+        self.assertIsNotNone(info[self.site_1.pk]["built_at"])
+
+
+@override_settings(
+    DJANGOCMS_REDIRECT_EXCLUDED_PREFIXES=["/static/", "/media/"], DJANGOCMS_REDIRECT_EXCLUDED_SUFFIXES=(".js",)
+)
+class TestExcludedPaths(BaseRedirectTest):
+    def setUp(self):
+        super().setUp()
+        Redirect.objects.create(site=self.site_1, old_path="/static/a.css", new_path="/static/b.css")
+        Redirect.objects.create(site=self.site_1, old_path="/en/a.js", new_path="/en/b.js")
+        Redirect.objects.create(site=self.site_1, old_path="/en/", new_path="/de/", subpath_match=True)
+        Site.objects.get_current()
+
+    def test_excluded(self):
+        middleware = RedirectMiddleware(lambda request: None)
+        self.assertTrue(middleware.is_excluded("/media/image.png"))
+        with self.assertNumQueries(0), patch("djangocms_redirect.middleware.cache") as mocked_cache:
+            self.assertIsNone(middleware.do_redirect(self.request("/static/a.css")))
+            self.assertIsNone(middleware.do_redirect(self.request("/en/a.js")))
+        self.assertFalse(mocked_cache.method_calls)
+        self.assertEqual(middleware.do_redirect(self.request("/en/a.css"))["Location"], "/de/a.css")
+
+    def test_response(self):
+        middleware = RedirectMiddleware(lambda request: None)
+        response = HttpResponseNotFound()
+        with self.settings(DJANGOCMS_REDIRECT_USE_REQUEST=False):
+            self.assertIs(middleware.process_response(self.request("/static/a.css"), response), response)
+            self.assertEqual(middleware.process_response(self.request("/en/a.css"), response).status_code, 301)
+
+    @override_settings(DJANGOCMS_REDIRECT_EXCLUDED_PREFIXES=(), DJANGOCMS_REDIRECT_EXCLUDED_SUFFIXES=())
+    def test_disabled(self):
+        middleware = RedirectMiddleware(lambda request: None)
+        self.assertFalse(middleware.has_excluded_paths)
+        self.assertEqual(middleware.do_redirect(self.request("/static/a.css"))["Location"], "/static/b.css")
+
 
 class TestNoSitesMatch(BaseRedirectTest):
     _pages_data = (
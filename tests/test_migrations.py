@@ -0,0 +1,35 @@
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TransactionTestCase
+
+
+class TestLookupPathMigration(TransactionTestCase):
+    migrate_from = [("djangocms_redirect", "0003_auto_20190810_1009")]
+    migrate_to = [("djangocms_redirect", "0004_redirect_lookup_path")]
+
+    def _migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        # the redirects state refers to the sites models
+        return executor.loader.project_state(targets + executor.loader.graph.leaf_nodes("sites")).apps
+
+    def setUp(self):
+        super().setUp()
+        leaf = MigrationExecutor(connection).loader.graph.leaf_nodes("djangocms_redirect")
+        self.addCleanup(self._migrate, leaf)
+        self.apps = self._migrate(self.migrate_from)
+
+    def test_populate_lookup_path(self):
+        Site = self.apps.get_model("sites", "Site")
+        Redirect = self.apps.get_model("djangocms_redirect", "Redirect")
+        site = Site.objects.create(domain="example.org", name="example.org")
+        for old_path in ("/en/a/", "en/b", "/en/c%20d/", "/en/%C3%A8/"):
+            Redirect.objects.create(site=site, old_path=old_path, new_path="/en/z/")
+
+        apps = self._migrate(self.migrate_to)
+        Redirect = apps.get_model("djangocms_redirect", "Redirect")
+        self.assertEqual(
+            dict(Redirect.objects.values_list("old_path", "lookup_path")),
+            {"/en/a/": "/en/a/", "en/b": "/en/b", "/en/c%20d/": "/en/c d/", "/en/%C3%A8/": "/en/è/"},
+        )
@@ -0,0 +1,187 @@
+from unittest.mock import patch
+
+from django.test.utils import override_settings
+
+from djangocms_redirect.admin import RedirectForm
+from djangocms_redirect.middleware import RedirectMiddleware
+from djangocms_redirect.models import Redirect
+from djangocms_redirect.patterns import RegexMatcher, get_bucket, get_literal_prefix, get_regex_matcher
+from djangocms_redirect.table import get_redirect_table
+
+from . import BaseRedirectTest
+
+
+class TestRegexMatcher(BaseRedirectTest):
+    def _matcher(self, *rules):
+        matcher = RegexMatcher()
+        for priority, (pattern, new_path) in enumerate(rules):
+            matcher.add(priority, pattern, new_path, "301")
+        return matcher.compile()
+
+    def test_literal_prefix(self):
+        self.assertEqual(get_literal_prefix(r"^/blog/(\d{4})/(.*)$"), "/blog/")
+        self.assertEqual(get_literal_prefix(r"/blog/x?"), "/blog/")
+        self.assertEqual(get_literal_prefix(r"^/blog/$"), "/blog/")
+        self.assertEqual(get_literal_prefix(r"^/blog"), "/blog")
+        self.assertEqual(get_literal_prefix(r"^/a|^/b/"), "")
+        self.assertEqual(get_literal_prefix(r"(?i)^/blog/"), "")
+        self.assertEqual(get_bucket("/blog/2020/"), "/blog/")
+        self.assertEqual(get_bucket("/blog"), "")
+
+    def test_match(self):
+        matcher = self._matcher(
+            (r"^/blog/(\d{4})/(.*)$", r"/news/\2"),
+            (r"^/blog/(?P<slug>[a-z]+)/$", r"/articles/\g<slug>/"),
+            (r"^/old", "/new/"),
+        )
+        self.assertEqual(matcher.match("/blog/2020/post/").new_path, "/news/post/")
+        self.assertEqual(matcher.match("/blog/post/").new_path, "/articles/post/")
+        self.assertEqual(matcher.match("/old-page/").new_path, "/new/")
+        self.assertIsNone(matcher.match("/other/"))
+        self.assertIsNone(matcher.match("/en/blog/2020/post/"))
+
+    def test_compiled_once(self):
+        matcher = self._matcher((r"^/blog/(\d{4})/(.*)$", r"/news/\2"), (r"^/old", "/new/"))
+        # the compiled patterns are reused, whatever the state of the re module cache
+        with patch("re.compile") as compile_pattern, patch("re.match") as match_pattern:
+            self.assertEqual(matcher.match("/blog/2020/post/").new_path, "/news/post/")
+            self.assertEqual(matcher.match("/old-page/").new_path, "/new/")
+        self.assertFalse(compile_pattern.called or match_pattern.called)
+
+    def test_priority(self):
+        matcher = self._matcher((r"^/a/(.*)$", "/first/"), (r"^/(.*)$", "/second/"), (r"^/a/b/$", "/third/"))
+        self.assertEqual(matcher.match("/a/b/").new_path, "/first/")
+        self.assertEqual(matcher.match("/c/").new_path, "/second/")
+        matcher = self._matcher((r"^/(.*)$", "/first/"), (r"^/a/(.*)$", "/second/"))
+        self.assertEqual(matcher.match("/a/b/").new_path, "/first/")
+
+    def test_chunks(self):
+        rules = [(r"^/section/{}/(\d+)/$".format(index), r"/new/{}/\1/".format(index)) for index in range(250)]
+        # backreferences and duplicated group names can't be merged as is
+        rules.insert(10, (r"^/section/(\w)\1/$", "/double/"))
+        rules.insert(20, (r"^/section/(?P<x>z)/$", "/named-1/"))
+        rules.insert(30, (r"^/section/(?P<x>y)/$", "/named-2/"))
+        matcher = self._matcher(*rules)
+        self.assertLess(len(matcher.buckets["/section/"]), 20)
+        self.assertEqual(matcher.match("/section/249/12/").new_path, "/new/249/12/")
+        self.assertEqual(matcher.match("/section/aa/").new_path, "/double/")
+        self.assertIsNone(matcher.match("/section/ab/"))
+        self.assertEqual(matcher.match("/section/z/").new_path, "/named-1/")
+        self.assertEqual(matcher.match("/section/y/").new_path, "/named-2/")
+
+    def test_invalid(self):
+        with self.assertLogs("djangocms_redirect.patterns", "WARNING"):
+            matcher = self._matcher((r"^/(a/$", "/a/"), (r"^/(b)/$", r"/\2/"), (r"^/(c)/$", r"/\1/"))
+        self.assertIsNone(matcher.match("/a/"))
+        with self.assertLogs("djangocms_redirect.patterns", "WARNING"):
+            self.assertIsNone(matcher.match("/b/"))
+        self.assertEqual(matcher.match("/c/").new_path, "/c/")
+
+    def test_timeout(self):
+        rules = [(r"^/x/{}/$".format(index), "/a/") for index in range(300)]
+        matcher = self._matcher(*rules)
+        with patch("djangocms_redirect.patterns.time.perf_counter", side_effect=[0, 1]):
+            with self.assertLogs("djangocms_redirect.patterns", "WARNING"):
+                self.assertIsNone(matcher.match("/x/299/"))
+        self.assertEqual(matcher.match("/x/299/").new_path, "/a/")
+        with self.settings(DJANGOCMS_REDIRECT_REGEX_TIMEOUT=0):
+            self.assertEqual(matcher.match("/x/299/").new_path, "/a/")
+
+
+class TestRegexRedirect(BaseRedirectTest):
+    def setUp(self):
+        super().setUp()
+        Redirect.objects.create(
+            site=self.site_1, old_path=r"^/en/blog/(\d{4})/(.*)$", new_path=r"/en/news/\2", regex_match=True
+        )
+        Redirect.objects.create(
+            site=self.site_1, old_path=r"^/en/(.*)-old/$", new_path=r"/en/\1/", response_code="302", regex_match=True
+        )
+        Redirect.objects.create(site=self.site_1, old_path="/en/blog/2020/exact/", new_path="/en/exact/")
+        Redirect.objects.create(site=self.site_1, old_path="/en/blog/2021", new_path="/en/prefix", subpath_match=True)
+
+    def _assert_redirects(self):
+        middleware = RedirectMiddleware(lambda request: None)
+        response = middleware.do_redirect(self.request("/en/blog/2019/post/"))
+        self.assertEqual((response.status_code, response["Location"]), (301, "/en/news/post/"))
+        response = middleware.do_redirect(self.request("/en/page-old/"))
+        self.assertEqual((response.status_code, response["Location"]), (302, "/en/page/"))
+        # exact and prefix redirects take precedence
+        self.assertEqual(middleware.do_redirect(self.request("/en/blog/2020/exact/"))["Location"], "/en/exact/")
+        self.assertEqual(middleware.do_redirect(self.request("/en/blog/2021/post/"))["Location"], "/en/prefix/post/")
+        self.assertIsNone(middleware.do_redirect(self.request("/en/other/")))
+
+    def test_lookup_path(self):
+        redirect = Redirect.objects.get(regex_match=True, response_code="301")
+        self.assertEqual(redirect.old_path, r"^/en/blog/(\d{4})/(.*)$")
+        self.assertEqual(redirect.lookup_path, "")
+
+    def test_redirect(self):
+        self._assert_redirects()
+
+    @override_settings(DJANGOCMS_REDIRECT_PREFIX_LOOKUP="database")
+    def test_redirect_database(self):
+        self._assert_redirects()
+        self.assertEqual(len(get_regex_matcher(self.site_1.pk)), 2)
+
+    @override_settings(DJANGOCMS_REDIRECT_IN_MEMORY_TABLE=True)
+    def test_redirect_table(self):
+        self._assert_redirects()
+        self.assertEqual(len(get_redirect_table(self.site_1.pk).patterns), 2)
+
+    @override_settings(DJANGOCMS_REDIRECT_BLOOM_FILTER=True)
+    def test_redirect_bloom(self):
+        self._assert_redirects()
+
+    def test_invalidation(self):
+        middleware = RedirectMiddleware(lambda request: None)
+        self.assertIsNone(middleware.do_redirect(self.request("/en/shop/1/")))
+        Redirect.objects.create(site=self.site_1, old_path=r"^/en/shop/(\d+)/$", new_path=r"/p/\1/", regex_match=True)
+        self.assertEqual(middleware.do_redirect(self.request("/en/shop/1/"))["Location"], "/p/1/")
+
+    def test_update_regex_match(self):
+        Redirect.objects.create(site=self.site_1, old_path="/en/x+/", new_path="/en/y/")
+        middleware = RedirectMiddleware(lambda request: None)
+        self.assertEqual(middleware.do_redirect(self.request("/en/x+/"))["Location"], "/en/y/")
+
+        # the pattern is not matched as an exact path anymore
+        Redirect.objects.filter(old_path="/en/x+/").update(regex_match=True)
+        self.assertEqual(Redirect.objects.get(old_path="/en/x+/").lookup_path, "")
+        self.assertIsNone(middleware.do_redirect(self.request("/en/x+/")))
+        self.assertEqual(middleware.do_redirect(self.request("/en/xx/"))["Location"], "/en/y/")
+
+        Redirect.objects.filter(old_path="/en/x+/").update(regex_match=False)
+        self.assertEqual(Redirect.objects.get(old_path="/en/x+/").lookup_path, "/en/x+/")
+        self.assertIsNone(middleware.do_redirect(self.request("/en/xx/")))
+
+        # regular expression redirects keep an empty lookup path when their pattern changes
+        Redirect.objects.filter(regex_match=True, response_code="302").update(old_path=r"^/en/(.*)-older/$")
+        self.assertEqual(Redirect.objects.get(regex_match=True, response_code="302").lookup_path, "")
+        self.assertEqual(middleware.do_redirect(self.request("/en/page-older/"))["Location"], "/en/page/")
+
+    def test_exact_ignores_regex(self):
+        # rows written without the queryset helpers, which keep the lookup path empty
+        Redirect.objects.filter(regex_match=True).update(lookup_path="/en/page-old/")
+        middleware = RedirectMiddleware(lambda request: None)
+        self.assertEqual(middleware.do_redirect(self.request("/en/page-old/"))["Location"], "/en/page/")
+
+
+class TestRegexForm(BaseRedirectTest):
+    def _form(self, old_path, **data):
+        data.update({"site": self.site_1.pk, "old_path": old_path, "new_path": "/a/", "response_code": "301"})
+        return RedirectForm(data=data)
+
+    def test_valid(self):
+        form = self._form(r"^/blog/(\d+)$", regex_match=True)
+        self.assertTrue(form.is_valid())
+        self.assertEqual(form.cleaned_data["old_path"], r"^/blog/(\d+)$")
+
+    def test_invalid_pattern(self):
+        form = self._form(r"^/blog/(\d+$", regex_match=True)
+        self.assertFalse(form.is_valid())
+        self.assertIn("Invalid regular expression", form.errors["old_path"][0])
+
+    def test_subpath(self):
+        form = self._form(r"^/blog/", regex_match=True, subpath_match=True)
+        self.assertFalse(form.is_valid())
+        self.assertIn("regex_match", form.errors)
@@ -0,0 +1,179 @@
+import os
+import re
+import shutil
+import tempfile
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.sites.models import Site
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test.utils import override_settings
+
+from djangocms_redirect.middleware import RedirectMiddleware
+from djangocms_redirect.models import Redirect
+from djangocms_redirect.server_maps import SiteMaps, export_site_maps, read_header
+
+from . import BaseRedirectTest
+
+_NGINX_ENTRY_RE = re.compile(r'    "(.*)" "(.*)";')
+
+
+def resolve_nginx(content, path):
+    """Resolve the path on the nginx map as nginx does: exact keys first, then regular expressions in order."""
+    exact, patterns = {}, []
+    for line in content.splitlines():
+        match = _NGINX_ENTRY_RE.fullmatch(line)
+        if not match:
+            continue
+        key, value = match.groups()
+        if key.startswith("~"):
+            patterns.append((re.compile(key[1:]), value))
+        else:
+            exact[key[1:] if key.startswith("\\~") else key] = value
+    if path in exact:
+        return exact[path]
+    for pattern, value in patterns:
+        match = pattern.search(path)
+        if match:
+            return value.replace("$1", match.group(1)) if "$1" in value else value
+    return ""
+
+
+class TestSiteMaps(BaseRedirectTest):
+    def setUp(self):
+        super().setUp()
+        for old_path, new_path, options in (
+            ("/en/a/", "/en/b/", {}),
+            ("/en/c", "/en/d/", {"response_code": "302"}),
+            ("/en/gone/", "", {}),
+            ("/en/f", "/en/g", {"subpath_match": True}),
+            ("/en/f/deep/", "/en/h/", {"catchall_redirect": True}),
+            ("/en/old/", "/en/removed/", {"subpath_match": True, "response_code": "410"}),
+            (r"^/en/x/(\d+)/$", r"/en/y/\1/", {"regex_match": True}),
+            ("/en/with space/", "/en/b/", {}),
+            ("/en/money/", "/en/$/", {}),
+        ):
+            Redirect.objects.create(site=self.site_1, old_path=old_path, new_path=new_path, **options)
+        site_2 = Site.objects.create(domain="example2.com", name="example2.com")
+        Redirect.objects.create(site=site_2, old_path="/en/other/", new_path="/en/b/")
+
+    def test_nginx(self):
+        maps = SiteMaps.load(self.site_1.pk)
+        self.assertEqual(maps.skipped, 3)
+        content = maps.get_nginx()
+        self.assertTrue(content.startswith('map $uri $djangocms_redirect_1 {\n    default "";\n'))
+        self.assertIn('    "/en/a" "301:/en/b/";\n', content)
+        self.assertIn('    "/en/c" "302:/en/d/";\n', content)
+        self.assertIn('    "/en/gone/" "410";\n', content)
+        self.assertIn('    "~^/en/f(.*)$" "301:/en/g$1";\n', content)
+        self.assertNotIn("other", content)
+        self.assertNotIn("/en/x/", content)
+
+    def test_same_as_middleware(self):
+        content = SiteMaps.load(self.site_1.pk).get_nginx()
+        apache = dict(line.split(" ") for line in SiteMaps.load(self.site_1.pk).get_apache().splitlines())
+        self._assert_same_as_middleware(content, apache)
+
+    def _assert_same_as_middleware(self, content, apache):
+        middleware = RedirectMiddleware(lambda request: None)
+        for path in (
+            "/en/a/",
+            "/en/a",
+            "/en/c",
+            "/en/c/",
+            "/en/gone",
+            "/en/foo/bar/",
+            "/en/f",
+            "/en/f/deep",
+            "/en/f/deep/er/",
+            "/en/old",
+            "/en/old/page/",
+            "/en/missing/",
+            "/en/f/deep.css",
+        ):
+            response = middleware.do_redirect(self.request(path))
+            if response is None:
+                expected = ""
+            elif response.status_code == 410:
+                expected = "410"
+            else:
+                expected = "{}:{}".format(response.status_code, response["Location"])
+            self.assertEqual(resolve_nginx(content, path), expected, path)
+            if path in apache:
+                self.assertEqual(apache[path], expected, path)
+
+    def test_apache(self):
+        content = SiteMaps.load(self.site_1.pk).get_apache()
+        self.assertEqual(
+            content,
+            "/en/a 301:/en/b/\n/en/a/ 301:/en/b/\n/en/c 302:/en/d/\n/en/f 301:/en/g\n/en/f/deep 301:/en/h/\n"
+            "/en/f/deep/ 301:/en/h/\n/en/gone 410\n/en/gone/ 410\n/en/old 410\n/en/old/ 410\n",
+        )
+
+    @override_settings(
+        DJANGOCMS_REDIRECT_EXCLUDED_PREFIXES=("/en/gone",), DJANGOCMS_REDIRECT_EXCLUDED_SUFFIXES=(".css",)
+    )
+    def test_excluded(self):
+        maps = SiteMaps.load(self.site_1.pk)
+        self.assertNotIn("/en/gone/", maps.exact)
+        self.assertNotIn("/en/gone", maps.exact)
+        self.assertEqual(maps.skipped, 4)
+        content = maps.get_nginx()
+        self.assertIn('    "~\\.css$" "";\n', content)
+        self._assert_same_as_middleware(content, {})
+
+
+class TestExportServerMaps(BaseRedirectTest):
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.redirect = Redirect.objects.create(site=self.site_1, old_path="/en/a/", new_path="/en/b/")
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _export(self, *args):
+        stdout = StringIO()
+        call_command("export_server_maps", self.directory, "--site", str(self.site_1.pk), *args, stdout=stdout)
+        return stdout.getvalue()
+
+    def test_incremental(self):
+        self.assertEqual(self._export(), "Site 1: nginx written, apache written (0 redirects skipped)\n")
+        self.assertEqual(sorted(os.listdir(self.directory)), ["redirects-1.map", "redirects-1.txt"])
+        self.assertEqual(read_header(self._path("redirects-1.txt"))[0], self.site_1.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(self._export(), "")
+        self.redirect.new_path = "/en/c/"
+        self.redirect.save()
+        self.assertIn("nginx written", self._export())
+        with open(self._path("redirects-1.txt"), encoding="utf-8") as stream:
+            self.assertIn("/en/a/ 301:/en/c/\n", stream.read())
+        self.assertEqual(self._export("--force"), "Site 1: nginx refreshed, apache refreshed (0 redirects skipped)\n")
+
+    def test_format(self):
+        self._export("--format", "apache")
+        self.assertEqual(os.listdir(self.directory), ["redirects-1.txt"])
+        states, skipped = export_site_maps(self.site_1.pk, self.directory, ["apache"])
+        self.assertEqual((states, skipped), ({"apache": "unchanged"}, None))
+
+    def test_reload_command(self):
+        with patch("subprocess.run") as run:
+            run.return_value.returncode = 0
+            self._export("--reload-command", "nginx -s reload")
+            self._export("--reload-command", "nginx -s reload")
+        run.assert_called_once_with(["nginx", "-s", "reload"])
+
+    def test_atomic_write(self):
+        with patch("os.replace", side_effect=OSError):
+            with self.assertRaises(OSError):
+                self._export()
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_invalid_directory(self):
+        with self.assertRaises(CommandError):
+            self._export_to(self._path("missing"))
+
+    def _export_to(self, directory):
+        call_command("export_server_maps", directory, stdout=StringIO())
@@ -0,0 +1,175 @@
+import os
+import random
+import shutil
+import tempfile
+from io import StringIO
+from unittest import skipUnless
+
+from asgiref.sync import async_to_sync
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test.utils import override_settings
+
+from djangocms_redirect.middleware import ASYNC_SUPPORT, RedirectMiddleware
+from djangocms_redirect.models import Redirect
+from djangocms_redirect.snapshot import (
+    RedirectSnapshot,
+    build_snapshot,
+    get_redirect_snapshot,
+    get_snapshot_path,
+    write_snapshot,
+)
+from djangocms_redirect.table import PrefixIndex, RedirectTable
+from djangocms_redirect.utils import get_lookup_paths, get_site_generation
+
+from . import BaseRedirectTest
+
+
+class SnapshotMixin:
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        for old_path, new_path, options in (
+            ("/en/a/", "/en/b/", {}),
+            ("/en/c", "/en/d/", {"response_code": "302"}),
+            ("/en/gone/", "", {}),
+            ("/en/città/", "/en/città-nuova/", {}),
+            ("/en/f", "/en/g", {"subpath_match": True}),
+            ("/en/f/deep/", "/en/h/", {"catchall_redirect": True}),
+            ("/en/à/", "/en/è/", {"subpath_match": True}),
+            (r"^/en/x/(\d+)/$", r"/en/y/\1/", {"regex_match": True}),
+        ):
+            Redirect.objects.create(site=self.site_1, old_path=old_path, new_path=new_path, **options)
+
+    def _snapshot(self):
+        write_snapshot(self.site_1.pk, self.directory)
+        return RedirectSnapshot(get_snapshot_path(self.site_1.pk, self.directory))
+
+
+class TestRedirectSnapshot(SnapshotMixin, BaseRedirectTest):
+    def test_same_as_table(self):
+        snapshot = self._snapshot()
+        self.assertEqual((snapshot.site_id, snapshot.size), (self.site_1.pk, 8))
+        self.assertEqual(snapshot.generation, get_site_generation(self.site_1.pk))
+        table = RedirectTable.build(self.site_1.pk, snapshot.generation)
+        for path in (
+            "/en/a/",
+            "/en/a",
+            "/en/c",
+            "/en/gone",
+            "/en/città",
+            "/en/foo/bar/",
+            "/en/f",
+            "/en/f/deep",
+            "/en/f/deep/er/",
+            "/en/à/page/",
+            "/en/á/",
+            "/en/x/1/",
+            "/en/missing/",
+            "/",
+        ):
+            paths = get_lookup_paths(path)
+            self.assertEqual(snapshot.resolve(paths), table.resolve(paths), path)
+
+    def test_longest_prefix(self):
+        rng = random.Random(0)
+        segments = ["a", "ab", "b", "ba", "à", ""]
+        prefixes = {"/" + "/".join(rng.choices(segments, k=rng.randint(1, 4))) for _ in range(300)}
+        index = PrefixIndex()
+        for prefix in prefixes:
+            redirect = Redirect.objects.create(
+                site=self.site_1, old_path=prefix, new_path="/target/", catchall_redirect=True
+            )
+            index.add(prefix, redirect.pk)
+        snapshot = self._snapshot()
+        for _ in range(500):
+            path = "/" + "/".join(rng.choices(segments, k=rng.randint(1, 6)))
+            expected = index.lookup(path)
+            match = snapshot.match_prefix(path)
+            self.assertEqual(match and match.pk, expected and expected[1], path)
+
+    def test_invalid(self):
+        path = get_snapshot_path(self.site_1.pk, self.directory)
+        content = build_snapshot(self.site_1.pk, 1)
+        for data in (b"", b"XXXX" + content[4:], content[:40]):
+            with open(path, "wb") as stream:
+                stream.write(data)
+            with self.assertRaises(ValueError):
+                RedirectSnapshot(path)
+
+
+@override_settings(DJANGOCMS_REDIRECT_GENERATION_CHECK_INTERVAL=0)
+class TestSnapshotLookup(SnapshotMixin, BaseRedirectTest):
+    def setUp(self):
+        super().setUp()
+        settings_override = self.settings(DJANGOCMS_REDIRECT_SNAPSHOT_DIR=self.directory)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def _get(self, path):
+        response = RedirectMiddleware(lambda request: None).do_redirect(self.request(path))
+        return response and response["Location"]
+
+    def test_lookup(self):
+        write_snapshot(self.site_1.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(self._get("/en/a"), "/en/b/")
+            self.assertEqual(self._get("/en/f/page/"), "/en/g/page/")
+            self.assertEqual(self._get("/en/x/2/"), "/en/y/2/")
+            self.assertIsNone(self._get("/en/missing/"))
+
+    def test_stale(self):
+        write_snapshot(self.site_1.pk)
+        Redirect.objects.filter(old_path="/en/a/").update(new_path="/en/z/")
+        self.assertIsNone(get_redirect_snapshot(self.site_1.pk))
+        # stale snapshots are ignored until rebuilt
+        self.assertEqual(self._get("/en/a/"), "/en/z/")
+        identity = RedirectSnapshot(get_snapshot_path(self.site_1.pk)).identity
+        write_snapshot(self.site_1.pk)
+        snapshot = get_redirect_snapshot(self.site_1.pk)
+        self.assertNotEqual(snapshot.identity, identity)
+        with self.assertNumQueries(0):
+            self.assertEqual(self._get("/en/a"), "/en/z/")
+
+    def test_missing(self):
+        self.assertIsNone(get_redirect_snapshot(self.site_1.pk))
+        with open(get_snapshot_path(self.site_1.pk), "wb") as stream:
+            stream.write(b"invalid")
+        with self.assertLogs("djangocms_redirect.snapshot", "WARNING"):
+            self.assertIsNone(get_redirect_snapshot(self.site_1.pk))
+            self.assertEqual(self._get("/en/a/"), "/en/b/")
+
+    @skipUnless(ASYNC_SUPPORT, "Native async support requires Django 4.1+")
+    def test_async(self):
+        async def get_response(request):
+            return None
+
+        write_snapshot(self.site_1.pk)
+        middleware = RedirectMiddleware(get_response)
+        with self.assertNumQueries(0):
+            response = async_to_sync(middleware.ado_redirect)(self.request("/en/f/page/"))
+        self.assertEqual(response["Location"], "/en/g/page/")
+
+
+class TestBuildRedirectSnapshot(SnapshotMixin, BaseRedirectTest):
+    def _build(self, *args):
+        stdout = StringIO()
+        call_command("build_redirect_snapshot", "--site", str(self.site_1.pk), *args, stdout=stdout)
+        return stdout.getvalue()
+
+    def test_incremental(self):
+        self.assertIn("Site 1: 8 redirects written", self._build("--directory", self.directory))
+        self.assertEqual(os.listdir(self.directory), ["redirects-1.snapshot"])
+        with self.assertNumQueries(0):
+            self.assertEqual(self._build("--directory", self.directory), "")
+        Redirect.objects.create(site=self.site_1, old_path="/en/new/", new_path="/en/b/")
+        with self.settings(DJANGOCMS_REDIRECT_SNAPSHOT_DIR=self.directory):
+            self.assertIn("Site 1: 9 redirects written", self._build())
+            self.assertIn("Site 1: 9 redirects written", self._build("--force"))
+
+    def test_invalid_directory(self):
+        with self.assertRaises(CommandError):
+            self._build()
+        with self.assertRaises(CommandError):
+            self._build("--directory", os.path.join(self.directory, "missing"))
@@ -0,0 +1,56 @@
+from djangocms_redirect.models import Redirect
+from djangocms_redirect.table import PrefixIndex, get_redirect_table
+
+from . import BaseRedirectTest
+
+
+class TestPrefixIndex(BaseRedirectTest):
+    def _make_index(self, *paths):
+        index = PrefixIndex()
+        for path in paths:
+            index.add(path, path)
+        return index
+
+    def test_longest_match(self):
+        index = self._make_index("/en/", "/en/test", "/en/test-page/in", "/en/test-page/internal", "/en/other/path")
+        self.assertEqual(len(index), 5)
+        self.assertEqual(index.lookup("/en/test-page/internal-page/")[0], "/en/test-page/internal")
+        self.assertEqual(index.lookup("/en/test-page/inner/")[0], "/en/test-page/in")
+        self.assertEqual(index.lookup("/en/test-page/")[0], "/en/test")
+        self.assertEqual(index.lookup("/en/other/")[0], "/en/")
+        self.assertEqual(index.lookup("/en/other/path/deep/")[0], "/en/other/path")
+        self.assertIsNone(index.lookup("/it/test-page/"))
+
+    def test_root_and_no_slash(self):
+        index = self._make_index("/", "relative")
+        self.assertEqual(index.lookup("/any/path/")[0], "/")
+        self.assertEqual(index.lookup("relative/path")[0], "relative")
+        self.assertIsNone(index.lookup("other"))
+
+    def test_same_as_linear_scan(self):
+        paths = ["/a/", "/a/b", "/a/bc/", "/a/bc/d", "/ab", "/b/c/d/e/", "/b/c/"]
+        index = self._make_index(*paths)
+        for path in ("/a/bcd/", "/a/bc/de/f", "/abc/", "/b/c/d/e/f/", "/b/c/d/", "/c/", "/a"):
+            expected = next((old for old in sorted(paths, reverse=True) if path.startswith(old)), None)
+            match = index.lookup(path)
+            self.assertEqual(match[0] if match else None, expected, path)
+
+
+class TestPrefixTable(BaseRedirectTest):
+    def test_prefix_only(self):
+        Redirect.objects.create(site=self.site_1, old_path="/a/", new_path="/b/")
+        Redirect.objects.create(site=self.site_1, old_path="/c/", new_path="/d/", subpath_match=True)
+        Redirect.objects.create(site=self.site_1, old_path="/e/", new_path="/f/", catchall_redirect=True)
+
+        table = get_redirect_table(self.site_1.pk, prefix_only=True)
+        self.assertEqual(len(table), 2)
+        self.assertEqual(table.exact, {})
+        self.assertEqual(table.match_prefix("/c/path/").new_path, "/d/path/")
+        self.assertEqual(table.match_prefix("/e/path/").new_path, "/f/")
+        self.assertIsNone(table.match_prefix("/a/path/"))
+
+        # reused across calls until a redirect changes
+        with self.assertNumQueries(0):
+            self.assertIs(table, get_redirect_table(self.site_1.pk, prefix_only=True))
+        Redirect.objects.create(site=self.site_1, old_path="/g/", new_path="/h/", subpath_match=True)
+        self.assertEqual(len(get_redirect_table(self.site_1.pk, prefix_only=True)), 3)
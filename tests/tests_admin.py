@@ -26,3 +26,25 @@ class AdminPageTest(BaseRedirectTest):
         self.assertEqual(form.fields["old_path"].widget.ajax_url, reverse("admin:cms_page_get_published_pagelist"))
         self.assertEqual(form.fields["new_path"].widget.ajax_url, reverse("admin:cms_page_get_published_pagelist"))
         activate("en")
+
+    def test_export_actions(self):
+        Redirect.objects.create(site=self.site_1, old_path="/en/a/", new_path="/en/b/", subpath_match=True)
+        Redirect.objects.create(site=self.site_1, old_path="/en/c/", new_path="/en/d/", response_code="302")
+        request = self.request("/", user=self.user)
+        queryset = Redirect.objects.filter(old_path="/en/a/")
+
+        response = redirect_admin.export_csv(request, queryset)
+        self.assertEqual(response["Content-Type"], "text/csv")
+        self.assertIn("redirects.csv", response["Content-Disposition"])
+        self.assertEqual(
+            b"".join(response.streaming_content).decode("utf-8").splitlines(),
+            [
+                "site,old_path,new_path,response_code,subpath_match,catchall_redirect,regex_match",
+                "{},/en/a/,/en/b/,301,True,False,False".format(self.site_1.pk),
+            ],
+        )
+
+        response = redirect_admin.export_jsonl(request, Redirect.objects.all())
+        lines = b"".join(response.streaming_content).decode("utf-8").splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertIn('"old_path": "/en/c/"', lines[1])